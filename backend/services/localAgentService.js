@@ -6,6 +6,73 @@ const SubmissionRecord = require('../models/SubmissionRecord');
 const Application = require('../models/Application');
 const UserData = require('../models/UserData');
 
+const AGENT_URL = 'http://localhost:8012';
+
+// Follows the agent's server-sent events for a task until it finishes.
+// Step events are mirrored into the application logs as they arrive.
+const followAgentEvents = async (taskId, applicationId) => {
+  const response = await axios.get(`${AGENT_URL}/tasks/${taskId}/events`, { responseType: 'stream' });
+  let buffer = '';
+  return new Promise((resolve, reject) => {
+    response.data.on('data', (chunk) => {
+      buffer += chunk.toString();
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const dataLine = block.split('\n').find((line) => line.startsWith('data: '));
+        if (!dataLine) continue;
+        const event = JSON.parse(dataLine.slice(6));
+        if (event.type === 'step') {
+          const actions = (event.actions || []).join(', ') || 'thinking';
+          const errors = event.errors ? ` ⚠️ ${event.errors[0].substring(0, 80)}` : '';
+          updateAppStatus(applicationId, {
+            logs: [{ message: `Step ${event.step}: ${actions} @ ${event.url || ''} (${event.duration_s}s)${errors}`, timestamp: new Date() }]
+          });
+        } else if (event.type === 'finished') {
+          response.data.destroy();
+          resolve(event);
+        }
+      }
+    });
+    response.data.on('error', reject);
+    response.data.on('end', () => reject(new Error('Agent event stream ended before the task finished')));
+  });
+};
+
+// Local fallback for when the agent can't ingest the file (e.g. it runs on another host).
+const parsePdfLocally = async (absolutePath) => {
+  try {
+    const pdfLib = require('pdf-parse');
+    let pdfData;
+
+    // Versatile loader to handle different pdf-parse variants and export styles
+    if (typeof pdfLib === 'function') {
+      const dataBuffer = fs.readFileSync(absolutePath);
+      pdfData = await pdfLib(dataBuffer);
+    } else if (pdfLib.PDFParse && typeof pdfLib.PDFParse === 'function') {
+      const dataBuffer = fs.readFileSync(absolutePath);
+      // Check if it needs 'new' or just a call
+      try {
+        const parser = new pdfLib.PDFParse({ data: dataBuffer });
+        pdfData = await parser.getText();
+      } catch (e) {
+        pdfData = await pdfLib.PDFParse(dataBuffer);
+      }
+    } else if (pdfLib.default && typeof pdfLib.default === 'function') {
+      const dataBuffer = fs.readFileSync(absolutePath);
+      pdfData = await pdfLib.default(dataBuffer);
+    } else {
+      throw new Error('Could not find a valid PDF parsing function in the library');
+    }
+    
+    return pdfData?.text || 'No text extracted from PDF.';
+  } catch (pdfError) {
+    console.error('❌ [Backend Diagnostic] PDF parsing error:', pdfError.message);
+    return 'Failed to extract text from PDF.';
+  }
+};
+
 const triggerAgent = async (applicationId, platformNameOverride) => {
   try {
     const application = await Application.findById(applicationId);
@@ -18,56 +85,38 @@ const triggerAgent = async (applicationId, platformNameOverride) => {
       logs: [{ message: 'Extracting resume intelligence from PDF...', timestamp: new Date() }]
     });
 
+    // The agent parses each resume file once and caches it by content hash;
+    // tasks then only carry the resume ID instead of the full text.
+    let resumeId = '';
     let resumeText = '';
     const absolutePathForAgent = path.resolve(resumePath);
     console.log(`🔍 [Backend Diagnostic] Target Path: ${absolutePathForAgent}`);
-    
+
     if (resumePath && fs.existsSync(absolutePathForAgent)) {
       try {
-        const pdfLib = require('pdf-parse');
-        let pdfData;
-
-        // Versatile loader to handle different pdf-parse variants and export styles
-        if (typeof pdfLib === 'function') {
-          const dataBuffer = fs.readFileSync(absolutePathForAgent);
-          pdfData = await pdfLib(dataBuffer);
-        } else if (pdfLib.PDFParse && typeof pdfLib.PDFParse === 'function') {
-          const dataBuffer = fs.readFileSync(absolutePathForAgent);
-          // Check if it needs 'new' or just a call
-          try {
-            const parser = new pdfLib.PDFParse({ data: dataBuffer });
-            pdfData = await parser.getText();
-          } catch (e) {
-            pdfData = await pdfLib.PDFParse(dataBuffer);
-          }
-        } else if (pdfLib.default && typeof pdfLib.default === 'function') {
-          const dataBuffer = fs.readFileSync(absolutePathForAgent);
-          pdfData = await pdfLib.default(dataBuffer);
-        } else {
-          throw new Error('Could not find a valid PDF parsing function in the library');
-        }
-        
-        resumeText = pdfData?.text || 'No text extracted from PDF.';
+        const ingested = await axios.post(`${AGENT_URL}/resumes/from-path`, { path: absolutePathForAgent });
+        resumeId = ingested.data.resume_id;
+        console.log(`✅ [Backend Diagnostic] Resume ${ingested.data.cached ? 'cached' : 'parsed'}: ${ingested.data.chars} characters`);
+      } catch (ingestError) {
+        console.warn(`⚠️ [Backend Diagnostic] Agent could not ingest resume (${ingestError.message}), parsing locally.`);
+        resumeText = (await parsePdfLocally(absolutePathForAgent)).substring(0, 8000);
         console.log(`✅ [Backend Diagnostic] PDF parsed: ${resumeText.length} characters`);
-      } catch (pdfError) {
-        console.error('❌ [Backend Diagnostic] PDF parsing error:', pdfError.message);
-        resumeText = 'Failed to extract text from PDF.';
       }
     } else {
       console.warn(`⚠️ [Backend Diagnostic] File NOT found at: ${absolutePathForAgent}`);
     }
-    let optimizedResume = resumeText.substring(0, 8000);
 
     await updateAppStatus(applicationId, {
-      logs: [{ message: `Resume processed (${optimizedResume.length} chars). Sending to local agent...`, timestamp: new Date() }]
+      logs: [{ message: resumeId ? `Resume ${resumeId.substring(0, 12)} ready. Sending to local agent...` : `Resume processed (${resumeText.length} chars). Sending to local agent...`, timestamp: new Date() }]
     });
 
     const userData = await UserData.findOne({ userId: userId });
     const chromeProfilePath = userData?.preferences?.chromeProfilePath || '';
 
-    const response = await axios.post('http://localhost:8012/run-task', {
+    const submitted = await axios.post(`${AGENT_URL}/tasks`, {
       url: jobUrl,
-      resume_text: optimizedResume,
+      resume_id: resumeId,
+      resume_text: resumeText,
       resume_path: absolutePathForAgent, // Added absolute path for file uploads
       rules: rules,
       username: credentials?.username || '',
@@ -77,8 +126,16 @@ const triggerAgent = async (applicationId, platformNameOverride) => {
       chrome_profile_path: chromeProfilePath
     });
 
-    const isSuccess = response.data.status === 'completed';
-    const resultText = response.data.result ? String(response.data.result) : "No result";
+    const taskId = submitted.data.task_id;
+    await updateAppStatus(applicationId, {
+      taskId,
+      logs: [{ message: `Agent task ${taskId} queued.`, timestamp: new Date() }]
+    });
+
+    const finished = await followAgentEvents(taskId, applicationId);
+    const outcome = finished.result || {};
+    const isSuccess = finished.status === 'completed' && outcome.status === 'completed';
+    const resultText = outcome.result ? String(outcome.result) : (finished.error || finished.status || "No result");
 
     await updateAppStatus(applicationId, {
       status: isSuccess ? 'applied' : 'failed',
@@ -0,0 +1,197 @@
+import re
+import time
+from collections import OrderedDict
+from typing import List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pydantic import BaseModel
+
+# Query parameters that identify the job, per site and only on its job pages:
+# LinkedIn's currentJobId and Indeed's vjk also appear on search pages, where
+# they just name the selected result.
+SITE_JOB_ID_PARAMS = (
+    ("linkedin", re.compile(r"^/jobs/view(?:/|$)"), ("currentjobid",)),
+    ("indeed", re.compile(r"^/(?:viewjob|rc/clk|pagead/clk)(?:/|$)"), ("jk", "vjk")),
+    ("glassdoor", re.compile(r"^/(?:job-listing/|partner/joblisting\.htm)"), ("jl", "joblistingid")),
+)
+# On other sites only parameters that can't mean anything but a job.
+GENERIC_JOB_ID_PARAMS = ("gh_jid", "jobid", "job_id")
+
+# Dropped from canonical URLs of pages without a job ID parameter.
+TRACKING_PARAMS = ("ref", "refid", "trk", "trackingid", "src", "source", "from", "gclid", "fbclid", "lipi")
+
+# Path patterns per site, checked before the query string.
+JOB_ID_PATTERNS = (
+    ("linkedin", re.compile(r"/jobs/view/(?:[^/]*-)?(\d{6,})")),
+    ("naukri", re.compile(r"-(\d{12})(?:[/?]|$)")),
+    ("foundit", re.compile(r"/job/.*?-(\d{6,})(?:[/?]|$)")),
+    ("monster", re.compile(r"/job-openings/[^?]*?([0-9a-f]{8}-[0-9a-f-]{27})", re.I)),
+)
+
+def _job_id_params(host: str, path: str) -> tuple:
+    """Query parameters that carry the job ID on this page, if any."""
+    for name, page, params in SITE_JOB_ID_PARAMS:
+        if name in host:
+            return params if page.match(path) else ()
+    return GENERIC_JOB_ID_PARAMS
+
+def _is_tracking(param: str) -> bool:
+    return param.startswith("utm_") or param in TRACKING_PARAMS
+
+def canonicalize_url(url: str) -> str:
+    """
+    Host without www, path without trailing slash. Job pages keep only their
+    job ID parameters; other pages keep every non-tracking parameter.
+    """
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/") or "/"
+    params = [(k.lower(), v) for k, v in parse_qsl(parts.query)]
+    id_params = _job_id_params(host, parts.path)
+    query = [(k, v) for k, v in params if k in id_params]
+    if not query:
+        query = [(k, v) for k, v in params if not _is_tracking(k)]
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
+
+def extract_job_id(url: str):
+    """Returns 'site:id' for URLs that carry a job ID, else None."""
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    labels = host.split(".")
+    if len(labels) >= 3 and labels[-2] in ("co", "com", "org", "net"):
+        labels = labels[:-1]  # glassdoor.co.in -> glassdoor
+    site = labels[-2] if len(labels) >= 2 else host
+    for name, pattern in JOB_ID_PATTERNS:
+        if name in host:
+            match = pattern.search(parts.path + ("?" + parts.query if parts.query else ""))
+            if match:
+                return f"{name}:{next(g for g in match.groups() if g)}"
+    id_params = _job_id_params(host, parts.path)
+    for key, value in parse_qsl(parts.query):
+        if key.lower() in id_params and value:
+            return f"{site}:{value}"
+    return None
+
+def job_keys(url: str):
+    keys = [canonicalize_url(url)]
+    job_id = extract_job_id(url)
+    if job_id:
+        keys.append(job_id)
+    return keys
+
+def looks_like_job_url(url: str) -> bool:
+    return url.lower().startswith("http") and extract_job_id(url) is not None
+
+class AppliedJobIndex:
+    """
+    Applied jobs per (username, platform): canonical URLs and job IDs, one MongoDB
+    document per applied job. Checks query MongoDB (indexed on keys), so jobs
+    applied to by other workers are seen at once; keys found applied are kept in
+    a per-user in-memory set, since an applied job never becomes un-applied.
+    """
+
+    def __init__(self, collection, max_users: int = 512):
+        self.collection = collection
+        self.max_users = max_users
+        self._sets = OrderedDict()
+        self.local_hits = 0
+        self.lookups = 0
+
+    @staticmethod
+    def _key(username: str, platform: str):
+        return (username, platform.lower())
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("username", 1), ("platform_name", 1), ("keys", 1)], name="applied_username_platform_keys"
+        )
+
+    async def applied_urls(self, username: str, platform: str, urls: List[str]) -> set:
+        """The subset of urls already applied to, in one query for all of them."""
+        known = self._sets.get(self._key(username, platform), set())
+        keys_by_url = {url: job_keys(url) for url in urls}
+        done = {url for url, keys in keys_by_url.items() if any(k in known for k in keys)}
+        self.local_hits += len(done)
+        todo = {url: keys for url, keys in keys_by_url.items() if url not in done}
+        if not todo:
+            return done
+        self.lookups += 1
+        cursor = self.collection.find(
+            {
+                "username": username,
+                "platform_name": platform.lower(),
+                "keys": {"$in": sorted({k for keys in todo.values() for k in keys})},
+            },
+            {"keys": 1},
+        )
+        found = set()
+        async for doc in cursor:
+            found.update(doc.get("keys", []))
+        if found:
+            self._remember(self._key(username, platform), found)
+        done.update(url for url, keys in todo.items() if any(k in found for k in keys))
+        return done
+
+    async def check(self, username: str, platform: str, url: str) -> bool:
+        return url in await self.applied_urls(username, platform, [url])
+
+    async def mark_applied(self, username: str, platform: str, url: str) -> bool:
+        """Records a job as applied. Returns False if it was already known."""
+        if await self.check(username, platform, url):
+            return False
+        keys = job_keys(url)
+        result = await self.collection.update_one(
+            {"username": username, "platform_name": platform.lower(), "canonicalUrl": keys[0]},
+            {"$addToSet": {"keys": {"$each": keys}}, "$setOnInsert": {"url": url, "appliedAt": time.time()}},
+            upsert=True,
+        )
+        self._remember(self._key(username, platform), keys)
+        # Another worker may have recorded it between the check and the upsert.
+        return result.upserted_id is not None
+
+    def stats(self):
+        return {
+            "users": len(self._sets),
+            "jobs": sum(len(s) for s in self._sets.values()),
+            "local_hits": self.local_hits,
+            "lookups": self.lookups,
+        }
+
+    def _remember(self, key, keys):
+        self._sets.setdefault(key, set()).update(keys)
+        self._sets.move_to_end(key)
+        while len(self._sets) > self.max_users:
+            self._sets.popitem(last=False)
+
+class CheckAppliedAction(BaseModel):
+    urls: List[str]
+
+class MarkAppliedAction(BaseModel):
+    url: str
+
+def register_applied_job_actions(tools, index: AppliedJobIndex, username: str, platform: str):
+    """Lets the agent skip listings it already applied to and record new ones."""
+    from browser_use.agent.views import ActionResult
+
+    @tools.registry.action(
+        "Check which job URLs from the search results were already applied to, so you can skip them.",
+        param_model=CheckAppliedAction,
+    )
+    async def check_applied(params: CheckAppliedAction):
+        applied = await index.applied_urls(username, platform, params.urls)
+        done = [u for u in params.urls if u in applied]
+        new = [u for u in params.urls if u not in done]
+        msg = f"Already applied (skip): {done or 'none'}\nNot applied yet: {new or 'none'}"
+        return ActionResult(extracted_content=msg, include_in_memory=True)
+
+    @tools.registry.action(
+        "Record the job URL you just successfully applied to.",
+        param_model=MarkAppliedAction,
+    )
+    async def mark_job_applied(params: MarkAppliedAction):
+        added = await index.mark_applied(username, platform, params.url)
+        return ActionResult(extracted_content="Recorded as applied." if added else "Was already recorded.")
+
+    return tools
@@ -0,0 +1,132 @@
+"""
+Times each patched DOMTreeSerializer pass over the DOM corpus and checks the
+optimized passes produce exactly what the original recursive patch did.
+
+Usage (from python-agent/):
+    python benchmarks/bench_dom_serializer.py [--repeat 5] [--only many_inputs]
+    python benchmarks/bench_dom_serializer.py --save-synthetic   # writes dom_fixtures/*.json
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+# The reference implementation is recursive; give it room on the deep corpus entries.
+sys.setrecursionlimit(20000)
+
+from browser_use.dom.serializer.serializer import DOMTreeSerializer
+
+import browser_patch
+from dom_corpus import SYNTHETIC, corpus, mutate_one_section, save_tree
+from reference_patch import apply_reference_patches
+
+PASSES = ("create_simplified_tree", "optimize_tree", "assign_interactive_indices")
+
+def _timed_passes():
+    """Wraps the three patched passes so each top-level call is timed."""
+    timings = {}
+    for attr, label in (
+        ("_create_simplified_tree", "create_simplified_tree"),
+        ("_optimize_tree", "optimize_tree"),
+        ("_assign_interactive_indices_and_mark_new_nodes", "assign_interactive_indices"),
+    ):
+        inner = getattr(DOMTreeSerializer, attr)
+
+        def wrapper(self, node, *args, _inner=inner, _label=label, **kwargs):
+            depth = getattr(self, "_bench_depth", 0)
+            self._bench_depth = depth + 1
+            start = time.perf_counter()
+            try:
+                return _inner(self, node, *args, **kwargs)
+            finally:
+                self._bench_depth = depth
+                if depth == 0:
+                    timings[_label] = timings.get(_label, 0.0) + time.perf_counter() - start
+
+        setattr(DOMTreeSerializer, attr, wrapper)
+    return timings
+
+def _serialize(root, timings, previous=None):
+    timings.clear()
+    serializer = DOMTreeSerializer(root, previous)
+    start = time.perf_counter()
+    state, _ = serializer.serialize_accessible_elements()
+    timings["total"] = time.perf_counter() - start
+    return state
+
+def _fingerprint(state):
+    """Flattened, comparable view of a serialized tree and its selector map."""
+    rows = []
+    stack = [(state._root, 0)] if state._root else []
+    while stack:
+        node, depth = stack.pop()
+        rows.append((
+            depth, node.original_node.backend_node_id, node.is_shadow_host, node.is_compound_component,
+            node.is_interactive, node.is_new, node.excluded_by_parent, node.ignored_by_paint_order,
+        ))
+        stack.extend((child, depth + 1) for child in reversed(node.children))
+    return rows, list(state.selector_map.keys())
+
+def _run(install, factory, repeat, mutate):
+    """Serializes a fresh tree `repeat` times; with mutate, measures the second (changed) step."""
+    results = []
+    outputs = None
+    for i in range(repeat):
+        install()
+        timings = _timed_passes()
+        root = factory()
+        state = _serialize(root, timings)
+        if mutate:
+            mutate_one_section(root, seed=i)
+            state = _serialize(root, timings, state)
+        results.append(dict(timings))
+        if outputs is None:
+            outputs = _fingerprint(state)
+    summary = {key: statistics.median(t.get(key, 0.0) for t in results) for key in (*PASSES, "total")}
+    return summary, outputs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="run a single corpus entry")
+    parser.add_argument("--save-synthetic", action="store_true", help="write the synthetic trees to dom_fixtures/")
+    args = parser.parse_args()
+
+    if args.save_synthetic:
+        for name, factory in SYNTHETIC.items():
+            print(f"💾 Saved {save_tree(factory(), name)}")
+        return 0
+
+    variants = {
+        "reference": apply_reference_patches,
+        "optimized": browser_patch.apply_patches,
+    }
+
+    failures = 0
+    header = f"{'tree':<22}{'variant':<13}{'step':<7}" + "".join(f"{p[:12]:>14}" for p in PASSES) + f"{'total':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, factory in corpus():
+        if args.only and name != args.only:
+            continue
+        for mutate in (False, True):
+            step = "next" if mutate else "first"
+            baseline = None
+            for variant, install in variants.items():
+                summary, outputs = _run(install, factory, args.repeat, mutate)
+                row = f"{name:<22}{variant:<13}{step:<7}" + "".join(f"{summary[p] * 1000:>12.2f}ms" for p in PASSES)
+                print(row + f"{summary['total'] * 1000:>10.2f}ms")
+                if baseline is None:
+                    baseline = outputs
+                elif outputs != baseline:
+                    failures += 1
+                    print(f"❌ {variant} output differs from reference on {name} ({step} step)")
+
+    print("✅ All variants match the reference patch." if not failures else f"❌ {failures} mismatches.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
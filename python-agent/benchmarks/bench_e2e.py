@@ -0,0 +1,359 @@
+"""
+Offline end-to-end benchmark for the agent service.
+
+Runs the real execute_task pipeline (task queue, browser pool, browser-use
+Agent, patched serializer) against the local fixture site, with the Gemini
+client swapped for ScriptedLLM and the MongoDB client swapped for an
+in-memory one. Needs headless Chromium, no network.
+
+Usage (from python-agent/):
+    python benchmarks/bench_e2e.py --concurrency 1,2,4 --runs 8 --llm-latency 1.5
+    python benchmarks/bench_e2e.py --chrome /usr/bin/chromium --json report.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(AGENT_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+PHASES = ("llm", "dom", "action", "page_load")
+
+class RunStats:
+    """Timings for one agent run, filled in by the instrumentation wrappers."""
+
+    def __init__(self, run_id: int):
+        self.run_id = run_id
+        self.phases = {phase: 0.0 for phase in PHASES}
+        self.steps = []
+        self.wall = 0.0
+        self.ok = False
+        self.error = None
+
+    def add_phase(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+class InMemoryCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction=1):
+        self.docs.sort(key=lambda doc: doc.get(key, 0), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+class InMemoryCollection:
+    """Just enough of the Motor collection API for the stores main.py keeps in MongoDB."""
+
+    def __init__(self):
+        self.docs = []
+
+    async def create_index(self, *args, **kwargs):
+        return "index"
+
+    @staticmethod
+    def _matches(doc, query):
+        for key, value in query.items():
+            actual = doc.get(key)
+            if isinstance(value, dict) and "$in" in value:
+                values = actual if isinstance(actual, list) else [actual]
+                if not any(v in value["$in"] for v in values):
+                    return False
+            elif actual != value:
+                return False
+        return True
+
+    @staticmethod
+    def _set(doc, path, value):
+        *parents, leaf = path.split(".")
+        for key in parents:
+            doc = doc.setdefault(key, {})
+        doc[leaf] = value
+
+    async def find_one(self, query, projection=None):
+        return next((doc for doc in self.docs if self._matches(doc, query)), None)
+
+    def find(self, query, projection=None):
+        return InMemoryCursor([doc for doc in self.docs if self._matches(doc, query)])
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def update_one(self, query, update, upsert=False):
+        doc = await self.find_one(query)
+        upserted_id = None
+        if doc is None:
+            if not upsert:
+                return SimpleNamespace(matched_count=0, upserted_id=None)
+            doc = dict(query)
+            doc.setdefault("_id", len(self.docs) + 1)
+            upserted_id = doc["_id"]
+            self.docs.append(doc)
+            for path, value in update.get("$setOnInsert", {}).items():
+                self._set(doc, path, value)
+        for path, value in update.get("$set", {}).items():
+            self._set(doc, path, value)
+        for key in update.get("$unset", {}):
+            doc.pop(key, None)
+        for key, amount in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + amount
+        for key, value in update.get("$addToSet", {}).items():
+            items = doc.setdefault(key, [])
+            for item in value["$each"] if isinstance(value, dict) else [value]:
+                if item not in items:
+                    items.append(item)
+        return SimpleNamespace(matched_count=0 if upserted_id else 1, upserted_id=upserted_id)
+
+class InMemoryDatabase:
+    """Hands out an InMemoryCollection for any collection name, so new stores need no stubbing."""
+
+    def __init__(self):
+        self.collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, InMemoryCollection())
+
+class InMemoryClient:
+    """Stands in for AsyncIOMotorClient while main.py is imported."""
+
+    def __init__(self, *args, **kwargs):
+        self.db = InMemoryDatabase()
+        self.admin = SimpleNamespace(command=self._command)
+
+    def get_database(self, name=None):
+        return self.db
+
+    def __getitem__(self, name):
+        return self.db
+
+    async def _command(self, *args, **kwargs):
+        return {"ok": 1}
+
+def _find_chrome(explicit):
+    if explicit:
+        return explicit
+    for name in ("chromium", "chromium-browser", "google-chrome", "google-chrome-stable"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return os.getenv("CHROME_EXECUTABLE")
+
+def _instrument(current_run):
+    """Wraps the hot paths once so every run records per-phase wall time."""
+    from browser_use import Agent
+    from browser_use.browser.session import BrowserSession
+    from browser_use.dom.serializer.serializer import DOMTreeSerializer
+
+    def timed_sync(cls, attr, phase):
+        inner = getattr(cls, attr, None)
+        if inner is None:
+            return
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return inner(*args, **kwargs)
+            finally:
+                run = current_run.get()
+                if run is not None:
+                    run.add_phase(phase, time.perf_counter() - start)
+
+        setattr(cls, attr, wrapper)
+
+    def timed_async(cls, attr, phase, per_step=False):
+        inner = getattr(cls, attr, None)
+        if inner is None:
+            return
+
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await inner(*args, **kwargs)
+            finally:
+                run = current_run.get()
+                if run is not None:
+                    elapsed = time.perf_counter() - start
+                    if per_step:
+                        run.steps.append(elapsed)
+                    else:
+                        run.add_phase(phase, elapsed)
+
+        setattr(cls, attr, wrapper)
+
+    timed_sync(DOMTreeSerializer, "serialize_accessible_elements", "dom")
+    timed_async(Agent, "multi_act", "action")
+    timed_async(Agent, "step", "step", per_step=True)
+    timed_async(BrowserSession, "_navigate_and_wait", "page_load")
+
+async def _run_level(main, site, concurrency, runs, resume_path, reuse_users, current_run):
+    from task_queue import TaskQueue
+
+    stats = []
+
+    async def handler(request):
+        run = RunStats(len(stats))
+        stats.append(run)
+        token = current_run.set(run)
+        start = time.perf_counter()
+        try:
+            result = await main.execute_task(request)
+            run.ok = "submitted" in str(result.get("result", "")).lower()
+            return result
+        except Exception as e:
+            run.error = repr(e)
+            raise
+        finally:
+            run.wall = time.perf_counter() - start
+            current_run.reset(token)
+
+    main.browser_pool.max_size = max(main.browser_pool.max_size, concurrency)
+    queue = TaskQueue(handler, num_workers=concurrency)
+    await queue.start()
+    start = time.perf_counter()
+    records = []
+    for i in range(runs):
+        user = f"bench-user-{i % concurrency if reuse_users else i}@example.test"
+        records.append(queue.submit(main.TaskRequest(
+            url=f"{site.base_url}/jobs",
+            login_url=f"{site.base_url}/login",
+            resume_text="Backend engineer. Python, FastAPI, MongoDB. 4 years.",
+            resume_path=resume_path,
+            rules="Remote only",
+            username=user,
+            password="bench-password",
+            platform_name="BenchBoard",
+        )))
+    await asyncio.gather(*(r.done.wait() for r in records))
+    elapsed = time.perf_counter() - start
+    await queue.stop()
+    if not reuse_users:
+        await main.browser_pool.close()
+        await main.browser_pool.start()
+    return stats, elapsed
+
+def _summarize(concurrency, stats, elapsed):
+    steps = [s for run in stats for s in run.steps]
+    n_steps = max(1, len(steps))
+    return {
+        "concurrency": concurrency,
+        "runs": len(stats),
+        "succeeded": sum(1 for run in stats if run.ok),
+        "elapsed_s": round(elapsed, 2),
+        "runs_per_hour": round(len(stats) / elapsed * 3600, 1) if elapsed else 0.0,
+        "run_wall_median_s": round(statistics.median(run.wall for run in stats), 2) if stats else 0.0,
+        "steps": len(steps),
+        "step_median_s": round(statistics.median(steps), 3) if steps else 0.0,
+        "per_step_phase_s": {
+            phase: round(sum(run.phases[phase] for run in stats) / n_steps, 3) for phase in PHASES
+        },
+        "errors": [run.error for run in stats if run.error],
+    }
+
+async def _amain(args):
+    chrome = _find_chrome(args.chrome)
+    if not chrome:
+        print("❌ No Chromium found. Pass --chrome or set CHROME_EXECUTABLE.")
+        return 2
+
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    os.environ["CHROME_EXECUTABLE"] = chrome
+    os.environ["BROWSER_HEADLESS"] = "true"
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    # main.py writes debug_agent.log to the working directory; keep it out of the source tree.
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    os.chdir(workdir)
+    print(f"📂 [Bench] Logs in {workdir}")
+
+    import motor.motor_asyncio
+
+    # Every collection main.py opens (db.<name>) is in memory, whatever stores it has.
+    motor.motor_asyncio.AsyncIOMotorClient = InMemoryClient
+    import main
+    from fixture_site import FixtureSite
+    from scripted_llm import ScriptedLLM, current_run
+
+    from llm_limiter import LLMAdmissionController, RateLimitedLLM
+
+    main.llm_controller = LLMAdmissionController(rpm=args.rpm, tpm=args.tpm)
+    main.llm = RateLimitedLLM(ScriptedLLM(latency=args.llm_latency), main.llm_controller)
+    _instrument(current_run)
+
+    site = FixtureSite(n_jobs=25, latency=args.page_latency).start()
+    fd, resume_path = tempfile.mkstemp(suffix=".pdf", prefix="bench_resume_")
+    with os.fdopen(fd, "wb") as f:
+        f.write(b"%PDF-1.4\n% benchmark resume\n")
+
+    report = []
+    try:
+        await main.browser_pool.start()
+        for concurrency in args.concurrency:
+            runs = args.runs or concurrency * 2
+            print(f"⏱️ [Bench] concurrency={concurrency} runs={runs} ...")
+            stats, elapsed = await _run_level(
+                main, site, concurrency, runs, resume_path, args.reuse_users, current_run
+            )
+            summary = _summarize(concurrency, stats, elapsed)
+            report.append(summary)
+            phases = " ".join(f"{k}={v:.2f}s" for k, v in summary["per_step_phase_s"].items())
+            print(
+                f"   ok={summary['succeeded']}/{summary['runs']} runs/h={summary['runs_per_hour']} "
+                f"run={summary['run_wall_median_s']}s step={summary['step_median_s']}s | per step: {phases}"
+            )
+            llm = main.llm_controller.stats()
+            print(f"   llm: calls={llm['calls']} avg_wait={llm['avg_queue_wait_s']}s avg_model={llm['avg_model_s']}s")
+            for error in summary["errors"][:3]:
+                print(f"   ⚠️ {error}")
+    finally:
+        await main.browser_pool.close()
+        site.stop()
+        os.remove(resume_path)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"💾 Report written to {args.json}")
+    return 0 if all(r["succeeded"] == r["runs"] for r in report) else 1
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 2, 4])
+    parser.add_argument("--runs", type=int, default=0, help="runs per concurrency level (default 2x level)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="simulated seconds per LLM call")
+    parser.add_argument("--rpm", type=float, default=0, help="LLM requests/minute budget (0 = unlimited)")
+    parser.add_argument("--tpm", type=float, default=0, help="LLM tokens/minute budget (0 = unlimited)")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="simulated seconds per page request")
+    parser.add_argument("--reuse-users", action="store_true", help="cycle users so pooled browsers are reused")
+    parser.add_argument("--chrome", help="Chromium executable (default: search PATH)")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+    return asyncio.run(_amain(args))
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
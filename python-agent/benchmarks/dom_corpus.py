@@ -0,0 +1,195 @@
+"""
+Synthetic and saved DOM trees for benchmarking the patched DOMTreeSerializer.
+
+Trees are built straight from EnhancedDOMTreeNode objects, so no browser is
+needed. Saved trees live in benchmarks/dom_fixtures/*.json (see save_tree).
+"""
+import dataclasses
+import json
+import random
+from pathlib import Path
+
+from browser_use.dom.views import DOMRect, EnhancedDOMTreeNode, EnhancedSnapshotNode, NodeType
+
+FIXTURES_DIR = Path(__file__).parent / "dom_fixtures"
+
+_NODE_FIELDS = {f.name for f in dataclasses.fields(EnhancedDOMTreeNode)}
+_SNAPSHOT_FIELDS = {f.name for f in dataclasses.fields(EnhancedSnapshotNode)}
+
+class TreeBuilder:
+    """Hands out unique backend node IDs and fills fields the installed browser-use expects."""
+
+    def __init__(self, seed: int = 0):
+        self.rnd = random.Random(seed)
+        self.next_id = 1
+
+    def node(self, node_type, name, value="", attrs=None, children=None, visible=True, scrollable=False,
+             shadow_roots=None, content_document=None, bounds=(0, 0, 100, 20), styles=None):
+        backend_id = self.next_id
+        self.next_id += 1
+        snapshot = None
+        if bounds is not None:
+            rect = DOMRect(*bounds)
+            snap_values = {
+                "is_clickable": None, "cursor_style": None, "bounds": rect, "clientRects": rect,
+                "scrollRects": None, "computed_styles": styles or {}, "paint_order": backend_id,
+                "stacking_contexts": None,
+            }
+            snapshot = EnhancedSnapshotNode(**{k: v for k, v in snap_values.items() if k in _SNAPSHOT_FIELDS})
+        values = {
+            "node_id": backend_id, "backend_node_id": backend_id, "node_type": node_type, "node_name": name,
+            "node_value": value, "attributes": attrs or {}, "is_scrollable": scrollable, "is_visible": visible,
+            "absolute_position": None, "target_id": "bench-target", "frame_id": None, "session_id": None,
+            "content_document": content_document,
+            "shadow_root_type": "open" if node_type == NodeType.DOCUMENT_FRAGMENT_NODE else None,
+            "shadow_roots": shadow_roots, "parent_node": None, "children_nodes": children or [],
+            "ax_node": None, "snapshot_node": snapshot,
+        }
+        node = EnhancedDOMTreeNode(**{k: v for k, v in values.items() if k in _NODE_FIELDS})
+        for child in (children or []) + (shadow_roots or []):
+            child.parent_node = node
+        if content_document is not None:
+            content_document.parent_node = node
+        return node
+
+    def element(self, name, attrs=None, children=None, **kwargs):
+        return self.node(NodeType.ELEMENT_NODE, name.upper(), attrs=attrs, children=children, **kwargs)
+
+    def text(self, value, **kwargs):
+        return self.node(NodeType.TEXT_NODE, "#text", value=value, **kwargs)
+
+    def document(self, children):
+        return self.node(NodeType.DOCUMENT_NODE, "#document", children=children, bounds=None)
+
+    def fragment(self, children):
+        return self.node(NodeType.DOCUMENT_FRAGMENT_NODE, "#document-fragment", children=children, bounds=None)
+
+    def page(self, body_children):
+        head = self.element("head", children=[self.element("title"), self.element("script")])
+        return self.document([self.element("html", children=[head, self.element("body", children=body_children)])])
+
+    def form_field(self, index):
+        input_type = self.rnd.choice(["text", "email", "radio", "checkbox", "file", "number"])
+        # Hidden custom-styled radios/checkboxes/files are what the patch exists for.
+        visible = input_type not in ("radio", "checkbox", "file") or self.rnd.random() < 0.5
+        return self.element("div", {"class": "fb-form-element"}, children=[
+            self.element("label", {"for": f"q{index}"}, children=[self.text(f"Screening question {index}?")]),
+            self.element("input", {"type": input_type, "id": f"q{index}", "name": f"q{index}"}, visible=visible),
+        ])
+
+    def form(self, n_fields, start=0):
+        return self.element("form", children=[self.form_field(start + i) for i in range(n_fields)])
+
+def deep_nesting(depth: int = 600, seed: int = 0):
+    b = TreeBuilder(seed)
+    leaf = b.element("button", {"type": "button"}, children=[b.text("Easy Apply")])
+    for i in range(depth):
+        leaf = b.element("div", {"class": f"wrap-{i % 7}"}, children=[leaf])
+    return b.page([leaf])
+
+def many_inputs(n_fields: int = 3000, seed: int = 1):
+    b = TreeBuilder(seed)
+    sections = [b.form(100, start=i) for i in range(0, n_fields, 100)]
+    return b.page(sections)
+
+def shadow_roots(n_hosts: int = 300, seed: int = 2):
+    b = TreeBuilder(seed)
+    hosts = []
+    for i in range(n_hosts):
+        inner = b.fragment([b.element("button", children=[b.text(f"Shadow action {i}")]), b.form_field(i)])
+        hosts.append(b.element("custom-card", shadow_roots=[inner]))
+    return b.page(hosts)
+
+def iframes(n_frames: int = 40, seed: int = 3):
+    b = TreeBuilder(seed)
+    frames = []
+    for i in range(n_frames):
+        frame_doc = b.document([b.element("html", children=[b.element("body", children=[b.form(15, start=i * 15)])])])
+        frames.append(b.element("iframe", {"src": f"https://example.test/frame/{i}"}, content_document=frame_doc))
+    return b.page(frames)
+
+def job_board(n_cards: int = 500, seed: int = 4):
+    """Search results list plus an Easy Apply modal, roughly LinkedIn-shaped."""
+    b = TreeBuilder(seed)
+    cards = []
+    for i in range(n_cards):
+        cards.append(b.element("li", {"class": "job-card"}, children=[
+            b.element("a", {"href": f"https://jobs.example.test/view/{i}"}, children=[b.text(f"Engineer {i}")]),
+            b.element("span", children=[b.text("Remote")]),
+            b.element("svg", children=[b.element("path"), b.element("g")]),
+        ]))
+    results = b.element("ul", {"class": "jobs-list"}, children=cards, scrollable=True,
+                        styles={"overflow-y": "auto"})
+    modal = b.element("div", {"role": "dialog", "class": "artdeco-modal"}, children=[b.form(40)])
+    hidden = b.element("div", {"class": "offscreen"}, visible=False, children=[b.text("hidden text")])
+    return b.page([results, modal, hidden])
+
+SYNTHETIC = {
+    "deep_nesting": deep_nesting,
+    "many_inputs": many_inputs,
+    "shadow_roots": shadow_roots,
+    "iframes": iframes,
+    "job_board": job_board,
+}
+
+def mutate_one_section(root, seed: int = 0):
+    """Simulates a typical step: one form field flips visibility and type, the rest is untouched."""
+    rnd = random.Random(seed)
+    inputs = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.node_name == "INPUT":
+            inputs.append(node)
+        stack.extend(node.children_and_shadow_roots)
+        if node.content_document is not None:
+            stack.append(node.content_document)
+    if inputs:
+        target = rnd.choice(inputs)
+        target.is_visible = not target.is_visible
+        target.attributes["type"] = "radio" if target.attributes.get("type") != "radio" else "text"
+    return root
+
+# --- Saved trees ---
+
+def _to_dict(node):
+    snap = node.snapshot_node
+    return {
+        "type": int(node.node_type),
+        "name": node.node_name,
+        "value": node.node_value,
+        "attrs": node.attributes or {},
+        "visible": node.is_visible,
+        "scrollable": node.is_scrollable,
+        "bounds": [snap.bounds.x, snap.bounds.y, snap.bounds.width, snap.bounds.height] if snap and snap.bounds else None,
+        "styles": snap.computed_styles if snap else None,
+        "children": [_to_dict(c) for c in node.children_nodes or []],
+        "shadow": [_to_dict(c) for c in node.shadow_roots or []],
+        "content": _to_dict(node.content_document) if node.content_document else None,
+    }
+
+def _from_dict(b, data):
+    return b.node(
+        NodeType(data["type"]), data["name"], value=data["value"], attrs=data["attrs"],
+        children=[_from_dict(b, c) for c in data["children"]], visible=data["visible"],
+        scrollable=data["scrollable"], shadow_roots=[_from_dict(b, c) for c in data["shadow"]] or None,
+        content_document=_from_dict(b, data["content"]) if data["content"] else None,
+        bounds=tuple(data["bounds"]) if data["bounds"] else None, styles=data["styles"],
+    )
+
+def save_tree(root, name: str):
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    path = FIXTURES_DIR / f"{name}.json"
+    path.write_text(json.dumps(_to_dict(root)))
+    return path
+
+def load_tree(path):
+    return _from_dict(TreeBuilder(), json.loads(Path(path).read_text()))
+
+def corpus():
+    """Yields (name, factory) for every synthetic and saved tree."""
+    for name, factory in SYNTHETIC.items():
+        yield name, factory
+    if FIXTURES_DIR.exists():
+        for path in sorted(FIXTURES_DIR.glob("*.json")):
+            yield f"saved:{path.stem}", (lambda p=path: load_tree(p))
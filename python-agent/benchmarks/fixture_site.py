@@ -0,0 +1,83 @@
+"""
+Local job-site fixtures for offline end-to-end runs: login, search results
+and an Easy Apply modal with hidden radio and file inputs.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SITE_DIR = Path(__file__).parent / "site"
+
+class FixtureSite:
+    """Serves the fixture pages on 127.0.0.1 from a background thread."""
+
+    def __init__(self, n_jobs: int = 25, latency: float = 0.0, port: int = 0):
+        self.n_jobs = n_jobs
+        self.latency = latency
+        self.submissions = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def render(self, path: str):
+        if path in ("/", "/login"):
+            return (SITE_DIR / "login.html").read_text()
+        if path == "/jobs":
+            cards = "\n".join(
+                f'<li class="job-card"><a id="job-{i}" href="/jobs/view/{i}">Software Engineer {i}</a> <span>Remote</span></li>'
+                for i in range(1, self.n_jobs + 1)
+            )
+            return (SITE_DIR / "jobs.html").read_text().replace("<!--JOB_CARDS-->", cards)
+        if path.startswith("/jobs/view/"):
+            job_id = path.rsplit("/", 1)[-1]
+            if job_id.isdigit() and 1 <= int(job_id) <= self.n_jobs:
+                return (SITE_DIR / "job.html").read_text().replace("{{JOB_ID}}", job_id)
+        return None
+
+    def _handler_class(site):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if site.latency:
+                    time.sleep(site.latency)
+                body = site.render(self.path.split("?", 1)[0])
+                if body is None:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = self.rfile.read(length) if length else b"{}"
+                if self.path != "/api/apply":
+                    self.send_error(404)
+                    return
+                with site._lock:
+                    site.submissions.append(json.loads(payload or b"{}"))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
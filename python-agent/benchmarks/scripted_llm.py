@@ -0,0 +1,150 @@
+"""
+Deterministic stand-in for the global ChatGoogle `llm`.
+
+It reads the page marker (PAGE:login, PAGE:search, ...) and element indices
+from the agent's browser-state message and answers with the same actions a
+well-behaved model would take on the fixture site. Latency is simulated with
+a fixed sleep so runs are comparable across machines.
+"""
+import asyncio
+import contextvars
+import re
+import time
+
+from pydantic import ValidationError
+
+# Set by the harness per run; the stub adds its timings to it.
+current_run = contextvars.ContextVar("current_run", default=None)
+
+ELEMENT_RE = re.compile(r"\[(\d+)\]<\w+[^\n]*?\bid=([\w-]+)")
+FILE_PATH_RE = re.compile(r"FILE PATH: (\S+)")
+
+# Current browser-use action names first, then the names older releases used.
+ACTION_ALIASES = {
+    "click": ("click", "click_element_by_index"),
+    "input": ("input", "input_text"),
+    "upload_file": ("upload_file",),
+    "done": ("done",),
+}
+
+def _message_text(message):
+    content = getattr(message, "content", "")
+    if isinstance(content, str):
+        return content
+    parts = []
+    for part in content or []:
+        text = getattr(part, "text", None)
+        if text:
+            parts.append(text)
+    return "\n".join(parts)
+
+class ScriptedLLM:
+    """Implements the browser-use chat model protocol without any network calls."""
+
+    _verified_api_keys = True
+
+    def __init__(self, latency: float = 0.0, model: str = "scripted-fixture-model"):
+        self.model = model
+        self.latency = latency
+        self.calls = 0
+
+    @property
+    def provider(self):
+        return "scripted"
+
+    @property
+    def name(self):
+        return self.model
+
+    @property
+    def model_name(self):
+        return self.model
+
+    async def ainvoke(self, messages, output_format=None, **kwargs):
+        from browser_use.llm.views import ChatInvokeCompletion, ChatInvokeUsage
+
+        start = time.perf_counter()
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        texts = [_message_text(m) for m in messages]
+        if output_format is None:
+            completion = "ok"
+        elif "action" in getattr(output_format, "model_fields", {}):
+            completion = self._agent_output(output_format, texts)
+        else:
+            # Judges / extraction helpers: an empty instance is enough for benchmarking.
+            try:
+                completion = output_format.model_validate({})
+            except ValidationError:
+                completion = output_format.model_construct()
+
+        run = current_run.get()
+        if run is not None:
+            run.add_phase("llm", time.perf_counter() - start)
+
+        prompt_chars = sum(len(t) for t in texts)
+        usage = ChatInvokeUsage(
+            prompt_tokens=prompt_chars // 4, prompt_cached_tokens=None, prompt_cache_creation_tokens=None,
+            prompt_image_tokens=None, completion_tokens=50, total_tokens=prompt_chars // 4 + 50,
+        )
+        return ChatInvokeCompletion(completion=completion, usage=usage)
+
+    def _agent_output(self, output_format, texts):
+        state = texts[-1] if texts else ""
+        task = next((t for t in texts if "FILE PATH:" in t), "")
+        elements = {element_id: int(index) for index, element_id in ELEMENT_RE.findall(state)}
+        actions, goal = self._policy(state, task, elements)
+        return self._validate(output_format, actions, goal)
+
+    def _policy(self, state, task, elements):
+        if "PAGE:submitted" in state:
+            return [("done", {"text": "Application submitted", "success": True})], "finish"
+
+        if "PAGE:login" in state and "email" in elements:
+            return [
+                ("input", {"index": elements["email"], "text": "bench@example.test"}),
+                ("input", {"index": elements["password"], "text": "bench-password"}),
+                ("click", {"index": elements["signin"]}),
+            ], "log in"
+
+        if "PAGE:search" in state:
+            if "accept-cookies" in elements:
+                return [("click", {"index": elements["accept-cookies"]})], "dismiss cookie banner"
+            job_link = next((k for k in elements if k.startswith("job-")), None)
+            if job_link:
+                return [("click", {"index": elements[job_link]})], "open first job"
+
+        if "phone" in elements and "submit-application" in elements:
+            file_match = FILE_PATH_RE.search(task)
+            actions = [("input", {"index": elements["phone"], "text": "5550100"})]
+            if "auth-yes" in elements:
+                actions.append(("click", {"index": elements["auth-yes"]}))
+            if file_match and "resume" in elements:
+                actions.append(("upload_file", {"index": elements["resume"], "path": file_match.group(1)}))
+            actions.append(("click", {"index": elements["submit-application"]}))
+            return actions, "fill and submit the application"
+
+        if "PAGE:job" in state and "easy-apply" in elements:
+            return [("click", {"index": elements["easy-apply"]})], "open easy apply"
+
+        return [("done", {"text": "Fixture page not recognised", "success": False})], "give up"
+
+    def _validate(self, output_format, actions, goal):
+        last_error = None
+        for alias_set in range(max(len(v) for v in ACTION_ALIASES.values())):
+            payload = {
+                "evaluation_previous_goal": "Scripted",
+                "memory": "",
+                "next_goal": goal,
+                "action": [
+                    {ACTION_ALIASES[name][min(alias_set, len(ACTION_ALIASES[name]) - 1)]: params}
+                    for name, params in actions
+                ],
+            }
+            try:
+                return output_format.model_validate(payload)
+            except ValidationError as e:
+                last_error = e
+        raise last_error
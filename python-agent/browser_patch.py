@@ -2,21 +2,32 @@ import logging
 from browser_use.dom.serializer.serializer import DOMTreeSerializer
 from browser_use.dom.views import NodeType, SimplifiedNode
 
+import metrics
+
 logger = logging.getLogger(__name__)
 
+# Tag lookups, built once instead of on every node visit. 'clipPath' is kept
+# mixed-case on purpose: names are lower-cased before lookup, so it has never
+# matched and changing that would change the serialized output.
+DISABLED_ELEMENTS = frozenset({'style', 'script', 'head', 'meta', 'link', 'title'})
+SVG_ELEMENTS = frozenset({'path', 'rect', 'g', 'circle', 'ellipse', 'line', 'polyline', 'polygon', 'use', 'defs', 'clipPath', 'mask', 'pattern', 'image', 'text', 'tspan'})
+INPUT_EXCEPTION_TYPES = ('file', 'radio', 'checkbox')
+SHADOW_FORM_TAGS = ('input', 'button', 'select', 'textarea', 'a')
+FRAME_NAMES = ('IFRAME', 'FRAME')
+
 def apply_patches():
     """Applies the LinkedIn radio button fix via monkey-patching."""
-    
-    # Store original methods
-    original_create = DOMTreeSerializer._create_simplified_tree
-    original_optimize = DOMTreeSerializer._optimize_tree
-    original_assign = DOMTreeSerializer._assign_interactive_indices_and_mark_new_nodes
 
-    def patched_create_simplified_tree(self, node, depth=0):
+    def create_steps(self, node):
+        """
+        Create pass for a single node, written as a generator: it yields each
+        child it needs and receives that child's SimplifiedNode back. The driver
+        below runs these on an explicit stack, so deep DOMs never recurse.
+        """
         # 1. Handle Document/Fragment nodes
         if node.node_type == NodeType.DOCUMENT_NODE:
             for child in node.children_and_shadow_roots:
-                simplified_child = self._create_simplified_tree(child, depth + 1)
+                simplified_child = yield child
                 if simplified_child:
                     return simplified_child
             return None
@@ -24,7 +35,7 @@ def apply_patches():
         if node.node_type == NodeType.DOCUMENT_FRAGMENT_NODE:
             simplified = SimplifiedNode(original_node=node, children=[])
             for child in node.children_and_shadow_roots:
-                simplified_child = self._create_simplified_tree(child, depth + 1)
+                simplified_child = yield child
                 if simplified_child:
                     simplified.children.append(simplified_child)
             return simplified if simplified.children else SimplifiedNode(original_node=node, children=[])
@@ -32,11 +43,9 @@ def apply_patches():
         # 2. Handle Element nodes
         elif node.node_type == NodeType.ELEMENT_NODE:
             # Skip non-content elements and SVG children
-            DISABLED_ELEMENTS = {'style', 'script', 'head', 'meta', 'link', 'title'}
-            SVG_ELEMENTS = {'path', 'rect', 'g', 'circle', 'ellipse', 'line', 'polyline', 'polygon', 'use', 'defs', 'clipPath', 'mask', 'pattern', 'image', 'text', 'tspan'}
-            
-            if node.node_name.lower() in DISABLED_ELEMENTS: return None
-            if node.node_name.lower() in SVG_ELEMENTS: return None
+            node_name = node.node_name.lower()
+            if node_name in DISABLED_ELEMENTS: return None
+            if node_name in SVG_ELEMENTS: return None
 
             # Handle exclusion attributes
             attributes = node.attributes or {}
@@ -45,23 +54,24 @@ def apply_patches():
                 if attributes.get(f'data-browser-use-exclude-{self.session_id}') == 'true': return None
 
             # Handle iframes
-            if node.node_name in ['IFRAME', 'FRAME']:
+            if node.node_name in FRAME_NAMES:
                 if node.content_document:
                     simplified = SimplifiedNode(original_node=node, children=[])
                     for child in node.content_document.children_nodes or []:
-                        simplified_child = self._create_simplified_tree(child, depth + 1)
+                        simplified_child = yield child
                         if simplified_child: simplified.children.append(simplified_child)
                     return simplified
 
+            children = node.children_and_shadow_roots
             is_visible = node.is_visible
             is_scrollable = node.is_actually_scrollable
-            has_shadow_content = bool(node.children_and_shadow_roots)
-            is_shadow_host = any(child.node_type == NodeType.DOCUMENT_FRAGMENT_NODE for child in node.children_and_shadow_roots)
+            has_shadow_content = bool(children)
+            is_shadow_host = any(child.node_type == NodeType.DOCUMENT_FRAGMENT_NODE for child in children)
 
             # --- DEEP FIX: Force visibility for radio/checkbox/file inputs ---
             is_input_exception = (
                 node.tag_name and node.tag_name.lower() == 'input' 
-                and attributes.get('type') in ['file', 'radio', 'checkbox']
+                and attributes.get('type') in INPUT_EXCEPTION_TYPES
             )
             if not is_visible and is_input_exception:
                 is_visible = True
@@ -69,8 +79,8 @@ def apply_patches():
 
             if is_visible or is_scrollable or has_shadow_content or is_shadow_host:
                 simplified = SimplifiedNode(original_node=node, children=[], is_shadow_host=is_shadow_host)
-                for child in node.children_and_shadow_roots:
-                    simplified_child = self._create_simplified_tree(child, depth + 1)
+                for child in children:
+                    simplified_child = yield child
                     if simplified_child: simplified.children.append(simplified_child)
                 
                 self._add_compound_components(simplified, node)
@@ -85,58 +95,93 @@ def apply_patches():
 
         return None
 
+    def patched_create_simplified_tree(self, node, depth=0):
+        stack = [create_steps(self, node)]
+        result = None
+        while stack:
+            try:
+                child = stack[-1].send(result)
+            except StopIteration as done:
+                stack.pop()
+                result = done.value
+                continue
+            stack.append(create_steps(self, child))
+            result = None
+        return result
+
     def patched_optimize_tree(self, node):
         if not node: return None
-        optimized_children = []
-        for child in node.children:
-            optimized_child = self._optimize_tree(child)
-            if optimized_child: optimized_children.append(optimized_child)
-        node.children = optimized_children
-
-        is_visible = node.original_node.snapshot_node and node.original_node.is_visible
-        
-        # --- DEEP FIX: Keep radio/checkbox/file inputs during optimization ---
-        is_input_exception = (
-            node.original_node.tag_name
-            and node.original_node.tag_name.lower() == 'input'
-            and node.original_node.attributes.get('type') in ['file', 'radio', 'checkbox']
-        )
-        # ---------------------------------------------------------------------
-
-        if (is_visible or node.original_node.is_actually_scrollable or 
-            node.original_node.node_type == NodeType.TEXT_NODE or 
-            node.children or is_input_exception):
-            return node
-        return None
+
+        # Reverse pre-order visits every child before its parent.
+        order = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            order.append(current)
+            stack.extend(current.children)
+
+        kept = set()
+        for current in reversed(order):
+            current.children = [child for child in current.children if id(child) in kept]
+            original = current.original_node
+
+            is_visible = original.snapshot_node and original.is_visible
+
+            # --- DEEP FIX: Keep radio/checkbox/file inputs during optimization ---
+            is_input_exception = (
+                original.tag_name
+                and original.tag_name.lower() == 'input'
+                and original.attributes.get('type') in INPUT_EXCEPTION_TYPES
+            )
+            # ---------------------------------------------------------------------
+
+            if (is_visible or original.is_actually_scrollable or 
+                original.node_type == NodeType.TEXT_NODE or 
+                current.children or is_input_exception):
+                kept.add(id(current))
+
+        return node if id(node) in kept else None
 
     def patched_assign_indices(self, node):
         if not node: return
-        if not node.excluded_by_parent and not node.ignored_by_paint_order:
-            is_interactive_assign = self._is_interactive_cached(node.original_node)
-            is_visible = node.original_node.snapshot_node and node.original_node.is_visible
-            is_scrollable = node.original_node.is_actually_scrollable
+
+        # Built once per serialization instead of once per interactive node.
+        previous_ids = None
+        if self._previous_cached_selector_map:
+            previous_ids = {n.backend_node_id for n in self._previous_cached_selector_map.values()}
+
+        # Explicit pre-order stack keeps index assignment order identical to the recursive walk.
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            stack.extend(reversed(node.children))
+            if node.excluded_by_parent or node.ignored_by_paint_order:
+                continue
+
+            original = node.original_node
+            is_interactive_assign = self._is_interactive_cached(original)
+            is_visible = original.snapshot_node and original.is_visible
+            is_scrollable = original.is_actually_scrollable
+            tag_name = (original.tag_name or '').lower()
             
             # --- DEEP FIX: Exception for hidden radio/checkbox/file inputs ---
             is_input_exception = (
-                node.original_node.tag_name
-                and node.original_node.tag_name.lower() == 'input'
-                and node.original_node.attributes.get('type') in ['file', 'radio', 'checkbox']
+                tag_name == 'input'
+                and original.attributes.get('type') in INPUT_EXCEPTION_TYPES
             )
             # -----------------------------------------------------------------
 
             is_shadow_dom_element = (
                 is_interactive_assign
-                and not node.original_node.snapshot_node
-                and node.original_node.tag_name
-                and node.original_node.tag_name.lower() in ['input', 'button', 'select', 'textarea', 'a']
+                and not original.snapshot_node
+                and tag_name in SHADOW_FORM_TAGS
                 and self._is_inside_shadow_dom(node)
             )
 
             should_make_interactive = False
             if is_scrollable:
-                attrs = node.original_node.attributes or {}
+                attrs = original.attributes or {}
                 role = attrs.get('role', '').lower()
-                tag_name = (node.original_node.tag_name or '').lower()
                 class_attr = attrs.get('class', '').lower()
                 is_dropdown = (role in ('listbox', 'menu', 'combobox') or tag_name == 'select' or 'dropdown' in class_attr)
                 if is_dropdown: should_make_interactive = True
@@ -146,20 +191,27 @@ def apply_patches():
 
             if should_make_interactive:
                 node.is_interactive = True
-                self._selector_map[node.original_node.backend_node_id] = node.original_node
+                self._selector_map[original.backend_node_id] = original
                 self._interactive_counter += 1
                 if node.is_compound_component: node.is_new = True
-                elif self._previous_cached_selector_map:
-                    previous_ids = {n.backend_node_id for n in self._previous_cached_selector_map.values()}
-                    if node.original_node.backend_node_id not in previous_ids: node.is_new = True
-
-        for child in node.children:
-            self._assign_interactive_indices_and_mark_new_nodes(child)
+                elif previous_ids is not None:
+                    if original.backend_node_id not in previous_ids: node.is_new = True
 
     # Apply patches
     DOMTreeSerializer._create_simplified_tree = patched_create_simplified_tree
     DOMTreeSerializer._optimize_tree = patched_optimize_tree
     DOMTreeSerializer._assign_interactive_indices_and_mark_new_nodes = patched_assign_indices
+
+    # Time every full serializer pass for /metrics and per-run traces.
+    serialize = getattr(DOMTreeSerializer.serialize_accessible_elements, "__wrapped_by_metrics__", None)
+    serialize = serialize or DOMTreeSerializer.serialize_accessible_elements
+
+    def timed_serialize_accessible_elements(self):
+        with metrics.span(metrics.DOM_SECONDS, "dom_serialize"):
+            return serialize(self)
+
+    timed_serialize_accessible_elements.__wrapped_by_metrics__ = serialize
+    DOMTreeSerializer.serialize_accessible_elements = timed_serialize_accessible_elements
     
     logger.info("✅ Patched browser-use DOMTreeSerializer for LinkedIn radio button support.")
     print("✅ Patched browser-use DOMTreeSerializer for LinkedIn radio button support.")
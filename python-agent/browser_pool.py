@@ -0,0 +1,183 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import metrics
+
+class PooledBrowser:
+    """A started browser bound to one (username, platform) pair."""
+
+    def __init__(self, key, browser):
+        self.key = key
+        self.browser = browser
+        self.in_use = False
+        self.created_at = time.time()
+        self.last_used = time.time()
+        self.uses = 0
+
+class BrowserPool:
+    """
+    Keeps browsers alive between tasks so Chrome startup and storage-state
+    replay are paid once per (username, platform) instead of once per job.
+    Each key gets its own browser, so cookies never leak between users.
+    """
+
+    def __init__(self, profile_factory, max_size: int = 4, idle_ttl: float = 900.0, health_timeout: float = 5.0,
+                 on_launch=None):
+        self.profile_factory = profile_factory
+        self.on_launch = on_launch
+        self.max_size = max(1, max_size)
+        self.idle_ttl = idle_ttl
+        self.health_timeout = health_timeout
+        self.entries = {}
+        self._cond = asyncio.Condition()
+        self._reaper = None
+
+    @staticmethod
+    def make_key(username: str, platform: str):
+        return (username or "", (platform or "").lower())
+
+    async def start(self):
+        if self._reaper is None:
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def close(self):
+        if self._reaper:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        async with self._cond:
+            entries = list(self.entries.values())
+            self.entries.clear()
+        for entry in entries:
+            await self._stop(entry)
+        print("🛑 [Pool] All pooled browsers stopped.")
+
+    @asynccontextmanager
+    async def lease(self, username: str, platform: str, storage_state=None):
+        """Yields a healthy started browser for the key, reserved for the caller."""
+        entry = await self._acquire(self.make_key(username, platform), storage_state)
+        try:
+            yield entry.browser
+        except BaseException:
+            # A crashed run may leave the browser in a bad state; don't hand it out again.
+            await self._discard(entry)
+            raise
+        else:
+            await self._release(entry)
+
+    async def prewarm(self, username: str, platform: str, storage_state=None):
+        """Launches the key's browser ahead of its first task and leaves it idle in the pool."""
+        entry = await self._acquire(self.make_key(username, platform), storage_state)
+        entry.uses -= 1  # not a task
+        await self._release(entry)
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "in_use": sum(1 for e in self.entries.values() if e.in_use),
+            "keys": [f"{k[0]}@{k[1]}" for k in self.entries],
+        }
+
+    async def _acquire(self, key, storage_state):
+        async with self._cond:
+            while True:
+                entry = self.entries.get(key)
+                if entry and not entry.in_use:
+                    entry.in_use = True
+                    break
+                if entry is None:
+                    if len(self.entries) < self.max_size or await self._evict_one_idle():
+                        # Reserve the slot before launching so concurrent callers see it.
+                        entry = PooledBrowser(key, None)
+                        entry.in_use = True
+                        self.entries[key] = entry
+                        break
+                await self._cond.wait()
+
+        if entry.browser is not None and not await self._is_healthy(entry):
+            print(f"🩺 [Pool] Browser for {key} failed health check, relaunching.")
+            await self._stop(entry)
+            entry.browser = None
+
+        if entry.browser is None:
+            try:
+                entry.browser = await self._launch(storage_state)
+                if self.on_launch:
+                    await self.on_launch(entry.browser, key)
+            except BaseException:
+                async with self._cond:
+                    self.entries.pop(key, None)
+                    self._cond.notify_all()
+                raise
+            entry.created_at = time.time()
+            print(f"🚀 [Pool] Launched browser for {key} ({len(self.entries)}/{self.max_size}).")
+        else:
+            print(f"♻️ [Pool] Reusing warm browser for {key} (uses={entry.uses}).")
+
+        entry.uses += 1
+        return entry
+
+    async def _release(self, entry):
+        async with self._cond:
+            entry.in_use = False
+            entry.last_used = time.time()
+            self._cond.notify_all()
+
+    async def _discard(self, entry):
+        async with self._cond:
+            if self.entries.get(entry.key) is entry:
+                del self.entries[entry.key]
+            self._cond.notify_all()
+        await self._stop(entry)
+
+    async def _launch(self, storage_state):
+        from browser_use import Browser
+
+        profile = self.profile_factory(storage_state)
+        browser = Browser(browser_profile=profile)
+        with metrics.span(metrics.BROWSER_SECONDS, "browser_launch", op="launch"):
+            await browser.start()
+        return browser
+
+    async def _is_healthy(self, entry):
+        try:
+            await asyncio.wait_for(entry.browser.get_current_page_url(), timeout=self.health_timeout)
+            return True
+        except Exception:
+            return False
+
+    async def _stop(self, entry):
+        if entry.browser is None:
+            return
+        try:
+            with metrics.span(metrics.BROWSER_SECONDS, "browser_stop", op="stop"):
+                await entry.browser.kill()
+        except Exception as e:
+            print(f"⚠️ [Pool] Error stopping browser for {entry.key}: {e}")
+
+    async def _evict_one_idle(self):
+        """Stops the least recently used idle browser. Caller holds the lock."""
+        idle = [e for e in self.entries.values() if not e.in_use]
+        if not idle:
+            return False
+        victim = min(idle, key=lambda e: e.last_used)
+        del self.entries[victim.key]
+        print(f"🧹 [Pool] Evicting {victim.key} to make room.")
+        asyncio.create_task(self._stop(victim))
+        return True
+
+    async def _reap_loop(self):
+        while True:
+            await asyncio.sleep(min(60.0, self.idle_ttl))
+            now = time.time()
+            async with self._cond:
+                expired = [e for e in self.entries.values() if not e.in_use and now - e.last_used > self.idle_ttl]
+                for entry in expired:
+                    del self.entries[entry.key]
+                if expired:
+                    self._cond.notify_all()
+            for entry in expired:
+                print(f"🧹 [Pool] Browser for {entry.key} idle for {int(now - entry.last_used)}s, stopping.")
+                await self._stop(entry)
@@ -0,0 +1,301 @@
+import re
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from session_capture import LOGIN_PATH_HINTS
+
+# Actions replayed as recorded (element ones are re-located on the live page first).
+REPLAY_ACTIONS = {"click", "input", "upload_file", "select_dropdown", "send_keys", "scroll", "wait", "go_back"}
+
+# Actions without an effect on the page; dropped from traces.
+PASSIVE_ACTIONS = {
+    "remember_answer", "check_applied", "mark_job_applied", "dropdown_options", "find_text", "screenshot",
+    "read_file", "write_file", "replace_file",
+}
+
+# Request values that are written into traces as placeholders, never verbatim.
+TEMPLATE_FIELDS = ("password", "username", "resume_path")
+
+# Parameter holding what an action types or picks. Traces keep it only as a
+# placeholder: a request value, or "{answer:<field label>}" for the user's
+# saved answer to that field. A value that is neither ends the trace.
+VALUE_PARAMS = {"input": "text", "select_dropdown": "text", "upload_file": "path"}
+
+# send_keys is replayed only for keys that don't type anything.
+CONTROL_KEYS = re.compile(r"(?:(?:Control|Shift|Alt|Meta)\+)*(?:Enter|Tab|Escape|Backspace|Space|Arrow(?:Up|Down|Left|Right)|Page(?:Up|Down)|Home|End)")
+
+# Elements whose labels make up a page's form signature.
+FORM_TAGS = {"input", "select", "textarea"}
+FORM_ROLES = {"textbox", "combobox", "listbox", "radio", "checkbox", "spinbutton", "switch"}
+
+def url_route(url: str) -> str:
+    """Host and path with IDs blanked: linkedin.com/jobs/view/{id}. Pages of one flow share a route."""
+    parts = urlsplit(url or "")
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = re.sub(r"[0-9a-f]{8}-[0-9a-f-]{27}", "{id}", parts.path.lower())
+    path = re.sub(r"\d{3,}", "{id}", path).rstrip("/")
+    return host + path
+
+def _on_login_page(url: str) -> bool:
+    parts = urlsplit(url or "")
+    return any(h in f"{parts.path}?{parts.query}".lower() for h in LOGIN_PATH_HINTS)
+
+def _field_label(ax_name, attributes) -> str:
+    """A form field's visible label, with long numbers (per-job IDs) blanked."""
+    attributes = attributes or {}
+    label = ax_name or attributes.get("aria-label") or attributes.get("placeholder") or ""
+    label = re.sub(r"\d{3,}", "{n}", " ".join(label.split()).lower())[:120]
+    return label or f"<{attributes.get('type', 'field')}>"
+
+def form_signature(state) -> list:
+    """Sorted labels of the form fields on a page (browser-use BrowserStateSummary)."""
+    labels = []
+    for node in (state.dom_state.selector_map if state and state.dom_state else {}).values():
+        attributes = node.attributes or {}
+        role = (node.ax_node.role if node.ax_node else None) or attributes.get("role")
+        if node.tag_name.lower() not in FORM_TAGS and role not in FORM_ROLES:
+            continue
+        if attributes.get("type", "").lower() in ("hidden", "submit", "button", "image", "reset"):
+            continue
+        labels.append(_field_label(node.ax_node.name if node.ax_node else None, attributes))
+    return sorted(labels)
+
+class FlowRecorder:
+    """Form signature of the page each step of a run started on, by step number."""
+
+    def __init__(self):
+        self.forms = {}
+
+    def attach(self, agent):
+        manager = agent._message_manager
+        original = manager.prepare_step_state
+
+        def prepare_step_state(*args, **kwargs):
+            state = kwargs.get("browser_state_summary", args[0] if args else None)
+            try:
+                self.forms[agent.state.n_steps] = form_signature(state)
+            except Exception as e:
+                print(f"⚠️ [Replay] Could not read the form on step {agent.state.n_steps}: {e}")
+            return original(*args, **kwargs)
+
+        manager.prepare_step_state = prepare_step_state
+
+def _template(value, values: dict):
+    for field, actual in values.items():
+        if value == actual:
+            return "{" + field + "}"
+    return None
+
+def _fill(value, values: dict, answer_of):
+    """The live value for a placeholder, or None if this request has none."""
+    if value.startswith("{answer:") and value.endswith("}"):
+        return answer_of(value[len("{answer:"):-1])
+    if value.startswith("{") and value.endswith("}"):
+        return values.get(value[1:-1])
+    return None
+
+def template_values(request) -> dict:
+    return {f: getattr(request, f) for f in TEMPLATE_FIELDS if getattr(request, f, "")}
+
+def build_trace(history_items, values: dict, start_url: str, forms: dict, answer_of) -> tuple:
+    """
+    Replayable steps of a finished run: (steps, complete). Each step keeps the
+    form signature of the page it ran on. Typed and picked values are kept
+    only as placeholders (see VALUE_PARAMS); answer_of(label) gives the
+    user's saved answer for a field. The trace stops at the first action that
+    can't be replayed blind (extract, custom form tools, navigation elsewhere,
+    a value typed from nowhere, a page without a recorded form); complete
+    means it reached a successful done.
+    """
+    start_route = url_route(start_url)
+    steps = []
+    for item in history_items:
+        if not item.model_output or not item.state:
+            continue
+        if any(r.error for r in item.result):
+            continue  # the original step failed; nothing to repeat
+        if _on_login_page(item.state.url):
+            continue  # logins depend on session state, not on the flow
+        elements = item.state.interacted_element or []
+        form = forms.get(item.metadata.step_number) if item.metadata else None
+        for i, action in enumerate(item.model_output.action):
+            data = action.model_dump(exclude_unset=True)
+            name = next(iter(data), None)
+            params = dict(data.get(name)) if isinstance(data.get(name), dict) else {}
+            if name in PASSIVE_ACTIONS:
+                continue
+            if name == "navigate" and url_route(params.get("url", "")) == start_route:
+                continue  # opening the job itself; replay starts there
+            if name == "done":
+                return steps, bool(params.get("success", True))
+            if name not in REPLAY_ACTIONS or form is None:
+                return steps, False
+            if name == "send_keys" and not CONTROL_KEYS.fullmatch(params.get("keys", "")):
+                return steps, False
+            element = elements[i] if i < len(elements) else None
+            param = VALUE_PARAMS.get(name)
+            if param:
+                value = str(params.get(param, ""))
+                label = _field_label(element.ax_name, element.attributes) if element is not None else None
+                placeholder = _template(value, values)
+                if placeholder is None and label and answer_of(label) == value:
+                    placeholder = "{answer:" + label + "}"
+                if placeholder is None:
+                    return steps, False  # typed from the model's own reading of this job; not reusable
+                params[param] = placeholder
+            steps.append({
+                "route": url_route(item.state.url),
+                "form": form,
+                "action": {name: params},
+                "element": element.to_dict() if element is not None else None,
+            })
+    return steps, False
+
+def _element(data: dict):
+    from browser_use.dom.views import DOMInteractedElement, NodeType
+
+    return DOMInteractedElement(
+        node_id=data["node_id"],
+        backend_node_id=data["backend_node_id"],
+        frame_id=data.get("frame_id"),
+        node_type=NodeType(data["node_type"]),
+        node_value=data.get("node_value", ""),
+        node_name=data["node_name"],
+        attributes=data.get("attributes"),
+        bounds=None,
+        x_path=data.get("x_path", ""),
+        element_hash=data["element_hash"],
+        stable_hash=data.get("stable_hash"),
+        ax_name=data.get("ax_name"),
+    )
+
+async def replay(agent, steps: list, values: dict, answer_of) -> dict:
+    """
+    Runs recorded steps on the agent's browser without the LLM, except the
+    last one: the final step (the submit, for a complete flow) is always left
+    to the agent, which must see the confirmation before it reports success.
+    Before each step the page route and its form fields must match the
+    recording, every value must be re-derived for this request, and the
+    target element must be found (browser-use's hash -> stable hash -> xpath
+    -> accessible name -> attribute matching); the first mismatch ends the
+    replay. Returns {"replayed", "miss", "seconds"}.
+    """
+    session = agent.browser_session
+    start = time.monotonic()
+    replayed = 0
+    miss = None
+    for step in steps[:-1]:
+        try:
+            miss = await _replay_step(agent, session, step, values, answer_of, replayed + 1)
+        except Exception as e:
+            miss = f"step {replayed + 1}: {type(e).__name__}: {str(e)[:200]}"
+        if miss:
+            break
+        replayed += 1
+    return {"replayed": replayed, "miss": miss, "seconds": round(time.monotonic() - start, 2)}
+
+async def _replay_step(agent, session, step: dict, values: dict, answer_of, number: int):
+    """Runs one recorded step; returns why it couldn't, or None."""
+    current = url_route(await session.get_current_page_url())
+    if current != step["route"]:
+        return f"step {number}: on {current}, recorded on {step['route']}"
+    if "form" not in step:
+        return f"step {number}: recorded without its form"
+    state = await session.get_browser_state_summary(include_screenshot=False)
+    form = form_signature(state)
+    if form != step["form"]:
+        changed = sorted(set(form) ^ set(step["form"]))[:3]
+        return f"step {number}: the form differs from the recording ({', '.join(changed) or 'field count'})"
+    name, params = next(iter(step["action"].items()))
+    params = dict(params)
+    param = VALUE_PARAMS.get(name)
+    if param:
+        value = _fill(params.get(param, ""), values, answer_of)
+        if value is None:
+            return f"step {number}: no value for {params.get(param)} ({name})"
+        params[param] = value
+    action = agent.ActionModel(**{name: params})
+    if step["element"]:
+        element = _element(step["element"])
+        action = await agent._update_action_indices(element, action, state)
+        if action is None:
+            label = element.ax_name or (element.attributes or {}).get("aria-label") or element.node_name
+            return f"step {number}: no element matching '{label}' ({name})"
+    results = await agent.multi_act([action])
+    errors = [r.error for r in results if r.error]
+    if errors or not results:
+        return f"step {number}: {name} failed: {(errors or ['no result'])[0][:200]}"
+    return None
+
+class FlowStore:
+    """
+    Recorded application flows, one per (user, platform, route of the job
+    URL), e.g. every LinkedIn /jobs/view/{id} Easy Apply for a user. Traces
+    hold element descriptors, the form on each page and templated values
+    (request values and saved answers are placeholders). Every replay ends
+    with the agent; a run that succeeds records its combined trace, replacing
+    the one it started from.
+    """
+
+    def __init__(self, collection, min_steps: int = 2):
+        self.collection = collection
+        self.min_steps = min_steps
+        self.counters = Counter()
+        self.replay_s = 0.0
+
+    @staticmethod
+    def flow_id(username: str, platform: str, url: str) -> str:
+        return f"{username}|{(platform or '').lower()}|{url_route(url)}"
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("platform_name", 1), ("route", 1)], name="flows_platform_route")
+
+    async def get(self, username: str, platform: str, url: str):
+        doc = await self.collection.find_one({"_id": self.flow_id(username, platform, url)})
+        return doc if doc and doc.get("steps") else None
+
+    async def save(self, username: str, platform: str, url: str, steps: list, complete: bool) -> bool:
+        if len(steps) < self.min_steps:
+            return False
+        await self.collection.update_one(
+            {"_id": self.flow_id(username, platform, url)},
+            {
+                "$set": {
+                    "username": username,
+                    "platform_name": (platform or "").lower(),
+                    "route": url_route(url),
+                    "steps": steps,
+                    "complete": complete,
+                    "recorded_at": time.time(),
+                    "recorded_from": url,
+                },
+                "$setOnInsert": {"replays": 0, "replay_hits": 0, "replay_misses": 0},
+            },
+            upsert=True,
+        )
+        self.counters["recorded"] += 1
+        return True
+
+    async def record_replay(self, flow: dict, outcome: dict):
+        self.counters["replays"] += 1
+        self.counters["steps_replayed"] += outcome["replayed"]
+        self.counters["stopped_early" if outcome["miss"] else "handed_off_at_submit"] += 1
+        self.replay_s += outcome["seconds"]
+        update = {"$inc": {"replays": 1, "replay_misses" if outcome["miss"] else "replay_hits": 1}}
+        if outcome["miss"]:
+            update["$set"] = {"last_miss": {"reason": outcome["miss"], "at": time.time()}}
+        await self.collection.update_one({"_id": flow["_id"]}, update)
+
+    def stats(self):
+        replays = self.counters["replays"]
+        return {
+            "replays": replays,
+            "handed_off_at_submit": self.counters["handed_off_at_submit"],
+            "stopped_early": self.counters["stopped_early"],
+            "steps_replayed": self.counters["steps_replayed"],
+            "flows_recorded": self.counters["recorded"],
+            "avg_replay_s": round(self.replay_s / replays, 2) if replays else 0.0,
+        }
@@ -0,0 +1,234 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import List
+
+from pydantic import BaseModel, Field
+
+# Words that change between platforms' wording of the same screening question
+# without changing what is asked.
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "to", "for", "do", "does", "you", "your", "have",
+    "are", "is", "what", "how", "many", "please", "enter", "provide", "select", "required",
+    "optional", "with", "this", "and", "or", "any", "current", "currently",
+}
+KEEP_WORDS = {"current", "expected"}  # distinguishes "current CTC" from "expected CTC"
+
+def normalize_question(question: str) -> str:
+    text = re.sub(r"\((?:required|optional)\)|\*", " ", (question or "").lower())
+    words = re.findall(r"[a-z0-9]+", text)
+    return " ".join(w for w in words if w not in STOPWORDS or w in KEEP_WORDS)
+
+def _content_tokens(normalized: str) -> frozenset:
+    """Word set of a normalized question, plurals folded ("years" == "year")."""
+    return frozenset(w[:-1] if len(w) > 3 and w.endswith("s") else w for w in normalized.split())
+
+def profile_answers(profile: dict) -> dict:
+    """Screening answers that can be read straight off the parsed resume profile."""
+    contact = profile.get("contact", {})
+    screening = profile.get("screening", {})
+    answers = {}
+
+    def add(question, answer):
+        if answer not in (None, ""):
+            answers[normalize_question(question)] = {"question": question, "answer": str(answer)}
+
+    add("Years of experience", screening.get("total_experience_years"))
+    add("Years of work experience", screening.get("total_experience_years"))
+    add("Total years of work experience", screening.get("total_experience_years"))
+    add("Notice period", screening.get("notice_period"))
+    add("Work authorization", screening.get("work_authorization"))
+    add("Phone number", contact.get("phone"))
+    add("Mobile phone number", contact.get("phone"))
+    add("Email address", contact.get("email"))
+    add("City / Location", contact.get("location"))
+    for label, value in screening.get("ctc", {}).items():
+        add(label, value)
+    return answers
+
+class FormMemory:
+    """
+    Per-user, per-platform store of screening question -> answer.
+    One document per (username, platform_name), cached in memory for ttl
+    seconds so answers saved by other workers show up. Saves set each answer
+    by key, so concurrent runs never overwrite each other's answers.
+    """
+
+    def __init__(self, collection, max_entries: int = 256, ttl: float = 60.0):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._cache = OrderedDict()
+        self._locks = {}
+
+    @staticmethod
+    def _key(username: str, platform: str):
+        return (username, platform.lower())
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("username", 1), ("platform_name", 1)], unique=True, name="form_answers_username_platform"
+        )
+
+    async def load(self, username: str, platform: str) -> dict:
+        key = self._key(username, platform)
+        cached = self._cache.get(key)
+        if cached is not None and time.time() - cached[1] < self.ttl:
+            self._cache.move_to_end(key)
+            return cached[0]
+        doc = await self.collection.find_one(
+            {"username": username, "platform_name": platform.lower()}, {"answers": 1}
+        )
+        answers = (doc or {}).get("answers") or {}
+        self._remember(key, answers)
+        return answers
+
+    async def save_answers(self, username: str, platform: str, new_answers: dict) -> int:
+        """Merges answers from a successful run. Returns how many entries changed."""
+        key = self._key(username, platform)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            answers = dict(await self.load(username, platform))
+            updates = {}
+            for normalized, entry in new_answers.items():
+                if answers.get(normalized, {}).get("answer") != entry["answer"]:
+                    answers[normalized] = {**entry, "updatedAt": time.time()}
+                    updates[f"answers.{normalized}"] = answers[normalized]
+            if updates:
+                await self.collection.update_one(
+                    {"username": username, "platform_name": platform.lower()},
+                    {"$set": {**updates, "updatedAt": time.time()}},
+                    upsert=True,
+                )
+                self._remember(key, answers)
+            return len(updates)
+
+    async def start_run(self, username: str, platform: str, profile: dict = None):
+        answers = await self.load(username, platform)
+        return FormRun(self, username, platform, answers, profile_answers(profile or {}))
+
+    def _remember(self, key, answers):
+        self._cache[key] = (answers, time.time())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            old_key, _ = self._cache.popitem(last=False)
+            self._locks.pop(old_key, None)
+
+class FormRun:
+    """Answers visible to one agent run, plus whatever it learns along the way."""
+
+    def __init__(self, memory: FormMemory, username: str, platform: str, answers: dict, fallback: dict):
+        self.memory = memory
+        self.username = username
+        self.platform = platform
+        self.answers = answers
+        self.fallback = fallback
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, question: str):
+        """
+        Returns the known answer for this question, or None. A saved question
+        matches only if it has exactly the same content words (order and
+        plurals aside): "years experience sql" never answers "years experience
+        aws", and the generic "years of experience" answers no per-skill question.
+        """
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+        # Learned answers win over resume-derived ones; exact keys are O(1).
+        for source in (self.pending, self.answers, self.fallback):
+            if normalized in source:
+                return source[normalized]["answer"]
+        tokens = _content_tokens(normalized)
+        for source in (self.pending, self.answers, self.fallback):
+            for known, entry in source.items():
+                if _content_tokens(known) == tokens:
+                    return entry["answer"]
+        return None
+
+    def learn(self, question: str, answer: str):
+        normalized = normalize_question(question)
+        if normalized and answer:
+            self.pending[normalized] = {"question": question, "answer": answer}
+
+    async def commit(self) -> int:
+        if not self.pending:
+            return 0
+        return await self.memory.save_answers(self.username, self.platform, self.pending)
+
+class KnownField(BaseModel):
+    index: int = Field(ge=0, description="from browser_state")
+    question: str = Field(description="the field's label or question text")
+
+class FillKnownFieldsAction(BaseModel):
+    fields: List[KnownField]
+
+class RememberAnswerAction(BaseModel):
+    question: str
+    answer: str
+
+def build_form_tools(run: FormRun, exclude_actions=None):
+    """browser-use Tools with the form-memory actions registered for this run."""
+    from browser_use.agent.views import ActionResult
+    from browser_use.browser import BrowserSession
+    from browser_use.browser.events import SelectDropdownOptionEvent, TypeTextEvent
+    from browser_use.tools.service import Tools
+
+    tools = Tools(exclude_actions=exclude_actions or [])
+
+    @tools.registry.action(
+        "Fill screening questions from the user's saved answers in one step. Pass the index and "
+        "label of every visible question; known ones are filled, unknown ones are listed back.",
+        param_model=FillKnownFieldsAction,
+    )
+    async def fill_known_fields(params: FillKnownFieldsAction, browser_session: BrowserSession):
+        filled, to_click, unknown = [], [], []
+        for field in params.fields:
+            answer = run.lookup(field.question)
+            if answer is None:
+                run.misses += 1
+                unknown.append(field.question)
+                continue
+            run.hits += 1
+            node = await browser_session.get_element_by_index(field.index)
+            if node is None:
+                unknown.append(field.question)
+                continue
+            input_type = (node.attributes or {}).get("type", "").lower()
+            if node.tag_name.lower() == "select":
+                event = browser_session.event_bus.dispatch(SelectDropdownOptionEvent(node=node, text=answer))
+            elif input_type in ("radio", "checkbox"):
+                # Needs a click on the matching option; the model picks the element.
+                to_click.append(f"'{field.question}' -> {answer}")
+                continue
+            else:
+                event = browser_session.event_bus.dispatch(TypeTextEvent(node=node, text=answer))
+            try:
+                await event
+                await event.event_result(raise_if_any=True, raise_if_none=False)
+                filled.append(f"[{field.index}] {field.question} = {answer}")
+            except Exception as e:
+                unknown.append(f"{field.question} (fill failed: {e})")
+
+        lines = []
+        if filled:
+            lines.append("Filled from saved answers: " + "; ".join(filled))
+        if to_click:
+            lines.append("Known answers, click the matching option: " + "; ".join(to_click))
+        if unknown:
+            lines.append("No saved answer (answer yourself, then call remember_answer): " + "; ".join(unknown))
+        msg = "\n".join(lines) or "No fields given."
+        return ActionResult(extracted_content=msg, include_in_memory=True, long_term_memory=msg)
+
+    @tools.registry.action(
+        "Save the answer you gave to a screening question so future applications can reuse it.",
+        param_model=RememberAnswerAction,
+    )
+    async def remember_answer(params: RememberAnswerAction):
+        run.learn(params.question, params.answer)
+        return ActionResult(extracted_content=f"Remembered answer for '{params.question}'")
+
+    return tools
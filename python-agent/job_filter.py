@@ -0,0 +1,446 @@
+import asyncio
+import hashlib
+import html as html_lib
+import json
+import math
+import os
+import re
+import time
+from collections import Counter, OrderedDict
+from html.parser import HTMLParser
+
+from applied_jobs import canonicalize_url, looks_like_job_url
+from resume_profile import get_resume_profile
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+STOPWORDS = frozenset("""
+a about above after all also am an and any are as at be been being below between both but by can could did do does
+doing down during each etc few for from further had has have having he her here hers him his how i if in into is it
+its itself just me more most my no nor not now of off on once only or other our ours out over own per same she should
+so some such than that the their them then there these they this those through to too under until up very via was we
+were what when where which while who whom why will with within without would you your yours
+job jobs role roles position positions apply applying application candidate candidates company team work working
+looking opportunity opportunities ability strong experience years year required requirements preferred plus including
+responsibilities skills skill knowledge good great excellent new using use well must like based
+""".split())
+
+# Rule phrases that name what NOT to apply to: "avoid senior roles", "no internships, contract".
+NEGATION_RE = re.compile(
+    r"\b(?:avoid|exclude|excluding|skip|never|no(?!\s+to\b)|not interested in|don't apply to|do not apply to"
+    r"|dont apply to)\s+([^.;\n]+)",
+    re.I,
+)
+# Form-filling instructions ("Answer no to sponsorship", "say yes to relocation")
+# say nothing about which jobs fit.
+ANSWER_RE = re.compile(
+    r"\b(?:answer|say|select|choose|pick|reply|respond|mark)\s+[\"']?(?:yes|no)\b[^.;\n]*", re.I
+)
+FILLER_RE = re.compile(r"\b(?:any|all|the|jobs?|roles?|positions?|postings?|openings?|ones?|that are|which are)\b", re.I)
+
+# Tags whose text is never part of the posting.
+SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "head", "nav", "footer", "header", "form", "button", "select"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for token in TOKEN_RE.findall((text or "").lower()):
+        token = token.rstrip(".")
+        if len(token) > 1 and token not in STOPWORDS and not token.isdigit():
+            tokens.append(token)
+    return tokens
+
+def term_counts(*weighted_texts) -> Counter:
+    """Weighted term frequencies of (text, weight) pairs."""
+    counts = Counter()
+    for text, weight in weighted_texts:
+        for token in tokenize(text):
+            counts[token] += weight
+    return counts
+
+def rule_terms(rules: str) -> tuple:
+    """(positive text, negative phrases) of free-text rules."""
+    rules = ANSWER_RE.sub(" ", rules or "")
+    negatives = []
+    for match in NEGATION_RE.finditer(rules):
+        for part in re.split(r",|/|\bor\b|\band\b", match.group(1)):
+            phrase = " ".join(FILLER_RE.sub(" ", part).split()).lower()
+            if phrase and len(phrase.split()) <= 4:
+                negatives.append(phrase)
+    positive = NEGATION_RE.sub(" ", rules)
+    return positive, negatives
+
+def _stem(word: str) -> str:
+    for suffix in ("ships", "ship", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+def _stems(text: str) -> list:
+    return [_stem(w.rstrip(".")) for w in TOKEN_RE.findall((text or "").lower())]
+
+def phrase_in(phrase: str, text: str) -> bool:
+    """Whole-word phrase match, loose on plurals: "internships" matches "Intern"."""
+    words, haystack = _stems(phrase), _stems(text)
+    n = len(words)
+    return n > 0 and any(haystack[i:i + n] == words for i in range(len(haystack) - n + 1))
+
+class _PostingParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.h1 = ""
+        self.meta = {}
+        self.ld_json = []
+        self.text = []
+        self._skip = 0
+        self._in = None  # "title", "h1" or "ld" while collecting one of those
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or "").lower()
+            if key and attrs.get("content"):
+                self.meta.setdefault(key, attrs["content"])
+        elif tag == "script" and (attrs.get("type") or "").lower() == "application/ld+json":
+            self._in = "ld"
+            self.ld_json.append("")
+        elif tag == "title" and not self.title:
+            self._in = "title"
+        elif tag == "h1" and not self.h1:
+            self._in = "h1"
+        if tag in SKIP_TAGS and tag not in VOID_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self._skip:
+            self._skip -= 1
+        if tag in ("script", "title", "h1"):
+            self._in = None
+
+    def handle_data(self, data):
+        if self._in == "ld":
+            self.ld_json[-1] += data
+        elif self._in == "title":
+            self.title += data
+        elif self._in == "h1":
+            self.h1 += data
+        if not self._skip and data.strip():
+            self.text.append(data.strip())
+
+def _job_posting_ld(blocks):
+    """The schema.org JobPosting object of the page, if it has one."""
+    for raw in blocks:
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, dict):
+                kind = item.get("@type")
+                if kind == "JobPosting" or (isinstance(kind, list) and "JobPosting" in kind):
+                    return item
+                stack.extend(v for v in item.values() if isinstance(v, (list, dict)))
+    return None
+
+def _ld_location(posting):
+    places = posting.get("jobLocation") or []
+    if isinstance(places, dict):
+        places = [places]
+    parts = []
+    for place in places:
+        address = place.get("address", {}) if isinstance(place, dict) else {}
+        if isinstance(address, dict):
+            parts.append(", ".join(str(address[k]) for k in ("addressLocality", "addressRegion", "addressCountry")
+                                   if isinstance(address.get(k), str)))
+    if posting.get("jobLocationType") == "TELECOMMUTE":
+        parts.append("Remote")
+    return "; ".join(p for p in parts if p)
+
+def _strip_html(text: str) -> str:
+    if "&lt;" in text:
+        text = html_lib.unescape(text)  # some sites entity-encode the description markup
+    parser = _PostingParser()
+    parser.feed(text)
+    return " ".join(parser.text)
+
+def parse_posting(html: str, url: str = "") -> dict:
+    """Title, company, location and description of a job page (JSON-LD first, then meta tags and page text)."""
+    parser = _PostingParser()
+    parser.feed(html or "")
+    ld = _job_posting_ld(parser.ld_json)
+    if ld:
+        org = ld.get("hiringOrganization")
+        return {
+            "url": url,
+            "title": str(ld.get("title") or ""),
+            "company": str(org.get("name") or "") if isinstance(org, dict) else str(org or ""),
+            "location": _ld_location(ld),
+            "description": _strip_html(str(ld.get("description") or "")),
+            "source": "ld+json",
+        }
+    title = parser.meta.get("og:title") or parser.h1.strip() or parser.title.strip()
+    description = " ".join(parser.text)
+    if len(description) < 200:
+        description = parser.meta.get("og:description") or parser.meta.get("description") or description
+    return {
+        "url": url,
+        "title": " ".join(title.split()),
+        "company": parser.meta.get("og:site_name", ""),
+        "location": "",
+        "description": description,
+        "source": "html",
+    }
+
+class JobFilter:
+    """
+    Pre-screen for job URLs: fetch the posting over plain HTTP (or from the
+    cache directory / in-memory cache), and score it against the resume and
+    rules with TF-IDF cosine similarity. Jobs under the user's min_score, or
+    whose title/location hits an excluded phrase, are rejected before a browser
+    or the LLM is involved. Pages that can't be fetched or read (login walls,
+    bot checks) pass through unscored.
+
+    Document frequencies come from the postings this process has seen, so the
+    IDF weights sharpen as more jobs are screened.
+    """
+
+    def __init__(self, settings_collection, cache_dir: str = None, min_score: float = 0.08,
+                 timeout: float = 8.0, cache_ttl: float = 6 * 3600, max_cached: int = 512,
+                 min_description: int = 200, max_docs: int = 5000, settings_ttl: float = 60.0):
+        self.settings = settings_collection
+        self.cache_dir = cache_dir
+        self.min_score = min_score
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.max_cached = max_cached
+        self.min_description = min_description
+        self.max_docs = max_docs
+        self.settings_ttl = settings_ttl
+        self._postings = OrderedDict()  # canonical url -> (fetched_at, posting)
+        self._settings_cache = {}  # username -> (loaded_at, settings); other workers may change them
+        self._df = Counter()
+        self._docs = 0
+        self._client = None
+        self.counts = Counter()
+        self.screen_s = 0.0
+
+    # --- per-user settings ---
+
+    async def get_settings(self, username: str) -> dict:
+        cached = self._settings_cache.get(username)
+        if cached and time.time() - cached[0] < self.settings_ttl:
+            return cached[1]
+        try:
+            doc = await self.settings.find_one({"_id": username}) or {}
+        except Exception as e:
+            # Screening is advisory; without Mongo it runs on the defaults.
+            print(f"⚠️ [Prefilter] Could not load settings for {username}, using defaults: {e}")
+            return {"enabled": True, "min_score": self.min_score, "require": [], "exclude": []}
+        settings = {
+            "enabled": doc.get("enabled", True),
+            "min_score": doc.get("min_score", self.min_score),
+            "require": doc.get("require", []),
+            "exclude": doc.get("exclude", []),
+        }
+        self._settings_cache[username] = (time.time(), settings)
+        return settings
+
+    async def set_settings(self, username: str, **fields) -> dict:
+        fields = {k: v for k, v in fields.items() if v is not None}
+        if fields:
+            await self.settings.update_one({"_id": username}, {"$set": fields}, upsert=True)
+        self._settings_cache.pop(username, None)
+        return await self.get_settings(username)
+
+    # --- fetching ---
+
+    def cache_path(self, url: str):
+        if not self.cache_dir:
+            return None
+        key = hashlib.sha1(canonicalize_url(url).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.html")
+
+    async def fetch(self, url: str):
+        """The parsed posting for a job URL, or None if the page couldn't be read."""
+        key = canonicalize_url(url)
+        entry = self._postings.get(key)
+        if entry and time.time() - entry[0] < self.cache_ttl:
+            self._postings.move_to_end(key)
+            self.counts["cache_hits"] += 1
+            return entry[1]
+
+        path = self.cache_path(url)
+        html = None
+        if path and os.path.exists(path):
+            html = await asyncio.to_thread(_read_text, path)
+            self.counts["disk_hits"] += 1
+        else:
+            try:
+                html = await self._get(url)
+                self.counts["fetched"] += 1
+            except Exception as e:
+                self.counts["fetch_errors"] += 1
+                print(f"⚠️ [JobFilter] Could not fetch {url}: {e}")
+                return None
+            if path and html:
+                try:
+                    await asyncio.to_thread(_write_text, path, html)
+                except OSError as e:
+                    print(f"⚠️ [JobFilter] Could not cache {url}: {e}")
+
+        # Job pages run to a few hundred KB; parse them off the event loop.
+        posting = await asyncio.to_thread(parse_posting, html or "", url)
+        self._learn(posting)
+        self._postings[key] = (time.time(), posting)
+        while len(self._postings) > self.max_cached:
+            self._postings.popitem(last=False)
+        return posting
+
+    async def _get(self, url: str) -> str:
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=8),
+                headers={
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                                  "(KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+                    "Accept-Language": "en-US,en;q=0.9",
+                },
+            )
+        response = await self._client.get(url)
+        response.raise_for_status()
+        return response.text
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # --- scoring ---
+
+    def _learn(self, posting):
+        if self._docs >= self.max_docs:
+            # Halve the counts so old postings fade instead of growing forever.
+            self._df = Counter({t: c // 2 for t, c in self._df.items() if c > 1})
+            self._docs //= 2
+        self._docs += 1
+        self._df.update(set(tokenize(f"{posting['title']} {posting['location']} {posting['description']}")))
+
+    def _idf(self, token):
+        return math.log((self._docs + 1) / (self._df.get(token, 0) + 1)) + 1
+
+    def _vector(self, counts):
+        vector = {t: (1 + math.log(c)) * self._idf(t) for t, c in counts.items() if c > 0}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {t: v / norm for t, v in vector.items()}
+
+    def score(self, posting: dict, resume_text: str, rules: str = "", settings: dict = None) -> dict:
+        """Relevance of one posting: cosine score, the terms that drove it, and any hard rejections."""
+        settings = settings or {"min_score": self.min_score, "require": [], "exclude": []}
+        profile = get_resume_profile(resume_text)
+        positive_rules, negatives = rule_terms(rules)
+        query = term_counts(
+            (" ".join(profile.get("skills", [])), 3),
+            (" ".join(profile.get("experience", [])), 2),
+            (" ".join(settings.get("require", [])), 3),
+            (positive_rules, 2),
+            (profile.get("summary", ""), 1),
+            (resume_text, 1),
+        )
+        job = term_counts(
+            (posting["title"], 3),
+            (posting["location"], 1),
+            (posting["description"], 1),
+        )
+        q, d = self._vector(query), self._vector(job)
+        contributions = {t: q[t] * d[t] for t in q.keys() & d.keys()}
+        score = sum(contributions.values())
+
+        headline = f"{posting['title']} {posting['location']}".lower()
+        full = f"{headline} {posting['description']}".lower()
+        excluded = [p for p in list(settings.get("exclude", [])) + negatives if phrase_in(p, headline)]
+        required = settings.get("require", [])
+        missing = required if required and not any(phrase_in(p, full) for p in required) else []
+        return {
+            "score": round(score, 4),
+            "min_score": settings.get("min_score", self.min_score),
+            "matched": [t for t, _ in sorted(contributions.items(), key=lambda kv: -kv[1])[:10]],
+            "excluded": excluded,
+            "missing": missing,
+        }
+
+    async def screen(self, request) -> dict:
+        """
+        Decision for one TaskRequest: "reject", "pass", or "unscored" (not a
+        single posting, filter disabled, page unreadable). Only "reject" stops
+        the task; search and listing pages always go through to the agent.
+        """
+        start = time.monotonic()
+        result = {"decision": "unscored", "url": request.url}
+        try:
+            if not looks_like_job_url(request.url):
+                result["reason"] = "Not a job posting URL."
+                return result
+            if not request.resume_text.strip():
+                result["reason"] = "No resume to score against."
+                return result
+            settings = await self.get_settings(request.username)
+            if not settings["enabled"]:
+                result["reason"] = "Pre-filter disabled for this user."
+                return result
+            posting = await self.fetch(request.url)
+            if posting is None or len(posting["description"]) < self.min_description:
+                result["reason"] = "Job page could not be read without a browser."
+                return result
+            result.update(self.score(posting, request.resume_text, request.rules, settings))
+            result["title"] = posting["title"]
+            result["location"] = posting["location"]
+            if result["excluded"]:
+                result["decision"] = "reject"
+                result["reason"] = f"Excluded by rule: {', '.join(result['excluded'])}."
+            elif result["missing"]:
+                result["decision"] = "reject"
+                result["reason"] = f"None of the required terms found: {', '.join(result['missing'])}."
+            elif result["score"] < result["min_score"]:
+                result["decision"] = "reject"
+                result["reason"] = f"Low relevance ({result['score']:.2f} < {result['min_score']:.2f})."
+            else:
+                result["decision"] = "pass"
+            return result
+        finally:
+            elapsed = time.monotonic() - start
+            result["ms"] = round(elapsed * 1000, 1)
+            self.screen_s += elapsed
+            self.counts[result["decision"]] += 1
+
+    def stats(self):
+        screened = sum(self.counts[k] for k in ("pass", "reject", "unscored"))
+        return {
+            "screened": screened,
+            "passed": self.counts["pass"],
+            "rejected": self.counts["reject"],
+            "unscored": self.counts["unscored"],
+            "fetched": self.counts["fetched"],
+            "fetch_errors": self.counts["fetch_errors"],
+            "cache_hits": self.counts["cache_hits"],
+            "disk_hits": self.counts["disk_hits"],
+            "known_postings": self._docs,
+            "avg_ms": round(self.screen_s * 1000 / screened, 1) if screened else 0.0,
+        }
+
+def _read_text(path: str) -> str:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+def _write_text(path: str, text: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
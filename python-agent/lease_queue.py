@@ -0,0 +1,379 @@
+import asyncio
+import time
+import uuid
+
+from pymongo import ReturnDocument
+
+from task_events import TaskEventBuffer
+
+FINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+class WatchedEvent(asyncio.Event):
+    """asyncio.Event that counts the coroutines waiting on it."""
+
+    def __init__(self):
+        super().__init__()
+        self.waiting = 0
+
+    async def wait(self):
+        self.waiting += 1
+        try:
+            return await super().wait()
+        finally:
+            self.waiting -= 1
+
+class RemoteTaskRecord:
+    """
+    Read-only view of a task stored in MongoDB, shaped like task_queue.TaskRecord
+    so the HTTP endpoints can serve it. Refreshed by polling while someone waits on it.
+    """
+
+    def __init__(self, doc: dict):
+        self.task_id = doc["_id"]
+        self.priority = doc.get("priority", 5)
+        self.submitted_at = doc.get("submitted_at")
+        self.updated = WatchedEvent()
+        self.done = WatchedEvent()
+        self.events = TaskEventBuffer()
+        self.cancel_requested = False
+        self.apply(doc)
+
+    def watched(self) -> bool:
+        """True while an event stream, /run-task or /run-batch is waiting on this task."""
+        return bool(self.events.subscribers or self.done.waiting or self.updated.waiting)
+
+    def apply(self, doc: dict) -> bool:
+        """Copies a fresh document in. Returns True if anything visible changed."""
+        before = (getattr(self, "status", None), len(getattr(self, "progress", [])), self.events.seq)
+        self.status = doc.get("status", "queued")
+        self.started_at = doc.get("started_at")
+        self.finished_at = doc.get("finished_at")
+        self.progress = doc.get("progress", [])
+        self.result = doc.get("result")
+        self.error = doc.get("error")
+        self.worker = doc.get("worker")
+        self.cancel_requested = bool(doc.get("cancel_requested"))
+        for event in doc.get("events", []):
+            if event["seq"] > self.events.seq:
+                self.events.add(event)
+        if self.status in FINAL_STATUSES and not self.done.is_set():
+            self.events.close()
+            self.done.set()
+        changed = before != (self.status, len(self.progress), self.events.seq)
+        if changed:
+            self.updated.set()
+        return changed
+
+    def to_dict(self):
+        return {
+            "task_id": self.task_id,
+            "status": self.status,
+            "priority": self.priority,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "worker": self.worker,
+        }
+
+class LeaseQueue:
+    """
+    Durable task queue in a MongoDB collection, shared by any number of worker
+    processes on any number of hosts.
+
+    A worker claims a task with one atomic find_one_and_update that sets it to
+    running with `worker` and `lease_until`. While it runs, the worker renews the
+    lease; if the worker dies, the lease runs out and the next claim picks the task
+    up again, up to `max_attempts` runs. Results, progress and events are written
+    back to the task document, fenced on the worker that holds the lease.
+    """
+
+    def __init__(self, collection, worker_id: str, lease_seconds: float = 60.0,
+                 max_attempts: int = 3, poll_interval: float = 1.0, max_events: int = 200,
+                 watch_grace: float = 10.0):
+        self.collection = collection
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.max_events = max_events
+        self.watch_grace = watch_grace  # keep polling this long after the last waiter left
+        self._watched = {}
+        self._pollers = set()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("status", 1), ("priority", 1), ("submitted_at", 1)], name="agent_tasks_claim_order"
+        )
+        await self.collection.create_index([("status", 1), ("lease_until", 1)], name="agent_tasks_lease")
+
+    async def submit(self, kind: str, request: dict, priority: int = 5) -> RemoteTaskRecord:
+        doc = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "request": request,
+            "priority": priority,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "attempts": 0,
+            "events": [],
+            "progress": [],
+        }
+        await self.collection.insert_one(doc)
+        print(f"📨 [LeaseQueue] Task {doc['_id']} queued in MongoDB (kind={kind}, priority={priority}).")
+        return self._watch(doc)
+
+    async def get(self, task_id: str):
+        record = self._watched.get(task_id)
+        if record is not None:
+            return record
+        doc = await self.collection.find_one({"_id": task_id}, {"request": 0})
+        return self._watch(doc) if doc else None
+
+    async def cancel(self, task_id: str) -> bool:
+        """Cancels a queued task outright; a running one is flagged for its worker to stop."""
+        result = await self.collection.update_one(
+            {"_id": task_id, "status": "queued"},
+            {"$set": {"status": "cancelled", "finished_at": time.time()}, "$unset": {"request": ""}},
+        )
+        if result.modified_count:
+            return True
+        result = await self.collection.update_one(
+            {"_id": task_id, "status": "running"}, {"$set": {"cancel_requested": True}}
+        )
+        return bool(result.matched_count)
+
+    # --- worker side ---
+
+    async def claim(self):
+        """Atomically takes the next queued task, or one whose lease expired."""
+        now = time.time()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [{"status": "queued"}, {"status": "running", "lease_until": {"$lt": now}}],
+                "attempts": {"$lt": self.max_attempts},
+            },
+            {
+                "$set": {
+                    "status": "running", "worker": self.worker_id, "lease_until": now + self.lease_seconds,
+                    "started_at": now, "progress": [],
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", 1), ("submitted_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def fail_exhausted(self) -> int:
+        """Marks tasks whose lease expired on their last allowed attempt as failed."""
+        result = await self.collection.update_many(
+            {"status": "running", "lease_until": {"$lt": time.time()}, "attempts": {"$gte": self.max_attempts}},
+            {
+                "$set": {
+                    "status": "failed", "finished_at": time.time(),
+                    "error": f"Worker lease expired on all {self.max_attempts} attempts.",
+                },
+                "$unset": {"request": ""},
+            },
+        )
+        return result.modified_count
+
+    async def renew(self, task_id: str):
+        """Extends the lease. Returns the task's cancel flag, or None if the lease was lost."""
+        doc = await self.collection.find_one_and_update(
+            {"_id": task_id, "worker": self.worker_id, "status": "running"},
+            {"$set": {"lease_until": time.time() + self.lease_seconds}},
+            projection={"cancel_requested": 1},
+        )
+        return None if doc is None else bool(doc.get("cancel_requested"))
+
+    async def append_event(self, task_id: str, event: dict):
+        update = {"$push": {"events": {"$each": [event], "$slice": -self.max_events}}}
+        if event["type"] == "progress":
+            update["$push"]["progress"] = event["item"]
+        await self.collection.update_one({"_id": task_id, "worker": self.worker_id}, update)
+
+    async def finish(self, task_id: str, status: str, result=None, error=None) -> bool:
+        done = await self.collection.update_one(
+            {"_id": task_id, "worker": self.worker_id, "status": "running"},
+            {
+                "$set": {"status": status, "result": result, "error": error, "finished_at": time.time()},
+                "$unset": {"lease_until": "", "request": ""},
+            },
+        )
+        return bool(done.modified_count)
+
+    async def release(self, task_ids) -> int:
+        """Hands unfinished tasks back to the queue on a clean shutdown, without using up an attempt."""
+        if not task_ids:
+            return 0
+        result = await self.collection.update_many(
+            {"_id": {"$in": list(task_ids)}, "worker": self.worker_id, "status": "running"},
+            {"$set": {"status": "queued"}, "$unset": {"worker": "", "lease_until": ""}, "$inc": {"attempts": -1}},
+        )
+        return result.modified_count
+
+    async def stats(self):
+        counts = {}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "n": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["n"]
+        workers = await self.collection.distinct(
+            "worker", {"status": "running", "lease_until": {"$gte": time.time()}}
+        )
+        return {"by_status": counts, "active_workers": sorted(workers), "worker_id": self.worker_id}
+
+    # --- API side ---
+
+    def _watch(self, doc: dict) -> RemoteTaskRecord:
+        record = RemoteTaskRecord(doc)
+        if not record.done.is_set():
+            self._watched[record.task_id] = record
+            poller = asyncio.create_task(self._poll(record))
+            self._pollers.add(poller)
+            poller.add_done_callback(self._pollers.discard)
+        return record
+
+    async def _poll(self, record: RemoteTaskRecord):
+        """Refreshes the record until it finishes or nobody has waited on it for watch_grace."""
+        last_watched = time.monotonic()
+        try:
+            while not record.done.is_set():
+                await asyncio.sleep(self.poll_interval)
+                if record.watched():
+                    last_watched = time.monotonic()
+                elif time.monotonic() - last_watched > self.watch_grace:
+                    break
+                doc = await self.collection.find_one({"_id": record.task_id}, {"request": 0})
+                if doc is None:
+                    break
+                record.apply(doc)
+        except Exception as e:
+            print(f"⚠️ [LeaseQueue] Stopped following task {record.task_id}: {e}")
+        finally:
+            # The next get() reads the document again and starts a new watch if needed.
+            if self._watched.get(record.task_id) is record:
+                del self._watched[record.task_id]
+
+class LeaseWorker:
+    """
+    Feeds a process-local TaskQueue from the LeaseQueue, one claim per free slot.
+    Each claimed task keeps its lease alive while it runs, mirrors its events to
+    MongoDB and writes its outcome back when done.
+    """
+
+    def __init__(self, lease_queue: LeaseQueue, local_queue, kinds: dict, capacity: int,
+                 heartbeat_interval: float = 15.0, idle_interval: float = 2.0):
+        self.lease_queue = lease_queue
+        self.local_queue = local_queue
+        self.kinds = kinds  # kind -> (request model, handler)
+        self.capacity = max(1, capacity)
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_interval = idle_interval
+        self._slots = asyncio.Semaphore(self.capacity)
+        self._loop_task = None
+        self._running = set()
+        self._held = set()
+
+    async def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._claim_loop())
+            print(f"🧵 [LeaseWorker] {self.lease_queue.worker_id} pulling tasks ({self.capacity} slots).")
+
+    async def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+            self._loop_task = None
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        try:
+            released = await self.lease_queue.release(self._held)
+            if released:
+                print(f"↩️ [LeaseWorker] Returned {released} unfinished task(s) to the queue.")
+        except Exception as e:
+            # Their leases expire on their own and another worker picks them up.
+            print(f"⚠️ [LeaseWorker] Could not release tasks on shutdown: {e}")
+
+    async def _claim_loop(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                doc = await self.lease_queue.claim()
+            except Exception as e:
+                print(f"⚠️ [LeaseWorker] Claim failed: {e}")
+                doc = None
+            if doc is None:
+                self._slots.release()
+                try:
+                    failed = await self.lease_queue.fail_exhausted()
+                    if failed:
+                        print(f"💀 [LeaseWorker] {failed} task(s) failed after repeated lease expiry.")
+                except Exception:
+                    pass
+                await asyncio.sleep(self.idle_interval)
+                continue
+            task = asyncio.create_task(self._run_claimed(doc))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_claimed(self, doc: dict):
+        task_id = doc["_id"]
+        self._held.add(task_id)
+        try:
+            kind = doc.get("kind", "task")
+            if kind not in self.kinds:
+                await self.lease_queue.finish(task_id, "failed", error=f"Unknown task kind '{kind}'")
+                self._held.discard(task_id)
+                return
+            model, handler = self.kinds[kind]
+            try:
+                request = model(**doc["request"])
+            except Exception as e:
+                await self.lease_queue.finish(task_id, "failed", error=f"Invalid request: {e}")
+                self._held.discard(task_id)
+                return
+            if doc.get("attempts", 1) > 1:
+                print(f"♻️ [LeaseWorker] Resuming task {task_id} (attempt {doc['attempts']}) after an expired lease.")
+
+            record = self.local_queue.submit(request, priority=doc.get("priority", 5), handler=handler, task_id=task_id)
+            seq_offset = max((e["seq"] for e in doc.get("events", [])), default=0)
+            mirror = asyncio.create_task(self._mirror(record, seq_offset))
+            heartbeat = asyncio.create_task(self._heartbeat(record))
+            try:
+                await record.done.wait()
+            finally:
+                heartbeat.cancel()
+            await asyncio.gather(mirror, heartbeat, return_exceptions=True)
+            error = record.error.strip().splitlines()[-1] if record.error else None
+            if not await self.lease_queue.finish(task_id, record.status, record.result, error):
+                print(f"⚠️ [LeaseWorker] Lost the lease on task {task_id}; result not written.")
+            self._held.discard(task_id)
+        finally:
+            self._slots.release()
+
+    async def _mirror(self, record, seq_offset: int):
+        async for event in record.events.subscribe():
+            if event is None:
+                continue
+            try:
+                await self.lease_queue.append_event(record.task_id, {**event, "seq": event["seq"] + seq_offset})
+            except Exception as e:
+                print(f"⚠️ [LeaseWorker] Could not store event for task {record.task_id}: {e}")
+
+    async def _heartbeat(self, record):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                cancel = await self.lease_queue.renew(record.task_id)
+            except Exception as e:
+                print(f"⚠️ [LeaseWorker] Heartbeat failed for task {record.task_id}: {e}")
+                continue
+            if cancel is None:
+                print(f"⚠️ [LeaseWorker] Task {record.task_id} was taken over by another worker; stopping it here.")
+                self.local_queue.cancel(record.task_id)
+                return
+            if cancel and not record.cancel_requested:
+                self.local_queue.cancel(record.task_id)
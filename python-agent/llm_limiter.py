@@ -0,0 +1,245 @@
+import asyncio
+import contextvars
+import time
+from collections import OrderedDict, deque
+
+import metrics
+
+# Set by whoever runs a task (queue worker, batch runner) so calls made deep
+# inside browser-use can be attributed to it for fair queuing.
+llm_task_key = contextvars.ContextVar("llm_task_key", default="default")
+
+# Gemini bills each image part at a flat rate regardless of resolution.
+IMAGE_TOKENS = 258
+
+class TokenBucket:
+    """Continuously refilling bucket; amounts may go negative after reconciliation."""
+
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.per_second
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def drain(self):
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+class LLMAdmissionController:
+    """
+    Process-wide pacing for LLM calls. Requests wait in per-task FIFOs and are
+    admitted round-robin across tasks once the RPM and TPM budgets allow, so
+    concurrent agents share the quota instead of all hitting 429 together.
+    """
+
+    def __init__(self, rpm: float, tpm: float = 0, max_concurrent: int = 0):
+        self.requests = TokenBucket(rpm, rpm / 60.0) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm / 60.0) if tpm else None
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self._queues = OrderedDict()
+        self._wakeup = None
+        self._dispatcher = None
+        self.metrics = {
+            "calls": 0,
+            "errors": 0,
+            "rate_limited": 0,
+            "queue_wait_s": 0.0,
+            "queue_wait_max_s": 0.0,
+            "model_s": 0.0,
+            "model_max_s": 0.0,
+            "estimated_tokens": 0,
+            "actual_tokens": 0,
+        }
+        self.per_task = {}
+
+    async def acquire(self, task_key: str, estimated_tokens: int) -> float:
+        """Waits for this task's turn and budget. Returns seconds spent queued."""
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+        waiter = loop.create_future()
+        queued_at = time.monotonic()
+        self._queues.setdefault(task_key, deque()).append((waiter, estimated_tokens))
+        self._wakeup.set()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as we were cancelled; hand the slot back.
+                self.in_flight -= 1
+                self._wakeup.set()
+            raise
+        return time.monotonic() - queued_at
+
+    def release(self, task_key: str, waited: float, model_time: float, estimated_tokens: int,
+                actual_tokens: int = None, error: Exception = None):
+        self.in_flight -= 1
+        if self._wakeup:
+            self._wakeup.set()
+        m = self.metrics
+        m["calls"] += 1
+        m["queue_wait_s"] += waited
+        m["queue_wait_max_s"] = max(m["queue_wait_max_s"], waited)
+        m["model_s"] += model_time
+        m["model_max_s"] = max(m["model_max_s"], model_time)
+        m["estimated_tokens"] += estimated_tokens
+        task = self.per_task.setdefault(task_key, {"calls": 0, "queue_wait_s": 0.0, "model_s": 0.0})
+        task["calls"] += 1
+        task["queue_wait_s"] += waited
+        task["model_s"] += model_time
+        if actual_tokens is not None:
+            m["actual_tokens"] += actual_tokens
+            if self.tokens:
+                # Settle the estimate against what the provider actually billed.
+                self.tokens.take(actual_tokens - estimated_tokens)
+        if error is not None:
+            m["errors"] += 1
+            if _is_rate_limit(error):
+                m["rate_limited"] += 1
+                # The provider disagrees with our budget; pause everyone for a refill.
+                if self.requests:
+                    self.requests.drain()
+        if len(self.per_task) > 1000:
+            self.per_task.pop(next(iter(self.per_task)))
+
+    def stats(self):
+        m = dict(self.metrics)
+        calls = max(1, m["calls"])
+        m["avg_queue_wait_s"] = round(m["queue_wait_s"] / calls, 3)
+        m["avg_model_s"] = round(m["model_s"] / calls, 3)
+        m["queued"] = sum(len(q) for q in self._queues.values())
+        m["in_flight"] = self.in_flight
+        return m
+
+    async def _dispatch(self):
+        while True:
+            if not self._queues:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            task_key = next(iter(self._queues))
+            queue = self._queues[task_key]
+            waiter, estimated = queue[0]
+            if waiter.done():
+                # Caller was cancelled while waiting.
+                self._pop(task_key, queue)
+                continue
+
+            delay = 0.0
+            if self.requests:
+                delay = max(delay, self.requests.delay_for(1))
+            if self.tokens:
+                delay = max(delay, self.tokens.delay_for(estimated))
+            if self.max_concurrent and self.in_flight >= self.max_concurrent:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(estimated)
+            self.in_flight += 1
+            self._pop(task_key, queue)
+            waiter.set_result(None)
+
+    def _pop(self, task_key, queue):
+        queue.popleft()
+        if queue:
+            # Round-robin: this task goes to the back of the line.
+            self._queues.move_to_end(task_key)
+        else:
+            del self._queues[task_key]
+
+def _is_rate_limit(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return status == 429 or "429" in str(error) or "RESOURCE_EXHAUSTED" in str(error)
+
+def estimate_tokens(messages) -> int:
+    chars = 0
+    images = 0
+    for message in messages:
+        content = getattr(message, "content", "")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content or []:
+            text = getattr(part, "text", None)
+            if text is not None:
+                chars += len(text)
+            elif getattr(part, "type", "") == "image_url":
+                images += 1
+    return chars // 4 + images * IMAGE_TOKENS
+
+class RateLimitedLLM:
+    """Wraps a browser-use chat model so every call goes through the admission controller."""
+
+    def __init__(self, llm, controller: LLMAdmissionController):
+        self._llm = llm
+        self._controller = controller
+
+    def __getattr__(self, name):
+        return getattr(self._llm, name)
+
+    @property
+    def model(self):
+        return self._llm.model
+
+    @property
+    def provider(self):
+        return self._llm.provider
+
+    @property
+    def name(self):
+        return self._llm.name
+
+    @property
+    def model_name(self):
+        return self._llm.model_name
+
+    async def ainvoke(self, messages, output_format=None, **kwargs):
+        task_key = llm_task_key.get()
+        estimated = estimate_tokens(messages)
+        queued_at = time.monotonic()
+        waited = await self._controller.acquire(task_key, estimated)
+        metrics.record(metrics.LLM_WAIT_SECONDS, "llm_queue_wait", queued_at)
+        start = time.monotonic()
+        try:
+            response = await self._llm.ainvoke(messages, output_format, **kwargs)
+        except Exception as e:
+            metrics.record(metrics.LLM_SECONDS, "llm_call", start, outcome="error")
+            self._controller.release(task_key, waited, time.monotonic() - start, estimated, error=e)
+            raise
+        except BaseException:
+            metrics.record(metrics.LLM_SECONDS, "llm_call", start, outcome="cancelled")
+            self._controller.release(task_key, waited, time.monotonic() - start, estimated)
+            raise
+        metrics.record(metrics.LLM_SECONDS, "llm_call", start, outcome="ok")
+        usage = getattr(response, "usage", None)
+        self._controller.release(
+            task_key, waited, time.monotonic() - start, estimated,
+            actual_tokens=getattr(usage, "total_tokens", None)
+        )
+        return response
@@ -1,46 +1,77 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
 from contextlib import asynccontextmanager
 import asyncio
 import os
-import uvicorn
+import socket
+import time
 from dotenv import load_dotenv
 
-# Browser-use imports
-from browser_use import Agent, Browser, BrowserProfile, ChatGoogle
-import tempfile
+# browser-use (and google-genai behind ChatGoogle) take seconds to import; they are
+# loaded by the start-up warm-up (see warm_up below), not here.
 from pathlib import Path
-from browser_patch import apply_patches
+from task_queue import TaskQueue, current_task
+import metrics
+from lease_queue import LeaseQueue, LeaseWorker
+from task_events import step_event_data
+from browser_pool import BrowserPool
+from tab_group import TabGroup, CROSS_TAB_ACTIONS
+import network_filter as netfilter
+import page_settle
+from screenshot_pipeline import ScreenshotPipeline
+from session_store import SessionStore
+from session_capture import SessionCapture, find_chrome
+from llm_limiter import LLMAdmissionController, RateLimitedLLM, llm_task_key
+from resume_profile import get_resume_profile, format_resume_profile
+from resume_store import ResumeStore, resolve_upload
+from job_filter import JobFilter
+from run_supervisor import RunSupervisor, StepBudget
+from flow_replay import FlowRecorder, FlowStore, build_trace, replay, template_values
+from readiness import Readiness
+from prompts import render_task_prompt
+from form_memory import FormMemory, build_form_tools
+from applied_jobs import AppliedJobIndex, canonicalize_url, looks_like_job_url, register_applied_job_actions
 
-# Apply the "Deep Fix" for radio buttons at runtime
-apply_patches()
-
-import logging
+load_dotenv()
 
-# Setup file logging
-logging.basicConfig(
-    filename='debug_agent.log',
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+# Setup file logging. Records are handed to a background thread through a queue,
+# so DEBUG output from browser-use no longer writes to disk on the event loop.
+log_listener = metrics.setup_logging('debug_agent.log', level=os.getenv("LOG_LEVEL", "DEBUG").upper())
 
-load_dotenv()
+# TRACE_DIR=... writes one JSON trace (LLM calls, DOM passes, session and browser
+# I/O, with timings) per task; /metrics has the aggregated histograms either way.
+TRACE_DIR = os.getenv("TRACE_DIR")
 
 # --- GLOBAL CONFIGURATION ---
 
-# 1. API Key Check
+# 1. API Key Check (a missing key keeps /ready at 503 instead of failing the import)
 gemini_key = os.getenv("GEMINI_API_KEY")
-if not gemini_key:
-    raise ValueError("GEMINI_API_KEY is not set in environment variables.")
-
-# 2. Global LLM Initialization (Native ChatGoogle)
-print("✅ Initializing Global LLM (Gemini 1.5 Flash - Thrifty Native)...")
-llm = ChatGoogle(
-    model="gemini-flash-latest",
-    api_key=gemini_key,
-    max_retries=10, 
-    retry_base_delay=10.0, # Slow down to respect 5 RPM free tier
-)
+
+# 2. Global LLM (Native ChatGoogle), built by the warm-up.
+# Calls are paced by a shared admission controller (RPM/TPM budgets, fair across
+# tasks) so concurrent runs queue instead of burning retries on 429s.
+LLM_RPM = float(os.getenv("LLM_RPM", "5"))  # 5 RPM free tier
+LLM_TPM = float(os.getenv("LLM_TPM", "250000"))
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "0"))
+llm_controller = LLMAdmissionController(rpm=LLM_RPM, tpm=LLM_TPM, max_concurrent=LLM_MAX_CONCURRENT)
+llm = None
+
+def build_llm():
+    if not gemini_key:
+        raise ValueError("GEMINI_API_KEY is not set in environment variables.")
+    from browser_use import ChatGoogle
+
+    print("✅ Initializing Global LLM (Gemini 1.5 Flash - Thrifty Native)...")
+    chat = ChatGoogle(
+        model="gemini-flash-latest",
+        api_key=gemini_key,
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")), # Backstop only; pacing happens before the call
+        retry_base_delay=10.0,
+    )
+    chat.get_client()  # builds the genai client now rather than inside the first step
+    return RateLimitedLLM(chat, llm_controller)
 
 # 3. Database Connection (Motor for Async MongoDB)
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -51,89 +82,325 @@ client = AsyncIOMotorClient(mongodb_uri)
 db = client.get_database() # Uses the DB from URI or default
 sessions_collection = db.user_sessions
 
+session_store = SessionStore(
+    sessions_collection,
+    max_entries=int(os.getenv("SESSION_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("SESSION_CACHE_TTL", "600"))
+)
+
 async def load_session(username: str, platform: str):
-    """Loads storage state from MongoDB, isolated by platform."""
-    session = await sessions_collection.find_one({
-        "username": username,
-        "platform_name": platform.lower()
-    })
-    if session:
-        print(f"📦 Found saved session for {username} on {platform} in DB.")
-        return session.get("sessionData")
+    """Loads storage state (cached) from MongoDB, isolated by platform."""
+    with metrics.span(metrics.SESSION_SECONDS, "session_load", op="load"):
+        session_data = await session_store.load(username, platform)
+    if session_data:
+        print(f"📦 Found saved session for {username} on {platform}.")
+        return session_data
     print(f"➖ No saved session for {username} on {platform} in DB.")
     return None
 
 async def save_session(username: str, platform: str, session_data: dict):
-    """Saves storage state to MongoDB, isolated by platform."""
-    await sessions_collection.update_one(
-        {"username": username, "platform_name": platform.lower()},
-        {"$set": {
-            "sessionData": session_data, 
-            "updatedAt": asyncio.get_event_loop().time()
-        }},
-        upsert=True
+    """Saves storage state to MongoDB, isolated by platform. Skipped if unchanged."""
+    with metrics.span(metrics.SESSION_SECONDS, "session_save", op="save"):
+        written = await session_store.save(username, platform, session_data)
+    if written:
+        print(f"💾 Session for {username} on {platform} saved to DB.")
+    else:
+        print(f"💤 Session for {username} on {platform} unchanged, skipping save.")
+
+# Screening answers learned from successful applications, per user and platform.
+form_memory = FormMemory(db.form_answers)
+
+# Jobs already applied to, checked before a browser is ever launched.
+applied_jobs = AppliedJobIndex(db.applied_jobs)
+
+# Resumes parsed once per file, keyed by the sha256 of the file; tasks can send resume_id.
+resume_store = ResumeStore(db.resumes)
+
+# Relevance pre-screen: the posting is fetched over plain HTTP and scored against the
+# resume and rules (TF-IDF) before a browser or the LLM is spent on it. Per-user
+# thresholds live in job_filter_settings (PUT /job-filter/{username}).
+# JOB_CACHE_DIR doubles as a fixture directory: a page saved at JobFilter.cache_path(url)
+# is read instead of the network, and fetched pages are written there.
+job_filter = JobFilter(
+    db.job_filter_settings,
+    cache_dir=os.getenv("JOB_CACHE_DIR") or None,
+    min_score=float(os.getenv("JOB_FILTER_MIN_SCORE", "0.08")),
+    timeout=float(os.getenv("JOB_FILTER_TIMEOUT", "8"))
+)
+
+# Run supervisor: ends runs stuck in a loop, stalled, or on an OTP/captcha wall after
+# one corrective hint. max_steps per platform is learned from past successful runs
+# (run_outcomes), between STEP_BUDGET_MIN and STEP_BUDGET_MAX.
+RUN_SUPERVISOR = os.getenv("RUN_SUPERVISOR", "true").lower() == "true"
+STALL_STEPS = int(os.getenv("STALL_STEPS", "8"))
+step_budget = StepBudget(
+    db.run_outcomes,
+    default=int(os.getenv("STEP_BUDGET_MAX", "100")),
+    floor=int(os.getenv("STEP_BUDGET_MIN", "25")),
+    ceiling=int(os.getenv("STEP_BUDGET_MAX", "100"))
+)
+
+# Record-and-replay: successful applications are saved as element-level traces per
+# user, platform and job page type (flows collection). The next job of that type
+# replays the trace without the LLM while each page's form matches the recording;
+# the agent takes over where it differs, and always does the final submit.
+FLOW_REPLAY = os.getenv("FLOW_REPLAY", "true").lower() == "true"
+flow_store = FlowStore(db.flows)
+
+# 4. Browser Profile & Warm Pool
+CHROME_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    '--window-size=1920,1080',
+    '--no-sandbox',
+    '--disable-infobars',
+    '--password-store=basic'
+]
+
+# On Linux workers leave CHROME_EXECUTABLE unset to use the Chromium browser-use finds
+# (playwright install chromium, or the distro package), and set BROWSER_HEADLESS=true.
+WINDOWS_CHROME = 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe'
+CHROME_EXECUTABLE = os.getenv("CHROME_EXECUTABLE") or (WINDOWS_CHROME if os.name == "nt" else None)
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "false").lower() == "true"
+if os.name != "nt":
+    # Containers ship a tiny /dev/shm; Chrome crashes tabs when it fills up.
+    CHROME_ARGS.append('--disable-dev-shm-usage')
+
+# After each action, wait until the page is quiet (DOM + fetch/XHR) instead of a
+# fixed sleep; see page_settle.py. ADAPTIVE_SETTLE=false restores the 2s delay.
+ADAPTIVE_SETTLE = os.getenv("ADAPTIVE_SETTLE", "true").lower() == "true"
+settle_detector = page_settle.PageSettleDetector(
+    quiet_ms=int(os.getenv("SETTLE_QUIET_MS", "300")),
+    max_wait=float(os.getenv("SETTLE_MAX_WAIT", "5.0"))
+)
+
+# Vision mode: unchanged screenshots are skipped, small changes cropped, the rest
+# downscaled and re-encoded before they reach the model; see screenshot_pipeline.py.
+screenshot_pipeline = ScreenshotPipeline(
+    max_width=int(os.getenv("SCREENSHOT_MAX_WIDTH", "1280")),
+    image_format=os.getenv("SCREENSHOT_FORMAT", "JPEG"),
+    quality=int(os.getenv("SCREENSHOT_QUALITY", "70")),
+    hash_threshold=int(os.getenv("SCREENSHOT_HASH_THRESHOLD", "4")),
+    keyframe_every=int(os.getenv("SCREENSHOT_KEYFRAME_EVERY", "5")),
+    enabled=os.getenv("SCREENSHOT_PIPELINE", "true").lower() == "true"
+)
+
+def build_profile(session_data=None):
+    """Builds a per-run browser profile, seeded with the saved storage state if any."""
+    from browser_use import BrowserProfile
+
+    run_profile = BrowserProfile(
+        headless=BROWSER_HEADLESS,
+        executable_path=CHROME_EXECUTABLE,
+        disable_security=True,
+        wait_for_network_idle_page_load_time=3.0,
+        wait_between_actions=0.0 if ADAPTIVE_SETTLE else 2.0,
+        keep_alive=True,
+        extra_chromium_args=list(CHROME_ARGS)
     )
-    print(f"💾 Session for {username} on {platform} saved to DB.")
-
-# 4. Global Browser Profile
-profile = BrowserProfile(
-    headless=False,
-    executable_path='C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe',
-    disable_security=True,
-    wait_for_network_idle_page_load_time=3.0,
-    wait_between_actions=2.0,
-    extra_chromium_args=[
-        '--disable-blink-features=AutomationControlled',
-        '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-        '--window-size=1920,1080',
-        '--no-sandbox',
-        '--disable-infobars',
-        '--password-store=basic'
-    ]
+    if session_data:
+        # Handed over in memory; no temp JSON file round-trip.
+        run_profile.storage_state = session_data
+    return run_profile
+
+# Trackers, ads and media are blocked in agent browsers; see network_filter.py.
+network_filter = netfilter.NetworkFilter(
+    netfilter.load_policies(os.getenv("NETWORK_FILTER_POLICY")),
+    enabled=os.getenv("NETWORK_FILTER", "true").lower() == "true"
+)
+
+async def on_browser_launch(browser, key):
+    await network_filter.attach(browser, key[1])
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+BROWSER_IDLE_TTL = float(os.getenv("BROWSER_IDLE_TTL", "900"))
+browser_pool = BrowserPool(
+    build_profile,
+    max_size=BROWSER_POOL_SIZE,
+    idle_ttl=BROWSER_IDLE_TTL,
+    on_launch=on_browser_launch
 )
 
-# Global browser instance container
-global_browser = None
+# Upper bound for agents sharing one browser in separate tabs (batch mode).
+MAX_TABS_PER_BROWSER = int(os.getenv("MAX_TABS_PER_BROWSER", "3"))
+
+# 5. Task Queue (bounded number of concurrent agent runs / browsers)
+# TASK_BACKEND=local keeps tasks in this process. TASK_BACKEND=mongo puts them in the
+# agent_tasks collection, where every process started with AGENT_WORKERS>0 (here or
+# on other hosts, see worker.py) claims them under a renewable lease. AGENT_WORKERS=0
+# makes this process API-only.
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "2"))
+TASK_BACKEND = os.getenv("TASK_BACKEND", "local").lower()
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+task_queue = None
+lease_worker = None
+lease_queue = LeaseQueue(
+    db.agent_tasks,
+    worker_id=WORKER_ID,
+    lease_seconds=float(os.getenv("TASK_LEASE_SECONDS", "60")),
+    max_attempts=int(os.getenv("TASK_MAX_ATTEMPTS", "3"))
+) if TASK_BACKEND == "mongo" else None
+
+# Existing stats, re-exported as gauges on /metrics.
+metrics.REGISTRY.collect_stats(
+    "agent_queue", lambda: task_queue.stats() if task_queue is not None else {}, labels={"by_status": "status"}
+)
+metrics.REGISTRY.collect_stats("agent_browsers", browser_pool.stats)
+metrics.REGISTRY.collect_stats("agent_sessions", session_store.stats)
+metrics.REGISTRY.collect_stats("agent_resumes", resume_store.stats)
+metrics.REGISTRY.collect_stats("agent_applied_jobs", applied_jobs.stats)
+metrics.REGISTRY.collect_stats("agent_prefilter", job_filter.stats)
+metrics.REGISTRY.collect_stats(
+    "agent_supervisor", step_budget.stats, labels={"outcomes": "reason", "budgets": "platform"}
+)
+metrics.REGISTRY.collect_stats("agent_replay", flow_store.stats)
+
+# --- START-UP WARM-UP ---
+# The lifespan returns right away and this runs in the background: browser-use is
+# imported and patched, the LLM client built, Mongo pinged and indexed (concurrently),
+# then WARM_BROWSERS browsers are launched for the most recently used sessions.
+# /ready answers 503 until the required parts are done; tasks that arrive earlier
+# wait for them before leasing a browser instead of failing.
+WARM_BROWSERS = int(os.getenv("WARM_BROWSERS", "0"))
+# Failed start-up checks are retried with backoff up to this many seconds apart;
+# the lease worker starts claiming shared tasks only once all of them pass.
+WARM_UP_RETRY_MAX = float(os.getenv("WARM_UP_RETRY_MAX", "60"))
+readiness = Readiness(required=("runtime", "llm", "mongo"))
+_runtime = None
+_patched = False
+
+def _import_browser_use():
+    import browser_use.agent.service  # noqa: F401
+    import browser_use.llm.google.chat  # noqa: F401
 
-async def get_browser():
-    """Returns a healthy browser instance. Restarts if necessary."""
-    global global_browser
-    if global_browser is None:
-        print("🚀 [Init] Initializing Global Browser instance...")
-        global_browser = Browser(browser_profile=profile)
-        print("🚀 [Init] Starting browser engine (await global_browser.start())...")
-        await global_browser.start()
-        print("🚀 [Init] Browser started successfully.")
-    return global_browser
+async def _init_browser_runtime():
+    global _patched
+    if _patched:
+        return
+    await asyncio.to_thread(_import_browser_use)
+    from browser_patch import apply_patches
 
-# --- FASTAPI SETUP ---
+    # Apply the "Deep Fix" for radio buttons at runtime
+    apply_patches()
+    if ADAPTIVE_SETTLE:
+        page_settle.install(settle_detector)
+    if network_filter.enabled:
+        netfilter.install(network_filter)
+    _patched = True
+
+async def _init_llm():
+    global llm
+    if llm is not None:
+        return "preset"  # set before start-up (e.g. the offline benchmark's scripted model)
+    llm = await asyncio.to_thread(build_llm)
+
+async def _init_runtime():
+    await readiness.run("runtime", _init_browser_runtime)
+    await readiness.run("llm", _init_llm)
+
+async def ensure_runtime():
+    """Waits for (or starts) the browser-use patches and LLM client; called by every agent run."""
+    global _runtime
+    if _runtime is None:
+        _runtime = asyncio.ensure_future(_init_runtime())
+    await asyncio.shield(_runtime)
+    if not _patched or llm is None:
+        _runtime = None  # let the next task retry
+        raise RuntimeError(readiness.error("runtime") or readiness.error("llm") or "Agent runtime unavailable")
+
+async def _warm_mongo():
+    await client.admin.command("ping")
+    stores = [session_store, form_memory, applied_jobs, step_budget, flow_store]
+    if lease_queue is not None:
+        stores.append(lease_queue)
+    results = await asyncio.gather(*(store.ensure_indexes() for store in stores), return_exceptions=True)
+    for store, result in zip(stores, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ [Warm-up] Could not ensure {type(store).__name__} indexes: {result}")
+
+async def _warm_browser(username, platform):
+    session_data = await load_session(username, platform)
+    await browser_pool.prewarm(username, platform, session_data)
+
+async def _warm_browsers():
+    keys = await session_store.recent(min(WARM_BROWSERS, browser_pool.max_size))
+    results = await asyncio.gather(*(_warm_browser(u, p) for u, p in keys), return_exceptions=True)
+    for (username, platform), result in zip(keys, results):
+        if isinstance(result, Exception):
+            print(f"⚠️ [Warm-up] Could not pre-launch browser for {username}@{platform}: {result}")
+    return {"launched": sum(1 for r in results if not isinstance(r, Exception)), "requested": WARM_BROWSERS}
+
+async def warm_up():
+    global lease_worker
+    delay = 2.0
+    while True:
+        checks = [ensure_runtime()]
+        if readiness.components["mongo"]["status"] != "ok":
+            checks.append(readiness.run("mongo", _warm_mongo))
+        await asyncio.gather(*checks, return_exceptions=True)
+        if readiness.ready:
+            break
+        failed = [name for name in readiness.required if readiness.components[name]["status"] != "ok"]
+        print(f"⏳ [Warm-up] Not ready ({', '.join(failed)}); retrying in {delay:.0f}s.")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WARM_UP_RETRY_MAX)
+    print(f"✅ [Warm-up] Ready to take work after {readiness.ready_after_s}s.")
+    if lease_queue is not None and AGENT_WORKERS > 0:
+        # Claim shared work only once this process can run it.
+        lease_worker = LeaseWorker(
+            lease_queue, task_queue, TASK_KINDS, capacity=AGENT_WORKERS,
+            heartbeat_interval=float(os.getenv("TASK_HEARTBEAT_SECONDS", "15"))
+        )
+        await lease_worker.start()
+    if WARM_BROWSERS > 0:
+        await readiness.run("browsers", _warm_browsers)
+metrics.REGISTRY.collect_stats("agent_llm", llm_controller.stats)
+metrics.REGISTRY.collect_stats("agent_network", network_filter.stats)
+metrics.REGISTRY.collect_stats("agent_settle", settle_detector.stats)
+metrics.REGISTRY.collect_stats("agent_vision", screenshot_pipeline.stats)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("🚀 [Lifespan] Server starting up. Browser will initialize on task start.")
+    global task_queue
+    if lease_queue is None and AGENT_WORKERS < 1:
+        # A local queue with nobody draining it would accept tasks and never run them.
+        raise SystemExit("AGENT_WORKERS=0 (API-only) needs TASK_BACKEND=mongo")
+    print("🚀 [Lifespan] Server starting up; warming up in the background (see /ready).")
+    await browser_pool.start()
+    if lease_queue is None or AGENT_WORKERS > 0:
+        task_queue = TaskQueue(execute_task, num_workers=AGENT_WORKERS)
+        await task_queue.start()
+    warm_up_task = asyncio.create_task(warm_up())
     yield
-    # Shutdown: Close the browser
-    if global_browser:
-        print("🛑 [Lifespan] Closing Global Browser...")
-        try:
-            await global_browser.stop()
-            print("🛑 [Lifespan] Browser stopped.")
-        except Exception as e:
-            print(f"🛑 [Lifespan] Error during browser stop: {e}")
+    warm_up_task.cancel()
+    await asyncio.gather(warm_up_task, return_exceptions=True)
+    if lease_worker is not None:
+        await lease_worker.stop()
+    if task_queue is not None:
+        await task_queue.stop()
+    await job_filter.close()
+    # Shutdown: Close pooled browsers
+    print("🛑 [Lifespan] Closing pooled browsers...")
+    try:
+        await browser_pool.close()
+    except Exception as e:
+        print(f"🛑 [Lifespan] Error during browser stop: {e}")
 
 app = FastAPI(lifespan=lifespan)
 
 class TaskRequest(BaseModel):
     url: str
-    resume_text: str
+    resume_text: str = ""
+    resume_id: str = ""  # from POST /resumes; replaces resume_text (and resume_path if empty)
     resume_path: str = ""
     rules: str = ""
     username: str = ""
     password: str = ""
     platform_name: str = "LinkedIn"
     login_url: str = ""
+    prefilter: bool = True  # score the posting against resume/rules before launching a browser
 
-def generate_task_prompt(request: TaskRequest):
+def generate_task_prompt(request: TaskRequest, logged_in: bool = False):
     """Generates a dynamic prompt based on the requested platform."""
     is_url = request.url.lower().startswith("http")
     target_url = request.url if is_url else ""
@@ -152,57 +419,40 @@ def generate_task_prompt(request: TaskRequest):
     elif platform.lower() == "indeed" and not target_url:
         target_url = "https://www.indeed.com/"
 
-    prompt = f"""
-    Goal: Apply for jobs on {platform}.
-    
-    1. LOGIN CHECK & PERSISTENCE:
-       - Go to '{login_url}'
-       - **IMPORTANT**: First, check if you are already logged in (look for your profile picture, dashboard, "My Jobs", or "Logout" button).
-       - If you ARE already logged in, do NOT log out. Proceed directly to Step 2.
-       - If you ARE NOT logged in (you see a login form):
-         - For Indeed/Glassdoor: If no password is provided ({request.password}), inform the user that the session has expired and they MUST re-initialize via the Platforms page.
-         - For other platforms: Use {request.username} / {request.password}.
- 
-    2. SMART SEARCH & ADAPTIVE FILTERING:
-       - Target: {target_url or 'Search for ' + search_context}
-       - User Rules: {request.rules}
-       - BLOCKER DETECTION (CRITICAL):
-         - If a job redirects you to an external site requiring a **Mandatory OTP (Mobile/Email)** or a **Long Registration Form** (e.g., Jobseager.com), you MUST skip it.
-         - Do not waste steps on sites that require registration from scratch.
-         - PRIORITIZE "Quick Apply", "Easy Apply", or internal platform applications.
-       - If no results are found for a filtered search, BROADEN the search (nearby cities, remote) or lower salary/CTC.
- 
-    3. MANDATORY RESUME UPLOAD (CRITICAL):
-       - FILE PATH: {request.resume_path}
-       - You MUST use the 'upload_file' tool for ANY resume or CV upload field you encounter.
-       - NEVER skip this. If the 'upload_file' tool returns an error, you MUST fix the path or try a different upload element.
-       - DO NOT assume a resume upload succeeded if the tool explicitly failed.
- 
-    4. FORM HANDLING:
-       - Context: {request.resume_text[:2000]}
-       - Company Email: Fallback to '{request.username}'.
-       - Autocomplete: Type, WAIT, and CLICK a dropdown option.
-       - Submit once all fields are complete.
- 
-    5. POST-APPLICATION TRACKING (PLATFORM SPECIFIC):
-       - On platforms like Monster/Foundit:
-         - If the application was completed on an EXTERNAL site (after clicking 'Apply' on Monster), you MUST return to the Monster job tracker/dashboard (e.g., https://www.monster.com/profile/job-tracker).
-         - Find the job you just applied for.
-         - Click the **"Mark As Applied"** button to ensure the status is correctly updated on the source platform.
- 
-    CRITICAL RULES:
-    1. STOP AFTER ONE SUCCESSFUL SUBMISSION.
-    2. BE DECISIVE: If a site looks like it will take more than 20 steps to navigate, skip it and move to a simpler one.
-    3. SESSION PERSISTENCE: Handle cookie banners and popups by dismissing them.
-    4. NO OTP/REGISTRATION: Abandon any application that requires an OTP or a brand-new account registration on an external site.
-    """
+    resume_profile = get_resume_profile(request.resume_text)
+    profile_text = format_resume_profile(resume_profile)
+    if not resume_profile["experience"] or not resume_profile["skills"]:
+        # The parser missed part of the resume; give the model the raw text as well.
+        excerpt = request.resume_text[:2000]
+        profile_text = f"{profile_text}\nResume text:\n{excerpt}" if profile_text else excerpt
+    profile = "\n".join(f"         {line}" for line in profile_text.splitlines())
+
+    prompt = render_task_prompt(
+        platform,
+        logged_in=logged_in,
+        login_url=login_url,
+        username=request.username,
+        password=request.password,
+        target=target_url or 'Search for ' + search_context,
+        rules=request.rules,
+        resume_path=request.resume_path,
+        profile=profile,
+    )
     return prompt
 
-@app.post("/run-task")
-async def run_task(request: TaskRequest):
-    global global_browser
-    print(f"📥 Received Request: platform={request.platform_name}, url={request.url}")
-    
+async def resolve_resume(request):
+    """Fills resume_text (and resume_path if missing) from a stored resume_id."""
+    if not request.resume_id or request.resume_text:
+        return
+    doc = await resume_store.get(request.resume_id)
+    if doc is None:
+        raise ValueError(f"Unknown resume_id {request.resume_id}")
+    request.resume_text = doc["text"]
+    if not request.resume_path and doc.get("path"):
+        request.resume_path = doc["path"]
+
+def authorize_resume_path(request) -> list:
+    """Normalizes the resume path and returns it as the agent's allowed upload list."""
     # --- PATH DIAGNOSTICS ---
     authorized_paths = []
     if request.resume_path:
@@ -213,171 +463,677 @@ async def run_task(request: TaskRequest):
             authorized_paths.append(request.resume_path)
         else:
             print(f"❌ [Path Diagnostic] Status: MISSING")
-    
+    return authorized_paths
+
+async def replay_flow(agent, request: TaskRequest, supervisor: RunSupervisor, form_run):
+    """
+    Replays the recorded flow for this kind of job page, if there is one,
+    up to (not including) its final step. Returns the steps replayed; the
+    agent always runs afterwards and does the submit itself.
+    """
+    if not FLOW_REPLAY or not looks_like_job_url(request.url):
+        return []
     try:
-        session_data = await load_session(request.username, request.platform_name)
-        full_task = generate_task_prompt(request)
-        
-        run_profile = BrowserProfile(
-            headless=False,
-            executable_path='C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe',
-            disable_security=True,
-            wait_for_network_idle_page_load_time=3.0,
-            wait_between_actions=2.0,
-            keep_alive=True,
-            extra_chromium_args=[
-                '--disable-blink-features=AutomationControlled',
-                '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-                '--window-size=1920,1080',
-                '--no-sandbox',
-                '--disable-infobars',
-                '--password-store=basic'
-            ]
+        flow = await flow_store.get(request.username, request.platform_name, request.url)
+        if flow is None:
+            return []
+        await agent.browser_session.navigate_to(request.url)
+    except Exception as e:
+        print(f"⚠️ [Replay] Could not start replay: {e}")
+        return []
+    # The job is open already; the agent must not reopen it over a half-done application.
+    agent.initial_actions = None
+    outcome = await replay(agent, flow["steps"], template_values(request), form_run.lookup)
+    print(
+        f"⏩ [Replay] {outcome['replayed']}/{len(flow['steps'])} recorded steps in {outcome['seconds']}s; "
+        f"handing over to the agent ({outcome['miss'] or 'final step'})."
+    )
+    try:
+        await flow_store.record_replay(flow, outcome)
+    except Exception as e:
+        print(f"⚠️ [Replay] Could not update flow stats: {e}")
+    record = current_task.get()
+    if record is not None:
+        record.events.publish("replay", job=request.url, steps=len(flow["steps"]), **outcome)
+    if outcome["replayed"]:
+        supervisor.pending_hint = (
+            f"FLOW REPLAY: The first {outcome['replayed']} steps of this application were already done "
+            "automatically and the browser is on the resulting page. Continue from here; do not reopen "
+            "the job or restart the application. Check the filled fields against this job before you "
+            "submit, and only call done with success=true once the page confirms the application was sent."
         )
-        
-        temp_session_file = None
-        if session_data:
-            fd, temp_session_file = tempfile.mkstemp(suffix='.json', prefix='linkedin_session_')
-            os.close(fd)
-            with open(temp_session_file, 'w') as f:
-                json.dump(session_data, f)
-            run_profile.storage_state = temp_session_file
-
-        task_browser = Browser(browser_profile=run_profile)
-        await task_browser.start()
-
-        # FIX: Explicitly authorize the resume path for the agent
-        agent = Agent(
-            task=full_task,
-            llm=llm,
-            browser=task_browser,
-            use_vision=True,
-            max_failures=5,
-            flash_mode=False,
-            available_file_paths=authorized_paths
+    return flow["steps"][:outcome["replayed"]]
+
+async def run_agent(request: TaskRequest, task_browser, authorized_paths, form_run, logged_in=False,
+                    exclude_actions=None):
+    """One agent run on an already leased browser (or tab). Saves the session and what was learned."""
+    await ensure_runtime()
+    from browser_use import Agent
+
+    record = current_task.get()
+    settle = page_settle.new_step_stats()
+    page_settle.step_settle.set(settle)
+    max_steps = await step_budget.budget(request.platform_name)
+    supervisor = RunSupervisor(max_steps, stall_steps=STALL_STEPS, enabled=RUN_SUPERVISOR)
+
+    async def on_step_end(running_agent):
+        step_data = step_event_data(running_agent)
+        if step_data.get("duration_s") is not None:
+            metrics.STEP_SECONDS.observe(step_data["duration_s"])
+        step_settle = dict(settle, settle_s=round(settle["settle_s"], 2))
+        settle.update(page_settle.new_step_stats())
+        try:
+            verdict = supervisor.observe(running_agent)
+        except Exception as e:
+            verdict = None
+            print(f"⚠️ [Supervisor] Could not check step: {e}")
+        if record is None:
+            return
+        try:
+            record.events.publish("step", job=request.url, settle=step_settle, **step_data)
+            if verdict:
+                record.events.publish("supervisor", job=request.url, **verdict)
+        except Exception as e:
+            print(f"⚠️ Could not publish step event: {e}")
+
+    async def should_stop():
+        # Cooperative cancel via POST /tasks/{id}/cancel, or the supervisor giving up; checked between steps.
+        return bool(record and record.cancel_requested) or supervisor.should_stop()
+
+    # FIX: Explicitly authorize the resume path for the agent
+    agent = Agent(
+        task=generate_task_prompt(request, logged_in=logged_in),
+        llm=llm,
+        browser=task_browser,
+        tools=register_applied_job_actions(
+            build_form_tools(form_run, exclude_actions), applied_jobs, request.username, request.platform_name
+        ),
+        use_vision=True,
+        max_failures=5,
+        flash_mode=False,
+        available_file_paths=authorized_paths,
+        register_should_stop_callback=should_stop
+    )
+    screenshot_pipeline.attach(agent)
+    supervisor.attach(agent)
+    recorder = FlowRecorder()
+    if FLOW_REPLAY:
+        recorder.attach(agent)
+
+    replayed_steps = await replay_flow(agent, request, supervisor, form_run)
+    # Step limit per platform (up to STEP_BUDGET_MAX, 100 by default) from past runs.
+    history = await agent.run(max_steps=max_steps, on_step_end=on_step_end)
+
+    try:
+        if agent.browser_session:
+            updated_state = await agent.browser_session._cdp_get_storage_state()
+            if updated_state:
+                await save_session(request.username, request.platform_name, updated_state)
+    except Exception as se:
+        print(f"⚠️ Failed to save session: {se}")
+
+    if history.is_successful():
+        if looks_like_job_url(request.url):
+            try:
+                await applied_jobs.mark_applied(request.username, request.platform_name, request.url)
+            except Exception as ae:
+                print(f"⚠️ Failed to record applied job: {ae}")
+        try:
+            learned = await form_run.commit()
+            if learned:
+                print(f"🧠 Saved {learned} new form answer(s) for {request.username} on {request.platform_name}.")
+        except Exception as fe:
+            print(f"⚠️ Failed to save form answers: {fe}")
+    print(f"🧠 Form memory: {form_run.hits} field(s) answered from memory, {form_run.misses} unknown.")
+
+    if FLOW_REPLAY and history.is_successful() and looks_like_job_url(request.url):
+        # Replayed prefix + what the agent did after it; replaces the flow it started from.
+        steps, complete = build_trace(
+            history.history, template_values(request), request.url, recorder.forms, form_run.lookup
         )
+        try:
+            if await flow_store.save(request.username, request.platform_name, request.url, replayed_steps + steps, complete):
+                print(f"📼 [Replay] Recorded {len(replayed_steps) + len(steps)} step(s) for {request.platform_name} ({'complete' if complete else 'partial'}).")
+        except Exception as e:
+            print(f"⚠️ [Replay] Could not record flow: {e}")
 
-        # INCREASED STEP LIMIT TO 100
-        history = await agent.run(max_steps=100)
-        
+    steps = history.number_of_steps()
+    if supervisor.stop_reason:
+        outcome = supervisor.stop_reason
+    elif history.is_successful():
+        outcome = "completed"
+    elif record is not None and record.cancel_requested:
+        outcome = "cancelled"
+    elif not history.is_done() and steps >= max_steps:
+        outcome = "max_steps"
+    else:
+        outcome = "failed"
+    if outcome != "cancelled":
         try:
-            if agent.browser_session:
-                updated_state = await agent.browser_session._cdp_get_storage_state()
-                if updated_state:
-                    await save_session(request.username, request.platform_name, updated_state)
-        except Exception as se:
-            print(f"⚠️ Failed to save session: {se}")
-        finally:
-            await task_browser.stop()
-            if temp_session_file and os.path.exists(temp_session_file):
-                try:
-                    os.remove(temp_session_file)
-                except:
-                    pass
-
-        final_res = history.final_result()
-        result = str(final_res) if final_res is not None else "Agent finished with no result."
-        return {"status": "completed", "result": result}
+            # Replayed steps did the work agent steps would have; a budget learned from
+            # replayed runs alone would be too small for a run that has to start from scratch.
+            await step_budget.record(
+                request.platform_name, steps + len(replayed_steps), outcome == "completed", outcome, max_steps
+            )
+        except Exception as e:
+            print(f"⚠️ Failed to record run outcome: {e}")
+
+    if supervisor.stop_reason:
+        return {
+            "status": "stopped",
+            "result": f"Stopped early after {steps} steps ({supervisor.stop_reason}): {supervisor.stop_detail}.",
+            "stop_reason": supervisor.stop_reason,
+        }
+
+    final_res = history.final_result()
+    result = str(final_res) if final_res is not None else "Agent finished with no result."
+    return {"status": "completed", "result": result}
 
+@metrics.track_task("task", TRACE_DIR)
+async def execute_task(request: TaskRequest):
+    """Runs one agent task end to end. Called by the task queue workers."""
+    print(f"📥 Running Task: platform={request.platform_name}, url={request.url}")
+    llm_task_key.set(f"{request.username}@{request.platform_name.lower()}")
+    # Patches (network filter, settle hooks) must be in place before a pooled browser launches.
+    await ensure_runtime()
+
+    # Re-queued or duplicate requests end here, before Chrome or the LLM is touched.
+    if looks_like_job_url(request.url) and await applied_jobs.check(request.username, request.platform_name, request.url):
+        print(f"⏭️ Already applied to {request.url} for {request.username}, skipping.")
+        return {"status": "skipped", "result": "Already applied to this job."}
+
+    await resolve_resume(request)
+    if request.prefilter:
+        screen = await job_filter.screen(request)
+        if screen["decision"] == "reject":
+            print(f"⏭️ Pre-filter rejected {request.url} in {screen['ms']}ms: {screen['reason']}")
+            return {"status": "skipped", "result": screen["reason"], "relevance": screen}
+    authorized_paths = authorize_resume_path(request)
+    session_data = await load_session(request.username, request.platform_name)
+    form_run = await form_memory.start_run(
+        request.username, request.platform_name, get_resume_profile(request.resume_text)
+    )
+
+    # Warm browser per (username, platform); the saved session only seeds a fresh launch.
+    async with browser_pool.lease(request.username, request.platform_name, session_data) as task_browser:
+        return await run_agent(request, task_browser, authorized_paths, form_run)
+
+class BatchRequest(BaseModel):
+    jobs: List[str]  # job URLs or search queries
+    resume_text: str = ""
+    resume_id: str = ""
+    resume_path: str = ""
+    rules: str = ""
+    username: str = ""
+    password: str = ""
+    platform_name: str = "LinkedIn"
+    login_url: str = ""
+    prefilter: bool = True
+    priority: int = 5
+    tabs: int = 1  # agents running at once in separate tabs of the same browser
+
+@metrics.track_task("batch", TRACE_DIR)
+async def execute_batch(request: BatchRequest):
+    """
+    Works through a list of jobs for one user/platform in a single leased browser.
+    Login, cookie banners and browser startup are paid once; per-job results are
+    reported on the task record as they finish.
+    """
+    record = current_task.get()
+    report = record.report if record else (lambda item: None)
+    print(f"📥 Running Batch: platform={request.platform_name}, jobs={len(request.jobs)}")
+    llm_task_key.set(f"{request.username}@{request.platform_name.lower()}")
+    await ensure_runtime()
+    await resolve_resume(request)
+
+    base = request.model_dump(exclude={"jobs", "priority"})
+    results = []
+    todo = []
+    seen = set()
+    for job in request.jobs:
+        job_request = TaskRequest(url=job, **base)
+        key = canonicalize_url(job) if looks_like_job_url(job) else job.strip().lower()
+        if key in seen:
+            outcome = {"job": job, "status": "skipped", "result": "Duplicate in this batch."}
+        elif looks_like_job_url(job) and await applied_jobs.check(request.username, request.platform_name, job):
+            outcome = {"job": job, "status": "skipped", "result": "Already applied to this job."}
+        else:
+            todo.append(job_request)
+            outcome = None
+        seen.add(key)
+        if outcome:
+            results.append(outcome)
+            report(outcome)
+
+    if todo and request.prefilter:
+        # Pages are fetched concurrently; rejected jobs never reach the browser.
+        screens = await asyncio.gather(*(job_filter.screen(j) for j in todo))
+        kept = []
+        for job_request, screen in zip(todo, screens):
+            if screen["decision"] == "reject":
+                outcome = {"job": job_request.url, "status": "skipped", "result": screen["reason"], "relevance": screen}
+                results.append(outcome)
+                report(outcome)
+            else:
+                kept.append(job_request)
+        if len(kept) < len(todo):
+            print(f"⏭️ [Batch] Pre-filter rejected {len(todo) - len(kept)}/{len(todo)} job(s).")
+        todo = kept
+
+    if todo:
+        authorized_paths = authorize_resume_path(todo[0])
+        for job_request in todo[1:]:
+            job_request.resume_path = todo[0].resume_path
+        session_data = await load_session(request.username, request.platform_name)
+        form_run = await form_memory.start_run(
+            request.username, request.platform_name, get_resume_profile(request.resume_text)
+        )
+
+        async def run_job(job_request, browser, logged_in, exclude_actions=None):
+            try:
+                outcome = await run_agent(
+                    job_request, browser, authorized_paths, form_run, logged_in=logged_in,
+                    exclude_actions=exclude_actions
+                )
+            except Exception as e:
+                print(f"❌ [Batch] Job {job_request.url} failed: {e}")
+                outcome = {"status": "failed", "result": str(e)}
+            outcome = {"job": job_request.url, **outcome}
+            results.append(outcome)
+            report(outcome)
+
+        tabs = max(1, min(request.tabs, MAX_TABS_PER_BROWSER))
+        async with browser_pool.lease(request.username, request.platform_name, session_data) as task_browser:
+            # The first job runs alone so login happens once, before any tabs fan out.
+            print(f"📄 [Batch] Job 1/{len(todo)}: {todo[0].url}")
+            await run_job(todo[0], task_browser, logged_in=False)
+            rest = todo[1:]
+            if tabs == 1:
+                # After the first run the browser carries the logged-in session forward.
+                for i, job_request in enumerate(rest, start=2):
+                    print(f"📄 [Batch] Job {i}/{len(todo)}: {job_request.url}")
+                    await run_job(job_request, task_browser, logged_in=True)
+            elif rest:
+                print(f"🗂️ [Batch] Running {len(rest)} jobs across up to {tabs} tabs.")
+                group = TabGroup(task_browser, max_tabs=tabs)
+
+                async def run_in_tab(job_request):
+                    async with group.tab() as tab_browser:
+                        await run_job(job_request, tab_browser, logged_in=True, exclude_actions=CROSS_TAB_ACTIONS)
+
+                await asyncio.gather(*(run_in_tab(j) for j in rest))
+
+    done = sum(1 for r in results if r["status"] == "completed")
+    return {"status": "completed", "result": f"{done}/{len(request.jobs)} jobs ran.", "jobs": results}
+
+class TaskSubmission(TaskRequest):
+    priority: int = 5
+
+# Task kinds a (possibly remote) worker knows how to run.
+TASK_KINDS = {"task": (TaskRequest, execute_task), "batch": (BatchRequest, execute_batch)}
+
+async def submit(request, priority: int = 5, kind: str = "task"):
+    """Queues work on the configured backend and returns its task record."""
+    if lease_queue is not None:
+        return await lease_queue.submit(kind, request.model_dump(), priority)
+    return task_queue.submit(request, priority=priority, handler=TASK_KINDS[kind][1])
+
+async def find_task(task_id: str):
+    record = task_queue.get(task_id) if task_queue is not None else None
+    if record is None and lease_queue is not None:
+        record = await lease_queue.get(task_id)
+    return record
+
+async def cancel(task_id: str) -> bool:
+    if task_queue is not None and task_queue.get(task_id) is not None:
+        return task_queue.cancel(task_id)
+    if lease_queue is not None:
+        return await lease_queue.cancel(task_id)
+    return False
+
+async def reject_if_applied(request: TaskRequest):
+    if looks_like_job_url(request.url) and await applied_jobs.check(request.username, request.platform_name, request.url):
+        raise HTTPException(status_code=409, detail="Already applied to this job")
+
+async def require_resume(request):
+    if request.resume_id and not request.resume_text and await resume_store.get(request.resume_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown resume_id; upload it via /resumes first")
+
+@app.post("/tasks")
+async def submit_task(request: TaskSubmission):
+    """Queues a task and returns its ID immediately."""
+    await reject_if_applied(request)
+    await require_resume(request)
+    record = await submit(TaskRequest(**request.model_dump(exclude={"priority"})), priority=request.priority)
+    return {"task_id": record.task_id, "status": record.status}
+
+@app.get("/ready")
+async def ready():
+    """200 once browser-use, the LLM client and Mongo are warmed up; 503 (with what is missing) before."""
+    data = readiness.snapshot()
+    data["workers"] = AGENT_WORKERS if task_queue is not None else 0
+    data["browsers"] = browser_pool.stats()["size"]
+    return JSONResponse(data, status_code=200 if data["ready"] else 503)
+
+@app.get("/tasks")
+async def queue_stats():
+    data = {**(task_queue.stats() if task_queue is not None else {}), "browsers": browser_pool.stats(),
+            "applied_jobs": applied_jobs.stats()}
+    if lease_queue is not None:
+        data["lease_queue"] = await lease_queue.stats()
+    return data
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Queue wait vs. model time for LLM calls since startup."""
+    return llm_controller.stats()
+
+@app.get("/network/stats")
+async def network_stats():
+    """Requests blocked by the network filter and an estimate of the bytes saved."""
+    return network_filter.stats()
+
+@app.get("/settle/stats")
+async def settle_stats():
+    """Time spent waiting for pages to settle after actions since startup."""
+    return {"enabled": ADAPTIVE_SETTLE, **settle_detector.stats()}
+
+@app.get("/replay/stats")
+async def replay_stats():
+    """Recorded-flow replays: how far they got before the agent took over, and steps saved."""
+    return {"enabled": FLOW_REPLAY, **flow_store.stats()}
+
+@app.get("/supervisor/stats")
+async def supervisor_stats():
+    """How runs ended (completed, loop, stalled, verification_wall, ...) and the current step budgets."""
+    return {"enabled": RUN_SUPERVISOR, **step_budget.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text format: timing histograms plus every stats endpoint as gauges."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/vision/stats")
+async def vision_stats():
+    """Screenshots skipped, cropped or re-encoded for the model, and bytes saved."""
+    return screenshot_pipeline.stats()
+
+@app.get("/tasks/{task_id}")
+async def task_status(task_id: str):
+    record = await find_task(task_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Task not found")
+    data = record.to_dict()
+    data.pop("result", None)
+    data.pop("error", None)
+    return data
+
+@app.get("/tasks/{task_id}/result")
+async def task_result(task_id: str):
+    record = await find_task(task_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not record.done.is_set():
+        raise HTTPException(status_code=409, detail=f"Task is still {record.status}")
+    return record.to_dict()
+
+@app.post("/tasks/{task_id}/cancel")
+async def cancel_task(task_id: str):
+    """Cancels a queued task, or asks a running one to stop after its current step."""
+    record = await find_task(task_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if not await cancel(task_id):
+        raise HTTPException(status_code=409, detail=f"Task is already {record.status}")
+    return {"task_id": task_id, "status": record.status, "cancel_requested": True}
+
+@app.get("/tasks/{task_id}/events")
+async def task_events(task_id: str, request: Request, after: int = 0):
+    """
+    Server-sent events for a task: queued, started, step (URL, actions, timing,
+    errors), progress, cancelling, finished. Late subscribers get the buffered
+    history replayed; reconnects resume from Last-Event-ID.
+    """
+    record = await find_task(task_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Task not found")
+    last_id = request.headers.get("last-event-id")
+    if last_id and last_id.isdigit():
+        after = int(last_id)
+
+    async def stream():
+        async for event in record.events.subscribe(after):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/tasks/{task_id}/ws")
+async def task_events_ws(websocket: WebSocket, task_id: str, after: int = 0):
+    """Same events as /tasks/{id}/events over a WebSocket; send "cancel" to cancel the task."""
+    await websocket.accept()
+    record = await find_task(task_id)
+    if not record:
+        await websocket.close(code=4404, reason="Task not found")
+        return
+
+    async def listen():
+        async for message in websocket.iter_text():
+            if message.strip().lower() == "cancel":
+                await cancel(task_id)
+
+    listener = asyncio.create_task(listen())
+    try:
+        async for event in record.events.subscribe(after):
+            if event is not None:
+                await websocket.send_text(json.dumps(event, default=str))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        listener.cancel()
+
+@app.post("/run-task")
+async def run_task(request: TaskRequest):
+    """Blocking variant kept for existing callers; still goes through the worker pool."""
+    print(f"📥 Received Request: platform={request.platform_name}, url={request.url}")
+    await reject_if_applied(request)
+    await require_resume(request)
+    record = await submit(request)
+    await record.done.wait()
+    if record.status != "completed":
+        print(f"❌ AGENT ERROR:\n{record.error}")
+        raise HTTPException(status_code=500, detail=record.error or record.status)
+    return record.result
+
+@app.post("/run-batch")
+async def run_batch(request: BatchRequest):
+    """
+    Applies to a list of jobs in one browser session. Streams one JSON line per job
+    as it finishes (application/x-ndjson); the task can also be polled via /tasks/{id}.
+    """
+    print(f"📥 Received Batch: platform={request.platform_name}, jobs={len(request.jobs)}")
+    if not request.jobs:
+        raise HTTPException(status_code=400, detail="No jobs given")
+    await require_resume(request)
+    record = await submit(request, priority=request.priority, kind="batch")
+
+    async def stream():
+        yield json.dumps({"task_id": record.task_id, "jobs": len(request.jobs)}) + "\n"
+        sent = 0
+        while True:
+            record.updated.clear()
+            while sent < len(record.progress):
+                yield json.dumps(record.progress[sent]) + "\n"
+                sent += 1
+            if record.done.is_set():
+                break
+            await record.updated.wait()
+        yield json.dumps({"task_id": record.task_id, "status": record.status, "error": record.error}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+class JobFilterSettings(BaseModel):
+    enabled: Optional[bool] = None
+    min_score: Optional[float] = None
+    require: Optional[List[str]] = None  # at least one must appear in the posting
+    exclude: Optional[List[str]] = None  # reject if any appears in the title or location
+
+class ScreenRequest(BaseModel):
+    url: str
+    username: str = ""
+    resume_text: str = ""
+    resume_id: str = ""
+    resume_path: str = ""
+    rules: str = ""
+
+@app.get("/job-filter/stats")
+async def job_filter_stats():
+    """Jobs screened, rejected and passed by the pre-filter, and how long screening took."""
+    return job_filter.stats()
+
+@app.get("/job-filter/{username}")
+async def get_job_filter(username: str):
+    return await job_filter.get_settings(username)
+
+@app.put("/job-filter/{username}")
+async def update_job_filter(username: str, settings: JobFilterSettings):
+    """Per-user pre-filter threshold and keyword lists; omitted fields keep their value."""
+    return await job_filter.set_settings(username, **settings.model_dump())
+
+@app.post("/job-filter/screen")
+async def screen_job(request: ScreenRequest):
+    """Dry run of the pre-filter for one URL, with the score and the terms behind it."""
+    await require_resume(request)
+    await resolve_resume(request)
+    return await job_filter.screen(request)
+
+class ResumePathRequest(BaseModel):
+    path: str
+
+# /resumes/from-path only reads resumes the backend saved under this directory.
+RESUME_UPLOAD_DIR = os.getenv("RESUME_UPLOAD_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "backend", "uploads"
+)
+
+def resume_summary(doc: dict, cached: bool = None):
+    summary = {
+        "resume_id": doc["_id"],
+        "filename": doc.get("filename"),
+        "pages": doc.get("pages"),
+        "chars": doc.get("chars"),
+        "sections": sorted(doc.get("sections", {})),
+        "profile": doc.get("profile"),
+    }
+    if cached is not None:
+        summary["cached"] = cached
+    return summary
+
+@app.post("/resumes")
+async def upload_resume(file: UploadFile = File(...)):
+    """Parses an uploaded resume (PDF or text) once; returns its resume_id for later tasks."""
+    data = await file.read()
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty file")
+    try:
+        doc, cached = await resume_store.ingest(data, file.filename or "")
     except Exception as e:
-        import traceback
-        error_msg = traceback.format_exc()
-        print(f"❌ AGENT ERROR:\n{error_msg}")
-        raise HTTPException(status_code=500, detail=error_msg)
+        raise HTTPException(status_code=422, detail=f"Could not read resume: {e}")
+    return resume_summary(doc, cached)
+
+@app.post("/resumes/from-path")
+async def ingest_resume_path(request: ResumePathRequest):
+    """Same as POST /resumes for a PDF or text file the backend saved under RESUME_UPLOAD_DIR."""
+    try:
+        path = resolve_upload(request.path, RESUME_UPLOAD_DIR)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        doc, cached = await resume_store.ingest_path(path)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Could not read resume: {e}")
+    return resume_summary(doc, cached)
+
+@app.get("/resumes/{resume_id}")
+async def get_resume(resume_id: str, include_text: bool = False):
+    doc = await resume_store.get(resume_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    summary = resume_summary(doc)
+    if include_text:
+        summary["text"] = doc["text"]
+        summary["section_text"] = doc.get("sections", {})
+    return summary
 
 class SessionCaptureRequest(BaseModel):
     username: str
     platform_name: str
     login_url: str
+    login_cookies: Optional[List[str]] = None  # cookies that prove the login, if not built in
+    timeout: Optional[float] = None
+
+# Seconds a user gets to finish logging in; the capture ends as soon as they do.
+CAPTURE_TIMEOUT = float(os.getenv("CAPTURE_TIMEOUT", "300"))
 
 @app.post("/capture-session")
 async def capture_session(request: SessionCaptureRequest):
     """
-    Interactive session capture. 
-    Opens browser, inputs email, and waits 60 seconds for manual OTP/Login.
+    Interactive session capture.
+    Opens a real Chrome window on the login page and saves the session as soon
+    as the login is detected (or gives up after CAPTURE_TIMEOUT seconds).
     """
-    global global_browser
     print(f"📥 Received Capture Request: platform={request.platform_name}, user={request.username}")
-    
+
+    chrome_path = find_chrome(os.getenv("CHROME_EXECUTABLE"), WINDOWS_CHROME if os.name == "nt" else None)
+    if not chrome_path:
+        raise HTTPException(status_code=500, detail="No Chrome found; set CHROME_EXECUTABLE.")
+    capture = SessionCapture(
+        chrome_path,
+        request.login_url,
+        request.platform_name,
+        login_cookies=request.login_cookies,
+        timeout=request.timeout or CAPTURE_TIMEOUT
+    )
     try:
-        import subprocess
-        import tempfile
-        import shutil
-
-        # Create a clean temp directory for this capture session
-        user_data_dir = os.path.join(tempfile.gettempdir(), f"indeed_capture_{request.username.split('@')[0]}")
-        if os.path.exists(user_data_dir):
-            try: shutil.rmtree(user_data_dir)
-            except: pass
-        os.makedirs(user_data_dir, exist_ok=True)
-
-        chrome_path = 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe'
-        debugging_port = 9222
-
-        # Launch REAL Chrome via OS (Completely detached from automation initially)
-        cmd = [
-            chrome_path,
-            f"--remote-debugging-port={debugging_port}",
-            f"--user-data-dir={user_data_dir}",
-            "--no-first-run",
-            "--no-default-browser-check",
-            request.login_url
-        ]
-        
         print(f"🌐 [Capture] Launching REAL Chrome: {request.login_url}")
-        proc = subprocess.Popen(cmd)
-
-        print("\n" + "!"*60)
-        print("🚀 [ULTIMATE STEALTH MODE ACTIVE]")
-        print("1. A REAL CHROME WINDOW HAS OPENED.")
-        print("2. THE AGENT IS NOT CONNECTED YET (COMPLETELY INVISIBLE TO INDEED).")
-        print("3. PLEASE PERFORM YOUR FULL LOGIN NOW.")
-        print(f"4. YOU HAVE 120 SECONDS BEFORE THE AGENT CONNECTS TO SAVE.")
-        print("!"*60 + "\n")
-
-        # Countdown
-        for i in range(120, 0, -1):
-            if i % 10 == 0 or i <= 5:
-                print(f"⏳ [Capture] {i} seconds remaining until capture...")
-            await asyncio.sleep(1)
-
-        # Connect via CDP to save session
-        try:
-            print("\n🔗 [Capture] Connecting to browser to grab session...")
-            # We create a simple browser instance pointing to the CDP URL
-            capture_browser = Browser(
-                browser_profile=BrowserProfile(
-                    cdp_url=f"http://localhost:{debugging_port}",
-                    keep_alive=True
-                )
-            )
-            await capture_browser.start()
-            
-            updated_state = await capture_browser.export_storage_state()
-            if updated_state:
-                if isinstance(updated_state, str):
-                    import json
-                    updated_state = json.loads(updated_state)
-                await save_session(request.username, request.platform_name, updated_state)
-                print(f"✅ [Capture] Session successfully saved for {request.username}")
-            else:
-                print("❌ [Capture] Failed to grab session state.")
-            
-            await capture_browser.stop()
-        except Exception as se:
-            print(f"⚠️ [Capture] Error during session capture: {se}")
-        finally:
-            # Kill the external chrome process
-            try: proc.terminate()
-            except: pass
-
-        return {"status": "completed", "message": "Ultimate stealth capture finished."}
+        await capture.launch()
+        signal_desc = " or ".join(capture.login_cookies + ["leaving the sign-in pages"])
+        print(f"🔐 [Capture] Chrome on port {capture.port} for {request.username}. "
+              f"Waiting up to {int(capture.timeout)}s for the login ({signal_desc})...")
 
+        started = time.monotonic()
+        outcome = await capture.wait_for_login()
+        waited = round(time.monotonic() - started, 1)
+        if outcome != "logged_in":
+            print(f"❌ [Capture] No login detected for {request.username} ({outcome} after {waited}s).")
+            detail = "Timed out waiting for the login" if outcome == "timeout" else "Browser closed before the login finished"
+            raise HTTPException(status_code=408 if outcome == "timeout" else 409, detail=f"{detail}; nothing saved.")
+
+        print(f"🔗 [Capture] Login detected after {waited}s, grabbing session...")
+        updated_state = await capture.export_state()
+        if not updated_state:
+            raise HTTPException(status_code=500, detail="Failed to grab session state.")
+        if isinstance(updated_state, str):
+            updated_state = json.loads(updated_state)
+        await save_session(request.username, request.platform_name, updated_state)
+        print(f"✅ [Capture] Session successfully saved for {request.username}")
+        return {"status": "completed", "message": "Session captured.", "waited_s": waited}
+
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_msg = traceback.format_exc()
         print(f"❌ CAPTURE ERROR:\n{error_msg}")
         raise HTTPException(status_code=500, detail=error_msg)
+    finally:
+        await capture.close()
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8012)
@@ -0,0 +1,260 @@
+import asyncio
+import atexit
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a 5ms DOM pass up to a 20-minute batch.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+# The trace of the task running in this context, if per-run traces are on.
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}  # label values -> [bucket counts..., count, sum]
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 2)
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _label_str(self.labels + ("le",), key + (repr(float(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _label_str(self.labels + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, key)} {series[-2]}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {round(series[-1], 6)}")
+        return lines
+
+class Registry:
+    """Counters, histograms and stats() callbacks, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = {}
+
+    def counter(self, name: str, help_text: str, labels=()):
+        return self.metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def collect_stats(self, prefix: str, stats_fn, labels=None):
+        """
+        Exposes every numeric field of an existing stats() dict as a gauge named
+        prefix_field. Fields whose dict keys are data rather than names (platforms,
+        statuses) are listed in labels as {field: label}; their keys become that
+        label's values, e.g. labels={"budgets": "platform"}.
+        """
+        self.collectors[prefix] = (stats_fn, labels or {})
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        for prefix, (stats_fn, label_fields) in self.collectors.items():
+            try:
+                stats = stats_fn()
+            except Exception:
+                continue
+            gauges = {}
+            for field, labels, value in _flatten(stats, label_fields):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                names, values = zip(*labels) if labels else ((), ())
+                gauges.setdefault(_metric_name(f"{prefix}_{field}"), []).append(f"{_label_str(names, values)} {value}")
+            for name, samples in gauges.items():
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(name + sample for sample in samples)
+        return "\n".join(lines) + "\n"
+
+def _metric_name(name: str) -> str:
+    name = re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+    return name if re.match(r"[a-zA-Z_:]", name) else "_" + name
+
+def _flatten(stats: dict, label_fields: dict, prefix: str = "", labels=()):
+    """Yields (field name, ((label, value), ...), value) for every leaf of a stats dict."""
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and key in label_fields:
+            for label_value, sub in value.items():
+                sub_labels = labels + ((label_fields[key], label_value),)
+                if isinstance(sub, dict):
+                    yield from _flatten(sub, label_fields, name + "_", sub_labels)
+                else:
+                    yield name, sub_labels, sub
+        elif isinstance(value, dict):
+            yield from _flatten(value, label_fields, name + "_", labels)
+        else:
+            yield name, labels, value
+
+REGISTRY = Registry()
+
+TASK_SECONDS = REGISTRY.histogram("agent_task_seconds", "Wall time of one queued task.", ("kind", "status"))
+STEP_SECONDS = REGISTRY.histogram("agent_step_seconds", "Wall time of one agent step.")
+SESSION_SECONDS = REGISTRY.histogram("agent_session_io_seconds", "Saved-session load/save time.", ("op",))
+BROWSER_SECONDS = REGISTRY.histogram("agent_browser_seconds", "Browser launch/stop time.", ("op",))
+LLM_SECONDS = REGISTRY.histogram("agent_llm_call_seconds", "Model call time, excluding queueing.", ("outcome",))
+LLM_WAIT_SECONDS = REGISTRY.histogram("agent_llm_queue_wait_seconds", "Time an LLM call waited for admission.")
+DOM_SECONDS = REGISTRY.histogram("agent_dom_serialize_seconds", "One DOMTreeSerializer pass.")
+TASKS_TOTAL = REGISTRY.counter("agent_tasks_total", "Tasks finished, by kind and status.", ("kind", "status"))
+
+# --- per-run traces ---
+
+class RunTrace:
+    """Spans recorded while one task runs; written as JSON when TRACE_DIR is set."""
+
+    def __init__(self, trace_id: str, kind: str, max_spans: int = 5000):
+        self.trace_id = trace_id
+        self.kind = kind
+        self.started = time.time()
+        self._t0 = time.monotonic()
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, name: str, start: float, duration: float, **attrs):
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return
+        self.spans.append({"name": name, "start_s": round(start - self._t0, 4), "duration_s": round(duration, 4), **attrs})
+
+    def summary(self):
+        totals = {}
+        for span in self.spans:
+            entry = totals.setdefault(span["name"], {"count": 0, "total_s": 0.0})
+            entry["count"] += 1
+            entry["total_s"] = round(entry["total_s"] + span["duration_s"], 4)
+        return totals
+
+    def write(self, directory: str, status: str):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.trace_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "trace_id": self.trace_id, "kind": self.kind, "status": status, "started": self.started,
+                "duration_s": round(time.monotonic() - self._t0, 3), "summary": self.summary(),
+                "spans": self.spans, "dropped_spans": self.dropped,
+            }, f, default=str)
+        return path
+
+def record(histogram: Histogram, name: str, start: float, **labels):
+    """Observes the time since `start` and adds it to the current trace."""
+    duration = time.monotonic() - start
+    histogram.observe(duration, **labels)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(name, start, duration, **labels)
+    return duration
+
+@contextmanager
+def span(histogram: Histogram, name: str, **labels):
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        record(histogram, name, start, **labels)
+
+def track_task(kind: str, trace_dir: str = None):
+    """Decorates a task handler: times it by outcome and, with trace_dir, writes its trace."""
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request, *args, **kwargs):
+            from task_queue import current_task
+
+            task = current_task.get()
+            trace = None
+            if trace_dir:
+                trace = RunTrace(task.task_id if task else f"{kind}-{int(time.time() * 1000)}", kind)
+            token = current_trace.set(trace)
+            start = time.monotonic()
+            status = "failed"
+            try:
+                result = await handler(request, *args, **kwargs)
+                status = result.get("status", "completed") if isinstance(result, dict) else "completed"
+                if task is not None and task.cancel_requested:
+                    status = "cancelled"
+                return result
+            except asyncio.CancelledError:
+                status = "cancelled"
+                raise
+            finally:
+                current_trace.reset(token)
+                TASK_SECONDS.observe(time.monotonic() - start, kind=kind, status=status)
+                TASKS_TOTAL.inc(kind=kind, status=status)
+                if trace is not None:
+                    try:
+                        await asyncio.to_thread(trace.write, trace_dir, status)
+                    except Exception as e:
+                        print(f"⚠️ [Metrics] Could not write trace {trace.trace_id}: {e}")
+        return wrapper
+    return decorator
+
+# --- logging ---
+
+def setup_logging(filename: str, level=logging.DEBUG, fmt: str = "%(asctime)s - %(levelname)s - %(message)s"):
+    """
+    Like logging.basicConfig(filename=...), but the event loop only enqueues
+    records; a background thread owns the file and does the writes.
+    """
+    records = queue.SimpleQueue()
+    file_handler = logging.FileHandler(filename, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(fmt))
+    listener = logging.handlers.QueueListener(records, file_handler, respect_handler_level=True)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    listener.start()
+    atexit.register(listener.stop)  # flushes what is still queued
+    return listener
@@ -0,0 +1,151 @@
+import json
+import os
+
+# Third-party analytics, ad and session-replay hosts. None of them render
+# anything the agent reads, but they keep the network busy long after the page
+# is usable, which pushes back browser-use's network-idle wait.
+TRACKER_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "googleadservices.com", "doubleclick.net",
+    "googlesyndication.com", "adservice.google.com", "connect.facebook.net", "facebook.com/tr?",
+    "bat.bing.com", "clarity.ms", "hotjar.com", "hotjar.io", "fullstory.com", "segment.io",
+    "segment.com", "mixpanel.com", "amplitude.com", "newrelic.com", "nr-data.net",
+    "scorecardresearch.com", "quantserve.com", "criteo.com", "criteo.net", "taboola.com",
+    "outbrain.com", "adsrvr.org", "rubiconproject.com", "pubmatic.com", "casalemedia.com",
+    "moatads.com", "demdex.net", "omtrdc.net", "branch.io", "tiktok.com/i18n/pixel",
+    "snap.licdn.com", "px.ads.linkedin.com", "dc.ads.linkedin.com",
+]
+
+# Video/audio never matter for filling a form; screenshots only need the poster frame.
+MEDIA_EXTENSIONS = ["mp4", "webm", "m4s", "m3u8", "mp3", "ogg", "mov", "avi"]
+
+# Web fonts served from font CDNs; the platforms' own icon fonts stay allowed so
+# buttons still look like buttons in vision mode.
+FONT_CDN_DOMAINS = ["fonts.googleapis.com", "fonts.gstatic.com", "use.typekit.net", "use.fontawesome.com"]
+
+DEFAULT_POLICY = {
+    "block_domains": TRACKER_DOMAINS + FONT_CDN_DOMAINS,
+    "block_extensions": MEDIA_EXTENSIONS,
+    "allow_domains": [],
+}
+
+# Extra per-platform rules, merged on top of the default policy.
+# NETWORK_FILTER_POLICY can point at a JSON file of the same shape to add more.
+PLATFORM_POLICIES = {
+    "linkedin": {"block_domains": ["linkedin.com/li/track"]},
+}
+
+# Rough transfer sizes for requests we never made; only used for the "saved" estimate.
+AVG_BYTES_BY_TYPE = {
+    "Image": 30_000, "Media": 500_000, "Font": 40_000, "Script": 60_000, "Stylesheet": 20_000,
+    "XHR": 2_000, "Fetch": 2_000, "Ping": 500, "Other": 5_000,
+}
+
+def load_policies(path: str = None):
+    """Default and per-platform policies, optionally extended from a JSON file."""
+    policies = {"default": dict(DEFAULT_POLICY), **{k: dict(v) for k, v in PLATFORM_POLICIES.items()}}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for name, rules in json.load(f).items():
+                merged = policies.setdefault(name.lower(), {})
+                for field, values in rules.items():
+                    merged[field] = list(merged.get(field, [])) + list(values)
+    return policies
+
+class NetworkFilter:
+    """
+    Blocks trackers, ads and media in agent browsers via CDP Network.setBlockedURLs.
+    Blocking happens inside Chrome (no per-request round trip); first-party XHRs,
+    uploads and images are never matched. Counts what was blocked per resource type.
+    """
+
+    def __init__(self, policies: dict, enabled: bool = True):
+        self.policies = policies
+        self.enabled = enabled
+        self._patterns = {}
+        self._platform_by_cdp_url = {}
+        self._clients = set()
+        self.counters = {
+            "blocked_requests": 0,
+            "blocked_by_type": {},
+            "estimated_bytes_saved": 0,
+            "loaded_requests": 0,
+            "loaded_bytes": 0,
+        }
+
+    def patterns_for(self, platform: str):
+        platform = (platform or "default").lower()
+        patterns = self._patterns.get(platform)
+        if patterns is None:
+            default = self.policies.get("default", {})
+            extra = self.policies.get(platform, {})
+            allow = set(default.get("allow_domains", [])) | set(extra.get("allow_domains", []))
+            domains = [d for d in default.get("block_domains", []) + extra.get("block_domains", []) if d not in allow]
+            extensions = default.get("block_extensions", []) + extra.get("block_extensions", [])
+            patterns = [f"*{d}*" for d in dict.fromkeys(domains)]
+            for ext in dict.fromkeys(extensions):
+                patterns += [f"*.{ext}", f"*.{ext}?*"]
+            self._patterns[platform] = patterns
+        return patterns
+
+    async def attach(self, browser, platform: str):
+        """Applies the platform's policy to a started browser and every page it opens later."""
+        if not self.enabled:
+            return
+        self._platform_by_cdp_url[browser.cdp_url] = (platform or "default").lower()
+        for target in browser.session_manager.get_all_page_targets():
+            try:
+                cdp_session = await browser.get_or_create_cdp_session(target.target_id, focus=False)
+                await self.apply(browser, cdp_session)
+            except Exception as e:
+                print(f"⚠️ [NetFilter] Could not filter target {target.target_id[:8]}: {e}")
+
+    async def apply(self, browser, cdp_session):
+        platform = self._platform_by_cdp_url.get(browser.cdp_url)
+        if not self.enabled or platform is None:
+            return
+        client = cdp_session.cdp_client
+        await client.send.Network.setBlockedURLs(
+            params={"urls": self.patterns_for(platform)}, session_id=cdp_session.session_id
+        )
+        if id(client) not in self._clients:
+            # Events from every flattened session arrive on the root client.
+            self._clients.add(id(client))
+            client.register.Network.loadingFailed(self._on_loading_failed)
+            client.register.Network.loadingFinished(self._on_loading_finished)
+
+    def _on_loading_failed(self, event, session_id=None):
+        if event.get("blockedReason") != "inspector":
+            return
+        resource_type = event.get("type", "Other")
+        c = self.counters
+        c["blocked_requests"] += 1
+        c["blocked_by_type"][resource_type] = c["blocked_by_type"].get(resource_type, 0) + 1
+        c["estimated_bytes_saved"] += AVG_BYTES_BY_TYPE.get(resource_type, AVG_BYTES_BY_TYPE["Other"])
+
+    def _on_loading_finished(self, event, session_id=None):
+        self.counters["loaded_requests"] += 1
+        self.counters["loaded_bytes"] += int(event.get("encodedDataLength", 0))
+
+    def stats(self):
+        c = dict(self.counters)
+        total = c["blocked_requests"] + c["loaded_requests"]
+        c["blocked_share"] = round(c["blocked_requests"] / total, 3) if total else 0.0
+        c["enabled"] = self.enabled
+        return c
+
+def install(network_filter: NetworkFilter):
+    """Hooks browser-use's per-page setup so new tabs and popups get the filter too."""
+    from browser_use.browser.session_manager import SessionManager
+
+    original = getattr(SessionManager._enable_page_monitoring, "__wrapped_by_filter__", None)
+    original = original or SessionManager._enable_page_monitoring
+
+    async def _enable_page_monitoring(self, cdp_session):
+        await original(self, cdp_session)
+        try:
+            await network_filter.apply(self.browser_session, cdp_session)
+        except Exception as e:
+            print(f"⚠️ [NetFilter] Could not filter new page: {e}")
+
+    _enable_page_monitoring.__wrapped_by_filter__ = original
+    SessionManager._enable_page_monitoring = _enable_page_monitoring
@@ -0,0 +1,255 @@
+import asyncio
+import contextvars
+import inspect
+import json
+import time
+import weakref
+from collections import OrderedDict
+
+# Per-step settle timings, set by whoever runs the agent (see run_agent).
+step_settle = contextvars.ContextVar("step_settle", default=None)
+
+# Actions that don't touch the page; nothing to wait for after them.
+NO_SETTLE_ACTIONS = {
+    "done", "write_file", "read_file", "replace_file", "extract", "screenshot",
+    "remember_answer", "check_applied", "mark_job_applied", "wait",
+}
+
+# Tracked from CDP Network events; other types (documents, images, event streams)
+# are either covered by browser-use's navigation wait or never finish.
+TRACKED_REQUEST_TYPES = {"XHR", "Fetch"}
+NETWORK_EVENTS = ("requestWillBeSent", "loadingFinished", "loadingFailed")
+
+# Evaluated in an isolated world (same DOM, separate globals), so nothing on the
+# page can see it. Counts DOM mutations; settle.wait resolves after `quietMs`
+# without one, or at `maxMs`. Ticks on animation frames so at least one frame is
+# painted, with a timer fallback because background tabs don't get frames.
+SETTLE_JS = """
+(() => {
+  if (globalThis.settle) return true;
+  const s = globalThis.settle = { mutations: 0, last: performance.now() };
+  new MutationObserver((records) => { s.mutations += records.length; s.last = performance.now(); })
+    .observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+  s.wait = (quietMs, minMs, maxMs) => new Promise((resolve) => {
+    const start = performance.now();
+    const startMutations = s.mutations;
+    const tick = () => {
+      const now = performance.now();
+      const quiet = now - start >= minMs && now - s.last >= quietMs && document.readyState !== 'loading';
+      if (quiet || now - start >= maxMs) {
+        resolve(JSON.stringify({
+          waited_ms: Math.round(now - start), mutations: s.mutations - startMutations, timed_out: !quiet,
+        }));
+        return;
+      }
+      let fired = false;
+      const next = () => { if (!fired) { fired = true; tick(); } };
+      requestAnimationFrame(next);
+      setTimeout(next, 50);
+    };
+    tick();
+  });
+  return true;
+})()
+"""
+WORLD_NAME = "agent_settle"
+MAX_WORLDS = 256
+
+class PageSettleDetector:
+    """
+    Waits after each browser action until the page is actually quiet: no DOM
+    mutations for `quiet_ms`, no fetch/XHR in flight, document parsed. Replaces
+    browser-use's fixed wait_between_actions sleep.
+
+    Requests are counted from the session's CDP Network events, attached when
+    browser-use sets up each page, so requests started by the action itself are
+    seen. DOM quiet is measured in an isolated world; no page globals are touched.
+    """
+
+    def __init__(self, quiet_ms: int = 300, min_ms: int = 50, max_wait: float = 5.0):
+        self.quiet_ms = quiet_ms
+        self.min_ms = min_ms
+        self.max_wait = max_wait
+        self.metrics = {"waits": 0, "settle_s": 0.0, "settle_max_s": 0.0, "timeouts": 0, "navigations": 0}
+        self._pending = {}  # session_id -> {request_id: started (monotonic)}
+        self._clients = weakref.WeakSet()
+        self._worlds = OrderedDict()  # session_id -> isolated world execution context id
+
+    def attach(self, cdp_client):
+        """Counts the client's in-flight fetch/XHR per session; idempotent."""
+        if cdp_client in self._clients:
+            return
+        self._clients.add(cdp_client)
+        # cdp-use keeps one handler per event; chain whatever was registered before.
+        handlers = getattr(getattr(cdp_client, "_event_registry", None), "_handlers", {})
+        previous = {name: handlers.get(f"Network.{name}") for name in NETWORK_EVENTS}
+
+        def chained(name, handler):
+            async def on_event(event, session_id=None):
+                handler(event, session_id)
+                if previous[name] is not None:
+                    result = previous[name](event, session_id)
+                    if inspect.isawaitable(result):
+                        await result
+            return on_event
+
+        cdp_client.register.Network.requestWillBeSent(chained("requestWillBeSent", self._on_request))
+        cdp_client.register.Network.loadingFinished(chained("loadingFinished", self._on_finished))
+        cdp_client.register.Network.loadingFailed(chained("loadingFailed", self._on_finished))
+
+    def _on_request(self, event, session_id):
+        if event.get("type") in TRACKED_REQUEST_TYPES:
+            self._pending.setdefault(session_id, {}).setdefault(event["requestId"], time.monotonic())
+
+    def _on_finished(self, event, session_id):
+        pending = self._pending.get(session_id)
+        if pending is not None:
+            pending.pop(event.get("requestId"), None)
+            if not pending:
+                del self._pending[session_id]
+
+    def pending(self, session_id):
+        """In-flight fetch/XHR; requests older than max_wait are long-polls and don't count."""
+        cutoff = time.monotonic() - self.max_wait
+        return sum(1 for started in self._pending.get(session_id, {}).values() if started > cutoff)
+
+    async def wait(self, browser_session):
+        start = time.monotonic()
+        deadline = start + self.max_wait
+        outcome = {"timed_out": False}
+        try:
+            cdp_session = await browser_session.get_or_create_cdp_session(focus=True)
+            self.attach(cdp_session.cdp_client)
+            mutations = 0
+            while True:
+                while self.pending(cdp_session.session_id) and time.monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+                remaining_ms = int((deadline - time.monotonic()) * 1000)
+                dom = await self._wait_dom(cdp_session, max(remaining_ms, 0))
+                mutations += dom.get("mutations", 0)
+                pending = self.pending(cdp_session.session_id)
+                if dom.get("timed_out") or time.monotonic() >= deadline:
+                    outcome = {"timed_out": True, "pending": pending}
+                    break
+                if not pending:
+                    outcome = {"timed_out": False, "pending": 0}
+                    break
+            outcome["mutations"] = mutations
+        except asyncio.TimeoutError:
+            outcome = {"timed_out": True}
+        except Exception:
+            # Context destroyed by a navigation; browser-use's navigation wait covers it.
+            outcome = {"navigated": True}
+        elapsed = time.monotonic() - start
+        outcome["waited_ms"] = round(elapsed * 1000)
+        self._record(elapsed, outcome)
+        return elapsed, outcome
+
+    async def _wait_dom(self, cdp_session, max_ms):
+        """Runs settle.wait in the page's isolated world, recreating it after a navigation."""
+        expression = f"settle.wait({self.quiet_ms}, {self.min_ms}, {max_ms})"
+        context_id = self._worlds.get(cdp_session.session_id)
+        if context_id is not None:
+            response = await self._evaluate(cdp_session, expression, context_id, max_ms)
+            if response is not None:
+                return response
+        context_id = await self._create_world(cdp_session)
+        response = await self._evaluate(cdp_session, expression, context_id, max_ms)
+        if response is None:
+            raise RuntimeError("settle world unavailable")
+        return response
+
+    async def _create_world(self, cdp_session):
+        client, session_id = cdp_session.cdp_client, cdp_session.session_id
+        tree = await client.send.Page.getFrameTree(session_id=session_id)
+        world = await client.send.Page.createIsolatedWorld(
+            params={"frameId": tree["frameTree"]["frame"]["id"], "worldName": WORLD_NAME},
+            session_id=session_id,
+        )
+        context_id = world["executionContextId"]
+        await client.send.Runtime.evaluate(
+            params={"expression": SETTLE_JS, "contextId": context_id, "returnByValue": True},
+            session_id=session_id,
+        )
+        self._worlds[session_id] = context_id
+        self._worlds.move_to_end(session_id)
+        while len(self._worlds) > MAX_WORLDS:
+            self._worlds.popitem(last=False)
+        return context_id
+
+    async def _evaluate(self, cdp_session, expression, context_id, max_ms):
+        """settle.wait's result, or None when the world is gone (navigation)."""
+        try:
+            response = await asyncio.wait_for(
+                cdp_session.cdp_client.send.Runtime.evaluate(
+                    params={
+                        "expression": expression,
+                        "contextId": context_id,
+                        "awaitPromise": True,
+                        "returnByValue": True,
+                    },
+                    session_id=cdp_session.session_id,
+                ),
+                timeout=max_ms / 1000 + 2.0,
+            )
+        except asyncio.TimeoutError:
+            raise
+        except Exception:
+            return None
+        value = response.get("result", {}).get("value")
+        return json.loads(value) if value else None
+
+    def _record(self, elapsed, outcome):
+        m = self.metrics
+        m["waits"] += 1
+        m["settle_s"] += elapsed
+        m["settle_max_s"] = max(m["settle_max_s"], elapsed)
+        if outcome.get("timed_out"):
+            m["timeouts"] += 1
+        if outcome.get("navigated"):
+            m["navigations"] += 1
+        step = step_settle.get()
+        if step is not None:
+            step["waits"] += 1
+            step["settle_s"] += elapsed
+            step["timeouts"] += 1 if outcome.get("timed_out") else 0
+
+    def stats(self):
+        m = dict(self.metrics)
+        m["avg_settle_s"] = round(m["settle_s"] / m["waits"], 3) if m["waits"] else 0.0
+        m["settle_s"] = round(m["settle_s"], 2)
+        m["settle_max_s"] = round(m["settle_max_s"], 3)
+        return m
+
+def new_step_stats():
+    return {"waits": 0, "settle_s": 0.0, "timeouts": 0}
+
+def install(detector: PageSettleDetector):
+    """
+    Runs the detector after every page-touching action executed through browser-use
+    Tools, and starts counting requests as soon as browser-use sets up each page.
+    """
+    from browser_use.browser.session_manager import SessionManager
+    from browser_use.tools.service import Tools
+
+    original = getattr(Tools.act, "__wrapped_by_settle__", None) or Tools.act
+
+    async def act(self, action, browser_session, *args, **kwargs):
+        result = await original(self, action, browser_session, *args, **kwargs)
+        names = set(action.model_dump(exclude_unset=True).keys())
+        if browser_session is not None and not names <= NO_SETTLE_ACTIONS and not getattr(result, "is_done", False):
+            await detector.wait(browser_session)
+        return result
+
+    act.__wrapped_by_settle__ = original
+    Tools.act = act
+
+    original_monitoring = getattr(SessionManager._enable_page_monitoring, "__wrapped_by_settle__", None)
+    original_monitoring = original_monitoring or SessionManager._enable_page_monitoring
+
+    async def _enable_page_monitoring(self, cdp_session):
+        await original_monitoring(self, cdp_session)
+        detector.attach(cdp_session.cdp_client)
+
+    _enable_page_monitoring.__wrapped_by_settle__ = original_monitoring
+    SessionManager._enable_page_monitoring = _enable_page_monitoring
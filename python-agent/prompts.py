@@ -0,0 +1,106 @@
+from string import Template
+
+# Task prompt pieces. Assembled per platform once and cached, so a request
+# only pays for a Template.substitute() of the per-user fields.
+
+HEADER = """
+    Goal: Apply for jobs on $platform.
+    """
+
+LOGIN_TOKEN_PLATFORM = """
+    1. LOGIN CHECK & PERSISTENCE:
+       - Go to '$login_url'
+       - **IMPORTANT**: First, check if you are already logged in (look for your profile picture, dashboard, "My Jobs", or "Logout" button).
+       - If you ARE already logged in, do NOT log out. Proceed directly to Step 2.
+       - If you ARE NOT logged in (you see a login form):
+         - If no password is provided ($password), inform the user that the session has expired and they MUST re-initialize via the Platforms page.
+         - Otherwise use $username / $password.
+ """
+
+LOGIN_DEFAULT = """
+    1. LOGIN CHECK & PERSISTENCE:
+       - Go to '$login_url'
+       - **IMPORTANT**: First, check if you are already logged in (look for your profile picture, dashboard, "My Jobs", or "Logout" button).
+       - If you ARE already logged in, do NOT log out. Proceed directly to Step 2.
+       - If you ARE NOT logged in (you see a login form), use $username / $password.
+ """
+
+LOGIN_REUSED = """
+    1. SESSION:
+       - You are already logged in to $platform in this browser from the previous application. Do NOT open the login page or log out.
+       - Only if a page shows a login form, log in with $username / $password.
+ """
+
+SEARCH_AND_APPLY = """
+    2. SMART SEARCH & ADAPTIVE FILTERING:
+       - Target: $target
+       - User Rules: $rules
+       - BLOCKER DETECTION (CRITICAL):
+         - If a job redirects you to an external site requiring a **Mandatory OTP (Mobile/Email)** or a **Long Registration Form** (e.g., Jobseager.com), you MUST skip it.
+         - Do not waste steps on sites that require registration from scratch.
+         - PRIORITIZE "Quick Apply", "Easy Apply", or internal platform applications.
+       - Before opening listings, call 'check_applied' with the job URLs from the results and skip the ones already applied to.
+       - If no results are found for a filtered search, BROADEN the search (nearby cities, remote) or lower salary/CTC.
+
+    3. MANDATORY RESUME UPLOAD (CRITICAL):
+       - FILE PATH: $resume_path
+       - You MUST use the 'upload_file' tool for ANY resume or CV upload field you encounter.
+       - NEVER skip this. If the 'upload_file' tool returns an error, you MUST fix the path or try a different upload element.
+       - DO NOT assume a resume upload succeeded if the tool explicitly failed.
+
+    4. FORM HANDLING:
+       - Candidate profile (use these facts for form fields and screening questions):
+$profile
+       - Screening questions: call 'fill_known_fields' with the index and label of every visible question FIRST; it fills the ones already answered before in one step.
+       - After answering a question it did not know, call 'remember_answer' so the next application can reuse it.
+       - Company Email: Fallback to '$username'.
+       - Autocomplete: Type, WAIT, and CLICK a dropdown option.
+       - Submit once all fields are complete.
+ """
+
+POST_APPLICATION_TRACKING = """
+    5. POST-APPLICATION TRACKING (PLATFORM SPECIFIC):
+       - If the application was completed on an EXTERNAL site (after clicking 'Apply' on Monster), you MUST return to the Monster job tracker/dashboard (e.g., https://www.monster.com/profile/job-tracker).
+       - Find the job you just applied for.
+       - Click the **"Mark As Applied"** button to ensure the status is correctly updated on the source platform.
+ """
+
+CRITICAL_RULES = """
+    After a successful submission, call 'mark_job_applied' with the job's URL.
+
+    CRITICAL RULES:
+    1. STOP AFTER ONE SUCCESSFUL SUBMISSION.
+    2. BE DECISIVE: If a site looks like it will take more than 20 steps to navigate, skip it and move to a simpler one.
+    3. SESSION PERSISTENCE: Handle cookie banners and popups by dismissing them.
+    4. NO OTP/REGISTRATION: Abandon any application that requires an OTP or a brand-new account registration on an external site.
+    """
+
+# Platforms whose sessions come from /capture-session rather than a password.
+TOKEN_SESSION_PLATFORMS = {"indeed", "glassdoor"}
+
+# Platforms that hand off to external sites and need the application marked manually.
+TRACKER_PLATFORMS = {"monster", "foundit"}
+
+_TEMPLATES = {}
+
+def get_task_template(platform: str, logged_in: bool = False) -> Template:
+    """Returns the compiled task prompt for this platform, building it on first use."""
+    key = (platform.lower(), logged_in)
+    template = _TEMPLATES.get(key)
+    if template is None:
+        name = key[0]
+        parts = [HEADER]
+        if logged_in:
+            parts.append(LOGIN_REUSED)
+        else:
+            parts.append(LOGIN_TOKEN_PLATFORM if name in TOKEN_SESSION_PLATFORMS else LOGIN_DEFAULT)
+        parts.append(SEARCH_AND_APPLY)
+        if name in TRACKER_PLATFORMS:
+            parts.append(POST_APPLICATION_TRACKING)
+        parts.append(CRITICAL_RULES)
+        template = Template("".join(parts))
+        _TEMPLATES[key] = template
+    return template
+
+def render_task_prompt(platform: str, logged_in: bool = False, **fields) -> str:
+    return get_task_template(platform, logged_in).substitute(platform=platform, **fields)
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+class Readiness:
+    """
+    Start-up checks by name (pending -> ok | failed, with timings). The service
+    is ready once every required check is ok; settled() returns as soon as each
+    required check has finished either way.
+    """
+
+    def __init__(self, required=()):
+        self.required = tuple(required)
+        self.components = {name: {"status": "pending"} for name in self.required}
+        self.started = time.monotonic()
+        self.ready_after_s = None
+        self._settled = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return all(self.components[name]["status"] == "ok" for name in self.required)
+
+    async def run(self, name: str, fn, *args):
+        """Awaits fn(*args) as check `name`; failures are recorded, not raised."""
+        self.components[name] = {"status": "running"}
+        start = time.monotonic()
+        try:
+            result = await fn(*args)
+        except Exception as e:
+            self.components[name] = {"status": "failed", "seconds": round(time.monotonic() - start, 2), "error": str(e)}
+            print(f"❌ [Warm-up] {name} failed after {self.components[name]['seconds']}s: {e}")
+            result = None
+        else:
+            self.components[name] = {"status": "ok", "seconds": round(time.monotonic() - start, 2)}
+            if result is not None:
+                self.components[name]["detail"] = result
+            print(f"🔥 [Warm-up] {name} ready in {self.components[name]['seconds']}s.")
+        self._update()
+        return result
+
+    def error(self, name: str):
+        return self.components.get(name, {}).get("error")
+
+    async def settled(self):
+        await self._settled.wait()
+
+    def snapshot(self):
+        return {
+            "ready": self.ready,
+            "uptime_s": round(time.monotonic() - self.started, 2),
+            "ready_after_s": self.ready_after_s,
+            "components": self.components,
+        }
+
+    def _update(self):
+        if self.ready and self.ready_after_s is None:
+            self.ready_after_s = round(time.monotonic() - self.started, 2)
+        if all(self.components[name]["status"] in ("ok", "failed") for name in self.required):
+            self._settled.set()
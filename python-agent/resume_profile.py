@@ -0,0 +1,218 @@
+import hashlib
+import re
+from collections import OrderedDict
+from datetime import date
+
+# Parsed profiles keyed by sha256 of the resume text. Parsing is cheap next to
+# an LLM call, but the same resume arrives with every task of a user.
+_PROFILE_CACHE = OrderedDict()
+MAX_CACHED_PROFILES = 256
+
+SECTION_ALIASES = {
+    "summary": ("summary", "profile", "objective", "about me", "professional summary"),
+    "skills": ("skills", "technical skills", "key skills", "core competencies", "technologies", "tech stack"),
+    "experience": ("experience", "work experience", "professional experience", "employment history", "work history"),
+    "education": ("education", "academic background", "qualifications"),
+    "projects": ("projects", "personal projects", "key projects"),
+    "certifications": ("certifications", "certificates", "licenses"),
+    "languages": ("languages",),
+}
+_HEADING_LOOKUP = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_RE = re.compile(r"(?:\+?\d[\d\s().-]{8,}\d)")
+URL_RE = re.compile(r"(?:https?://)?(?:www\.)?(linkedin\.com/in/[\w-]+|github\.com/[\w-]+)", re.I)
+# "8+ years of backend experience", "experience of 8 years"; a bare "15 years"
+# is as likely to be about data retention or a project's age.
+YEARS_RE = re.compile(
+    r"(\d{1,2})\+?\s*(?:years?|yrs?)['’]?\s+(?:of\s+)?(?:[\w-]+\s+){0,3}?experience"
+    r"|experience\s*(?:of|:|-)?\s*(\d{1,2})\+?\s*(?:years?|yrs?)",
+    re.I,
+)
+MONTHS = "jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec"
+RANGE_RE = re.compile(
+    rf"(?:(?:{MONTHS})[a-z]*\.?\s*)?((?:19|20)\d{{2}})\s*(?:-|–|—|to)\s*"
+    rf"(?:(?:{MONTHS})[a-z]*\.?\s*)?((?:19|20)\d{{2}}|present|current|now|till date)",
+    re.I,
+)
+NOTICE_RE = re.compile(r"notice period[^\n:]*[:\-]?\s*([^\n,;]+)", re.I)
+CTC_RE = re.compile(r"((?:current|expected)\s+ctc)[^\n:]*[:\-]?\s*([^\n,;]+)", re.I)
+LOCATION_RE = re.compile(r"(?:location|based in|address)\s*[:\-]\s*([^\n|]+)", re.I)
+AUTH_RE = re.compile(r"(authori[sz]ed to work[^\n.]*|work permit[^\n.]*|visa[^\n.]*|citizen[^\n.]*)", re.I)
+
+MAX_SKILLS = 30
+MAX_ROLES = 5
+
+def resume_hash(resume_text: str) -> str:
+    return hashlib.sha256((resume_text or "").encode("utf-8")).hexdigest()
+
+def get_resume_profile(resume_text: str) -> dict:
+    """Returns the structured profile for this resume text, parsing it only once."""
+    key = resume_hash(resume_text)
+    profile = _PROFILE_CACHE.get(key)
+    if profile is None:
+        profile = parse_resume(resume_text or "")
+        profile["resume_hash"] = key
+        _PROFILE_CACHE[key] = profile
+        while len(_PROFILE_CACHE) > MAX_CACHED_PROFILES:
+            _PROFILE_CACHE.popitem(last=False)
+    else:
+        _PROFILE_CACHE.move_to_end(key)
+    return profile
+
+def parse_resume(text: str) -> dict:
+    lines = [line.strip() for line in text.splitlines()]
+    sections = _split_sections(lines)
+    header = sections.get("header", [])
+
+    contact = {
+        "name": _guess_name(header or lines),
+        "email": _first(EMAIL_RE.findall(text)),
+        "phone": _clean_phone(_first(PHONE_RE.findall("\n".join(header or lines[:15])))),
+        "links": sorted({m.lower() for m in URL_RE.findall(text)}),
+        "location": _first([m.strip() for m in LOCATION_RE.findall(text)]),
+    }
+
+    experience = _roles(sections.get("experience", []))
+    years = _years_of_experience(sections)
+
+    return {
+        "contact": contact,
+        "summary": " ".join(sections.get("summary", []))[:400],
+        "skills": _skills(sections.get("skills", [])),
+        "experience": experience,
+        "education": [line for line in sections.get("education", []) if line][:3],
+        "certifications": [line for line in sections.get("certifications", []) if line][:5],
+        "screening": {
+            "total_experience_years": years,
+            "notice_period": _first([m.strip() for m in NOTICE_RE.findall(text)]),
+            "ctc": {label.lower(): value.strip() for label, value in CTC_RE.findall(text)},
+            "work_authorization": _first([m.strip() for m in AUTH_RE.findall(text)]),
+        },
+    }
+
+def split_sections(text: str) -> dict:
+    """Resume text cut at its section headings; "header" is everything above the first one."""
+    lines = [line.strip() for line in (text or "").splitlines()]
+    return {name: "\n".join(body) for name, body in _split_sections(lines).items() if body}
+
+def format_resume_profile(profile: dict) -> str:
+    """Compact, line-per-fact rendering for the task prompt."""
+    contact = profile["contact"]
+    screening = profile["screening"]
+    out = []
+    for label, value in (
+        ("Name", contact["name"]),
+        ("Email", contact["email"]),
+        ("Phone", contact["phone"]),
+        ("Location", contact["location"]),
+        ("Links", ", ".join(contact["links"])),
+        ("Summary", profile["summary"]),
+        ("Skills", ", ".join(profile["skills"])),
+        ("Total experience (years)", screening["total_experience_years"]),
+        ("Notice period", screening["notice_period"]),
+        ("Work authorization", screening["work_authorization"]),
+    ):
+        if value not in (None, "", []):
+            out.append(f"{label}: {value}")
+    for label, value in screening["ctc"].items():
+        out.append(f"{label.title()}: {value}")
+    if profile["experience"]:
+        out.append("Experience: " + " | ".join(profile["experience"]))
+    if profile["education"]:
+        out.append("Education: " + " | ".join(profile["education"]))
+    if profile["certifications"]:
+        out.append("Certifications: " + " | ".join(profile["certifications"]))
+    return "\n".join(out)
+
+def _split_sections(lines):
+    sections = {"header": []}
+    current = "header"
+    for line in lines:
+        heading = _heading(line)
+        if heading:
+            current = heading
+            sections.setdefault(current, [])
+            continue
+        if line:
+            sections.setdefault(current, []).append(line)
+    return sections
+
+def _heading(line):
+    cleaned = re.sub(r"[^a-z ]", "", line.lower()).strip()
+    if not cleaned or len(cleaned) > 40:
+        return None
+    return _HEADING_LOOKUP.get(cleaned)
+
+def _guess_name(lines):
+    for line in lines[:5]:
+        if line and not EMAIL_RE.search(line) and not any(ch.isdigit() for ch in line) and len(line.split()) <= 5:
+            return line.title() if line.isupper() else line
+    return None
+
+def _clean_phone(phone):
+    if not phone:
+        return None
+    digits = re.sub(r"[^\d+]", "", phone)
+    return digits if 10 <= len(digits.lstrip("+")) <= 15 else None
+
+def _skills(lines):
+    skills = []
+    seen = set()
+    for line in lines:
+        # "Languages: Python, Go" -> keep what follows the label
+        if ":" in line:
+            line = line.split(":", 1)[1]
+        for item in re.split(r"[,|•·;/]|\s{2,}", line):
+            item = item.strip().strip("-*").strip()
+            if 1 < len(item) <= 40 and item.lower() not in seen:
+                seen.add(item.lower())
+                skills.append(item)
+    return skills[:MAX_SKILLS]
+
+def _roles(lines):
+    roles = []
+    for i, line in enumerate(lines):
+        if RANGE_RE.search(line):
+            title = line
+            # Dates are often on their own line right after the title.
+            if RANGE_RE.fullmatch(line.strip()) and i > 0:
+                title = f"{lines[i - 1]} ({line})"
+            roles.append(title[:120])
+        if len(roles) >= MAX_ROLES:
+            break
+    return roles
+
+def _years_of_experience(sections):
+    """Years stated in the summary, else the merged date spans of the experience section.
+
+    Returns None rather than a guess; the answer is reused for screening questions.
+    """
+    intro = "\n".join(sections.get("header", []) + sections.get("summary", []))
+    for match in YEARS_RE.finditer(intro):
+        years = int(match.group(1) or match.group(2))
+        if 0 < years < 50:
+            return years
+    this_year = date.today().year
+    spans = []
+    for start, end in RANGE_RE.findall("\n".join(sections.get("experience", []))):
+        end_year = this_year if not end[:1].isdigit() else int(end)
+        if int(start) <= end_year:
+            spans.append((int(start), end_year))
+    if not spans:
+        return None
+    # Merge overlapping spans so parallel roles aren't double counted.
+    spans.sort()
+    total = 0
+    cur_start, cur_end = spans[0]
+    for start, end in spans[1:]:
+        if start <= cur_end:
+            cur_end = max(cur_end, end)
+        else:
+            total += cur_end - cur_start
+            cur_start, cur_end = start, end
+    total += cur_end - cur_start
+    return total or None
+
+def _first(items):
+    return items[0] if items else None
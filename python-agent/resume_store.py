@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+from resume_profile import parse_resume, split_sections
+
+RESUME_EXTENSIONS = (".pdf", ".txt", ".md")
+
+def resolve_upload(path: str, upload_dir: str) -> str:
+    """
+    Real path of a resume file inside upload_dir (symlinks and ".." resolved).
+    Raises PermissionError for anything outside it or not a PDF/text file.
+    """
+    real = os.path.realpath(path)
+    root = os.path.realpath(upload_dir)
+    if os.path.commonpath([real, root]) != root:
+        raise PermissionError("Path is outside the upload directory")
+    if not real.lower().endswith(RESUME_EXTENSIONS):
+        raise PermissionError("Only PDF or text resumes can be read")
+    return real
+
+def extract_text(data: bytes, filename: str = "") -> tuple:
+    """Plain text of a PDF (or a .txt/.md resume) and its page count."""
+    if data[:5] == b"%PDF-":
+        from pypdf import PdfReader
+
+        reader = PdfReader(BytesIO(data))
+        pages = [page.extract_text() or "" for page in reader.pages]
+        text = "\n".join(pages)
+        page_count = len(pages)
+    else:
+        text = data.decode("utf-8", errors="replace")
+        page_count = None
+    # PDF extraction leaves runs of spaces and blank lines; the section splitter needs lines intact.
+    text = re.sub(r"[ \t\u00a0]+", " ", text)
+    text = re.sub(r"\n\s*\n+", "\n\n", text).strip()
+    return text, page_count
+
+class ResumeStore:
+    """
+    Parsed resumes keyed by the sha256 of the file bytes (the resume ID).
+    A file is extracted and parsed once; later uploads of the same bytes and
+    every task referencing the ID are served from MongoDB or the in-memory LRU.
+    """
+
+    def __init__(self, collection, max_entries: int = 128):
+        self.collection = collection
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def ingest(self, data: bytes, filename: str = "", path: str = None):
+        """Returns (resume document, cached) for these file bytes."""
+        resume_id = hashlib.sha256(data).hexdigest()
+        async with self._locks.setdefault(resume_id, asyncio.Lock()):
+            doc = await self.get(resume_id)
+            if doc is not None:
+                if path and doc.get("path") != path:
+                    doc["path"] = path
+                    await self.collection.update_one({"_id": resume_id}, {"$set": {"path": path}})
+                return doc, True
+
+            # pypdf is pure Python and CPU-bound; keep it off the event loop.
+            text, pages = await asyncio.to_thread(extract_text, data, filename)
+            profile = parse_resume(text)
+            profile["resume_hash"] = resume_id
+            doc = {
+                "_id": resume_id,
+                "filename": filename,
+                "path": path,
+                "bytes": len(data),
+                "pages": pages,
+                "chars": len(text),
+                "text": text,
+                "sections": split_sections(text),
+                "profile": profile,
+                "createdAt": time.time(),
+            }
+            await self.collection.update_one({"_id": resume_id}, {"$setOnInsert": doc}, upsert=True)
+            self._remember(resume_id, doc)
+            print(f"📄 [Resumes] Parsed {filename or resume_id[:12]}: {pages or '?'} page(s), {len(text)} chars.")
+            return doc, False
+
+    async def ingest_path(self, path: str):
+        path = os.path.abspath(os.path.normpath(path))
+        data = await asyncio.to_thread(_read_file, path)
+        return await self.ingest(data, os.path.basename(path), path=path)
+
+    async def get(self, resume_id: str):
+        doc = self._cache.get(resume_id)
+        if doc is not None:
+            self.hits += 1
+            self._cache.move_to_end(resume_id)
+            return doc
+        self.misses += 1
+        doc = await self.collection.find_one({"_id": resume_id})
+        if doc is not None:
+            self._remember(resume_id, doc)
+        return doc
+
+    def stats(self):
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def _remember(self, resume_id, doc):
+        self._cache[resume_id] = doc
+        self._cache.move_to_end(resume_id)
+        while len(self._cache) > self.max_entries:
+            old_id, _ = self._cache.popitem(last=False)
+            self._locks.pop(old_id, None)
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
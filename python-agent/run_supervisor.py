@@ -0,0 +1,224 @@
+import math
+import time
+from collections import Counter
+
+# URL/title fragments of pages that want a code or a human (OTP, captcha, security checks).
+VERIFICATION_HINTS = (
+    "otp", "verification", "verify", "checkpoint", "challenge", "captcha", "two-factor", "two-step",
+    "2fa", "mfa", "security check",
+)
+
+# Actions that say nothing about progress on their own.
+NEUTRAL_ACTIONS = {"wait", "done"}
+
+HINTS = {
+    "loop": (
+        "SUPERVISOR: You are repeating the same actions on the same page and nothing changes. "
+        "Do not repeat them again. Try a different element or approach, go back, or if the job "
+        "cannot be applied to, call done with success=false and say why."
+    ),
+    "stalled": (
+        "SUPERVISOR: The last several steps reached no new page or state. Re-read the page, "
+        "pick a different way forward, or call done with success=false and explain what blocks you."
+    ),
+    "verification_wall": (
+        "SUPERVISOR: This page asks for a verification code, captcha or security check. "
+        "You cannot receive codes. Unless it can be skipped, call done with success=false and "
+        "report that verification is required."
+    ),
+}
+
+class RunSupervisor:
+    """
+    Watches one agent run step by step. Each step is fingerprinted as
+    (url, DOM hash, action hashes); the supervisor looks for cycles (the same
+    1-4 step pattern repeating), stalls (no page state not seen before in this
+    run for stall_steps) and verification walls. The first time a problem shows
+    up the model gets a corrective hint on its next step; if it is still there
+    grace_steps later, should_stop() turns true and the run ends with
+    stop_reason set to the category.
+    """
+
+    def __init__(self, max_steps: int, cycle_repeats: int = 3, max_period: int = 4, stall_steps: int = 8,
+                 wall_steps: int = 4, grace_steps: int = 3, enabled: bool = True):
+        self.max_steps = max_steps
+        self.cycle_repeats = cycle_repeats
+        self.max_period = max_period
+        self.stall_steps = stall_steps
+        self.wall_steps = wall_steps
+        self.grace_steps = grace_steps
+        self.enabled = enabled
+        self.fingerprints = []
+        self.seen_pages = set()
+        self.since_progress = 0
+        self.on_wall = 0
+        self.warned = {}  # category -> step the hint was given
+        self.pending_hint = None
+        self.stop_reason = None
+        self.stop_detail = None
+
+    def attach(self, agent):
+        """Delivers pending hints as context messages (browser-use clears those at the start of each step)."""
+        manager = agent._message_manager
+        original = manager.prepare_step_state
+
+        def prepare_step_state(*args, **kwargs):
+            original(*args, **kwargs)
+            if self.pending_hint:
+                from browser_use.llm.messages import UserMessage
+
+                manager._add_context_message(UserMessage(content=self.pending_hint))
+                self.pending_hint = None
+
+        manager.prepare_step_state = prepare_step_state
+
+    def should_stop(self) -> bool:
+        return self.stop_reason is not None
+
+    def observe(self, agent):
+        """Called from on_step_end. Returns {"action": "hint"|"stop", "reason", "detail"} or None."""
+        if not self.enabled or self.stop_reason or not agent.history.history:
+            return None
+        item = agent.history.history[-1]
+        url = item.state.url if item.state else ""
+        title = item.state.title if item.state else ""
+        detectors = agent.state.loop_detector.recent_page_fingerprints
+        dom_hash = detectors[-1].text_hash if detectors else ""
+        actions = self._action_hashes(item)
+        step = len(self.fingerprints) + 1
+
+        page = (url, dom_hash)
+        if page in self.seen_pages:
+            self.since_progress += 1
+        else:
+            self.seen_pages.add(page)
+            self.since_progress = 0
+        self.fingerprints.append((page, actions))
+        haystack = f"{url} {title}".lower()
+        self.on_wall = self.on_wall + 1 if any(h in haystack for h in VERIFICATION_HINTS) else 0
+
+        issue = self._detect()
+        if issue is None:
+            return None
+        category, detail = issue
+        hinted_at = self.warned.get(category)
+        if hinted_at is None:
+            self.warned[category] = step
+            self.pending_hint = f"{HINTS[category]} ({detail})"
+            print(f"🧭 [Supervisor] Step {step}: {category} ({detail}); hint sent.")
+            return {"action": "hint", "reason": category, "detail": detail}
+        if step - hinted_at >= self.grace_steps:
+            self.stop_reason = category
+            self.stop_detail = detail
+            print(f"🛑 [Supervisor] Step {step}: still {category} ({detail}); ending the run.")
+            return {"action": "stop", "reason": category, "detail": detail}
+        return None
+
+    def _detect(self):
+        if self.on_wall >= self.wall_steps:
+            return "verification_wall", f"{self.on_wall} steps on a verification page"
+        period = self._cycle_period()
+        if period:
+            return "loop", f"a {period}-step pattern repeated {self.cycle_repeats} times"
+        if self.since_progress >= self.stall_steps:
+            return "stalled", f"no new page state in {self.since_progress} steps"
+        return None
+
+    def _cycle_period(self):
+        for period in range(1, self.max_period + 1):
+            n = period * self.cycle_repeats
+            if len(self.fingerprints) < n:
+                break
+            tail = self.fingerprints[-n:]
+            if all(tail[i] == tail[i - period] for i in range(period, n)):
+                # A pattern of only waits is a stall, not a loop; let the stall check judge it.
+                if any(actions for _, actions in tail[:period]):
+                    return period
+        return None
+
+    @staticmethod
+    def _action_hashes(item):
+        if not item.model_output:
+            return ()
+        from browser_use.agent.views import compute_action_hash
+
+        hashes = []
+        for action in item.model_output.action:
+            data = action.model_dump(exclude_unset=True)
+            name = next(iter(data), "unknown")
+            if name in NEUTRAL_ACTIONS:
+                continue
+            params = data.get(name)
+            hashes.append(compute_action_hash(name, params if isinstance(params, dict) else {}))
+        return tuple(hashes)
+
+    def summary(self):
+        return {
+            "max_steps": self.max_steps,
+            "steps": len(self.fingerprints),
+            "distinct_pages": len(self.seen_pages),
+            "hints": sorted(self.warned),
+            "stop_reason": self.stop_reason,
+        }
+
+class StepBudget:
+    """
+    Per-platform max_steps learned from finished runs (run_outcomes collection):
+    the 90th percentile of steps taken by successful runs, plus headroom, kept
+    between floor and ceiling. Platforms with fewer than min_samples successes
+    get the default. Also counts how runs ended, by reason.
+    """
+
+    def __init__(self, collection, default: int = 100, floor: int = 25, ceiling: int = 100,
+                 headroom: float = 1.3, min_samples: int = 8, window: int = 200, refresh_s: float = 600):
+        self.collection = collection
+        self.default = default
+        self.floor = floor
+        self.ceiling = ceiling
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.window = window
+        self.refresh_s = refresh_s
+        self._budgets = {}  # platform -> (computed_at, budget, samples)
+        self.outcomes = Counter()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("platform", 1), ("success", 1), ("at", -1)])
+
+    async def budget(self, platform: str) -> int:
+        key = (platform or "").lower()
+        cached = self._budgets.get(key)
+        if cached and time.time() - cached[0] < self.refresh_s:
+            return cached[1]
+        try:
+            cursor = self.collection.find(
+                {"platform": key, "success": True}, {"steps": 1, "_id": 0}
+            ).sort("at", -1).limit(self.window)
+            steps = sorted(doc["steps"] for doc in await cursor.to_list(length=self.window))
+        except Exception as e:
+            print(f"⚠️ [Supervisor] Could not load run history for {key}: {e}")
+            steps = []
+        if len(steps) < self.min_samples:
+            budget = self.default
+        else:
+            p90 = steps[min(len(steps) - 1, math.ceil(0.9 * len(steps)) - 1)]
+            budget = max(self.floor, min(self.ceiling, math.ceil(p90 * self.headroom) + 5))
+        self._budgets[key] = (time.time(), budget, len(steps))
+        return budget
+
+    async def record(self, platform: str, steps: int, success: bool, reason: str, max_steps: int):
+        self.outcomes[reason] += 1
+        await self.collection.insert_one({
+            "platform": (platform or "").lower(),
+            "steps": steps,
+            "success": success,
+            "reason": reason,
+            "max_steps": max_steps,
+            "at": time.time(),
+        })
+
+    def stats(self):
+        return {
+            "outcomes": dict(self.outcomes),
+            "budgets": {p: {"max_steps": b, "samples": n} for p, (_, b, n) in self._budgets.items()},
+        }
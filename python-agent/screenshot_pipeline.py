@@ -0,0 +1,194 @@
+import base64
+import time
+from io import BytesIO
+
+MEDIA_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+SCREENSHOT_LABEL = "Current screenshot:"
+
+def dhash(image, size: int = 8) -> int:
+    """Difference hash: one bit per horizontal brightness gradient on a tiny grayscale copy."""
+    from PIL import Image
+
+    small = image.convert("L").resize((size + 1, size), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+def changed_box(previous, current, diff_width: int = 480, pixel_threshold: int = 24):
+    """Bounding box (in `current` pixels) of what changed between two frames, or None."""
+    from PIL import Image, ImageChops
+
+    if previous.size != current.size:
+        return (0, 0) + current.size
+    scale = current.width / diff_width
+    size = (diff_width, max(1, round(current.height / scale)))
+    a = previous.convert("L").resize(size, Image.Resampling.BILINEAR)
+    b = current.convert("L").resize(size, Image.Resampling.BILINEAR)
+    box = ImageChops.difference(a, b).point(lambda p: 255 if p > pixel_threshold else 0).getbbox()
+    if box is None:
+        return None
+    left, top, right, bottom = box
+    return (
+        max(0, int(left * scale)), max(0, int(top * scale)),
+        min(current.width, int(right * scale) + 1), min(current.height, int(bottom * scale) + 1),
+    )
+
+class FrameState:
+    """The previous screenshot of one agent, kept to diff the next one against."""
+
+    def __init__(self):
+        self.image = None
+        self.hash = None
+        self.url = None
+        self.since_full = 0
+
+class ScreenshotPipeline:
+    """
+    Shrinks what vision mode sends to the model. Each step's screenshot is
+    compared with the previous one: near-identical frames are replaced by a short
+    note, small changes are cropped to the changed area, and whatever is sent is
+    downscaled and re-encoded (JPEG/WebP). A full frame goes out on every new URL
+    and at least every `keyframe_every` steps so the model never works blind for long.
+
+    Only the copy in the LLM message changes; agent history and GIFs keep the original.
+    """
+
+    def __init__(self, max_width: int = 1280, image_format: str = "JPEG", quality: int = 70,
+                 hash_threshold: int = 4, crop_max_area: float = 0.4, crop_padding: int = 48,
+                 crop_min_size: int = 320, keyframe_every: int = 5, enabled: bool = True):
+        self.max_width = max_width
+        self.image_format = image_format.upper() if image_format.upper() in MEDIA_TYPES else "JPEG"
+        self.quality = quality
+        self.hash_threshold = hash_threshold
+        self.crop_max_area = crop_max_area
+        self.crop_padding = crop_padding
+        self.crop_min_size = crop_min_size
+        self.keyframe_every = max(1, keyframe_every)
+        self.enabled = enabled
+        self.counters = {
+            "frames": 0, "sent_full": 0, "sent_cropped": 0, "skipped_unchanged": 0, "errors": 0,
+            "bytes_in": 0, "bytes_out": 0, "process_s": 0.0,
+        }
+
+    def attach(self, agent):
+        """Post-processes the screenshot in every state message this agent builds."""
+        if not self.enabled:
+            return
+        manager = agent._message_manager
+        original = manager.create_state_messages
+        frame = FrameState()
+
+        def create_state_messages(*args, **kwargs):
+            original(*args, **kwargs)
+            summary = kwargs.get("browser_state_summary") or (args[0] if args else None)
+            message = manager.state.history.state_message
+            if message is None or not isinstance(message.content, list):
+                return
+            try:
+                message.content = self._rewrite(message.content, frame, getattr(summary, "url", None))
+            except Exception as e:
+                self.counters["errors"] += 1
+                print(f"⚠️ [Vision] Screenshot pipeline failed, sending original: {e}")
+
+        manager.create_state_messages = create_state_messages
+
+    def _rewrite(self, parts, frame: FrameState, url: str):
+        from browser_use.llm.messages import ContentPartImageParam, ContentPartTextParam, ImageURL
+
+        out = []
+        i = 0
+        while i < len(parts):
+            part = parts[i]
+            nxt = parts[i + 1] if i + 1 < len(parts) else None
+            is_screenshot = (
+                isinstance(part, ContentPartTextParam) and part.text == SCREENSHOT_LABEL
+                and isinstance(nxt, ContentPartImageParam)
+            )
+            if not is_screenshot:
+                out.append(part)
+                i += 1
+                continue
+            data = nxt.image_url.url.split(",", 1)[-1]
+            label, encoded = self.process(data, frame, url)
+            out.append(ContentPartTextParam(text=label))
+            if encoded is not None:
+                out.append(ContentPartImageParam(image_url=ImageURL(
+                    url=f"data:{MEDIA_TYPES[self.image_format]};base64,{encoded}",
+                    media_type=MEDIA_TYPES[self.image_format],
+                    detail=nxt.image_url.detail,
+                )))
+            i += 2
+        return out
+
+    def process(self, screenshot_b64: str, frame: FrameState, url: str = None):
+        """Returns (label, base64 image or None) for one step's screenshot."""
+        from PIL import Image
+
+        start = time.monotonic()
+        raw = base64.b64decode(screenshot_b64)
+        image = Image.open(BytesIO(raw)).convert("RGB")
+        image_hash = dhash(image)
+        c = self.counters
+        c["frames"] += 1
+        c["bytes_in"] += len(raw)
+
+        box = (0, 0) + image.size
+        force_full = frame.image is None or url != frame.url or frame.since_full + 1 >= self.keyframe_every
+        if not force_full:
+            distance = bin(image_hash ^ frame.hash).count("1")
+            box = changed_box(frame.image, image) if distance <= self.hash_threshold else box
+        frame.image, frame.hash, frame.url = image, image_hash, url
+
+        if box is None:
+            frame.since_full += 1
+            c["skipped_unchanged"] += 1
+            c["process_s"] += time.monotonic() - start
+            return "Current screenshot: not re-sent, the page looks the same as in the previous step.", None
+
+        area = (box[2] - box[0]) * (box[3] - box[1]) / (image.width * image.height)
+        if force_full or area > self.crop_max_area:
+            frame.since_full = 0
+            c["sent_full"] += 1
+            label = SCREENSHOT_LABEL
+        else:
+            box = self._expand(box, image.size)
+            image = image.crop(box)
+            frame.since_full += 1
+            c["sent_cropped"] += 1
+            label = (
+                f"Current screenshot (only the area that changed since the previous step, "
+                f"x={box[0]} y={box[1]} w={box[2] - box[0]} h={box[3] - box[1]} of a "
+                f"{frame.image.width}x{frame.image.height} page; the rest is unchanged):"
+            )
+
+        if image.width > self.max_width:
+            height = round(image.height * self.max_width / image.width)
+            image = image.resize((self.max_width, height), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        if self.image_format == "PNG":
+            image.save(buffer, format="PNG", optimize=True)
+        else:
+            image.save(buffer, format=self.image_format, quality=self.quality)
+        c["bytes_out"] += buffer.tell()
+        c["process_s"] += time.monotonic() - start
+        return label, base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    def _expand(self, box, size):
+        """Pads the changed area and grows it to a minimum size so the crop keeps some context."""
+        left, top, right, bottom = box
+        pad_x = max(self.crop_padding, (self.crop_min_size - (right - left)) // 2)
+        pad_y = max(self.crop_padding, (self.crop_min_size - (bottom - top)) // 2)
+        return (max(0, left - pad_x), max(0, top - pad_y), min(size[0], right + pad_x), min(size[1], bottom + pad_y))
+
+    def stats(self):
+        c = dict(self.counters)
+        c["process_s"] = round(c["process_s"], 2)
+        c["compression_ratio"] = round(c["bytes_out"] / c["bytes_in"], 3) if c["bytes_in"] else 0.0
+        c["enabled"] = self.enabled
+        c["format"] = self.image_format
+        return c
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlparse
+
+# Cookies a platform only sets once the user is signed in. Until one shows up (or
+# for platforms without an entry, e.g. Foundit/Monster) the URL heuristic below applies.
+LOGIN_COOKIES = {
+    "linkedin": ["li_at"],
+    "naukri": ["nauk_at"],
+    "indeed": ["SHOE"],
+}
+
+# Path fragments of pages that are still part of signing in.
+LOGIN_PATH_HINTS = (
+    "login", "signin", "sign-in", "sign_in", "logon", "auth", "otp", "verify", "verification",
+    "checkpoint", "challenge", "captcha", "2fa", "mfa", "password",
+)
+
+CHROME_CANDIDATES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+def find_chrome(explicit: str = None, windows_default: str = None):
+    """CHROME_EXECUTABLE if set, otherwise the first Chrome/Chromium on PATH, otherwise the Windows default."""
+    if explicit:
+        return explicit
+    for name in CHROME_CANDIDATES:
+        path = shutil.which(name)
+        if path:
+            return path
+    return windows_default
+
+def site_of(url: str) -> str:
+    """Registrable-ish domain of a URL: www.linkedin.com -> linkedin.com, in.indeed.com -> indeed.com."""
+    labels = (urlparse(url).hostname or "").split(".")
+    if len(labels) >= 3 and labels[-2] in ("co", "com", "org", "net"):
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+def on_site(host: str, site: str) -> bool:
+    """True for the site itself and its subdomains; "notlinkedin.com" is not on linkedin.com."""
+    host = (host or "").lstrip(".").lower()
+    return host == site or host.endswith("." + site)
+
+class SessionCapture:
+    """
+    One interactive login in a real Chrome window, on its own profile directory
+    and a debugging port Chrome picks itself, so any number can run at once.
+
+    While the user logs in, only the browser-level CDP endpoint is used
+    (Storage.getCookies, Target.getTargets): nothing attaches to the page or
+    runs script in it. As soon as the platform's login cookie shows up, or the
+    tab has left the sign-in pages with first-party cookies set since the sign-in
+    page loaded, the full
+    storage state is exported and Chrome is closed.
+    """
+
+    def __init__(self, chrome_path: str, login_url: str, platform: str, login_cookies=None,
+                 timeout: float = 300.0, poll_interval: float = 1.5):
+        self.chrome_path = chrome_path
+        self.login_url = login_url
+        self.platform = (platform or "").lower()
+        self.site = site_of(login_url)
+        self.login_cookies = list(login_cookies or LOGIN_COOKIES.get(self.platform, []))
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.user_data_dir = None
+        self.proc = None
+        self.port = None
+        self.ws_url = None
+
+    async def launch(self, startup_timeout: float = 20.0):
+        self.user_data_dir = tempfile.mkdtemp(prefix=f"capture_{self.platform or 'session'}_")
+        cmd = [
+            self.chrome_path,
+            "--remote-debugging-port=0",
+            f"--user-data-dir={self.user_data_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            self.login_url,
+        ]
+        self.proc = subprocess.Popen(cmd)
+        # With port 0 Chrome picks a free port and writes it (and the browser ws path) here.
+        active_port_file = os.path.join(self.user_data_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + startup_timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"Chrome exited during startup (code {self.proc.returncode})")
+            try:
+                with open(active_port_file) as f:
+                    port, path = f.read().split()[:2]
+                self.port = int(port)
+                self.ws_url = f"ws://127.0.0.1:{self.port}{path}"
+                return self
+            except (OSError, ValueError):
+                await asyncio.sleep(0.2)
+        raise RuntimeError("Chrome did not open a debugging port in time")
+
+    async def wait_for_login(self) -> str:
+        """Returns "logged_in", "timeout" or "closed" (the user closed the window)."""
+        from cdp_use import CDPClient
+
+        async with CDPClient(self.ws_url) as client:
+            baseline = None
+            deadline = time.monotonic() + self.timeout
+            streak = 0
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                if self.proc.poll() is not None:
+                    return "closed"
+                try:
+                    cookies = await self._site_cookie_names(client)
+                    if any(name in cookies for name in self.login_cookies):
+                        return "logged_in"
+                    urls = await self._page_urls(client)
+                    if baseline is None:
+                        # Cookies the sign-in page sets while loading don't mean anything.
+                        if any(on_site(urlparse(u).hostname, self.site) for u in urls):
+                            baseline = cookies
+                        continue
+                    # No known cookie: off the sign-in pages, with new first-party cookies,
+                    # on two polls in a row (redirect chains pass through briefly).
+                    settled = bool(cookies - baseline) and bool(urls) and all(self._past_login(u) for u in urls)
+                    streak = streak + 1 if settled else 0
+                    if streak >= 2:
+                        return "logged_in"
+                except Exception as e:
+                    if self.proc.poll() is not None:
+                        return "closed"
+                    print(f"⚠️ [Capture] Poll failed: {e}")
+            return "timeout"
+
+    async def export_state(self):
+        """Full storage state (cookies + localStorage) in the format the agent browsers load."""
+        from browser_use import Browser
+
+        browser = Browser(cdp_url=self.ws_url, keep_alive=True)
+        await browser.start()
+        try:
+            return await browser.export_storage_state()
+        finally:
+            await browser.stop()
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+    def _close(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+    async def _site_cookie_names(self, client) -> set:
+        result = await client.send.Storage.getCookies()
+        return {
+            c["name"] for c in result.get("cookies", [])
+            if on_site(c.get("domain", ""), self.site)
+        }
+
+    async def _page_urls(self, client) -> list:
+        result = await client.send.Target.getTargets()
+        return [t["url"] for t in result.get("targetInfos", []) if t.get("type") == "page"]
+
+    def _past_login(self, url: str) -> bool:
+        parsed = urlparse(url)
+        if not on_site(parsed.hostname, self.site):
+            return False
+        path = (parsed.path + "?" + parsed.query).lower()
+        return url.split("#")[0] != self.login_url.split("#")[0] and not any(h in path for h in LOGIN_PATH_HINTS)
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import json
+import time
+import zlib
+from collections import OrderedDict
+
+class SessionStore:
+    """
+    Cached, change-aware front for the user_sessions collection.
+    Reads are served from an in-memory LRU+TTL cache; entries older than
+    revalidate seconds are checked against the stored hash first, since other
+    workers write sessions too. Writes are skipped when the stored hash already
+    matches and otherwise stored zlib-compressed.
+    """
+
+    def __init__(self, collection, max_entries: int = 256, ttl: float = 600.0, compress_level: int = 6,
+                 revalidate: float = 30.0):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self.compress_level = compress_level
+        self._cache = OrderedDict()
+        self._locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.skipped_writes = 0
+
+    @staticmethod
+    def make_key(username: str, platform: str):
+        return (username, platform.lower())
+
+    @staticmethod
+    def content_hash(session_data) -> str:
+        canonical = json.dumps(session_data, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("username", 1), ("platform_name", 1)], name="username_platform")
+
+    async def load(self, username: str, platform: str):
+        key = self.make_key(username, platform)
+        cached = self._cache_get(key)
+        if cached is not None and not self._stale(key):
+            self.hits += 1
+            return cached[0]
+
+        async with self._lock(key):
+            # Another caller may have filled or revalidated the cache while we waited.
+            cached = self._cache_get(key)
+            if cached is not None and not self._stale(key):
+                self.hits += 1
+                return cached[0]
+            if cached is not None:
+                doc = await self.collection.find_one(
+                    {"username": key[0], "platform_name": key[1]}, {"sessionHash": 1}
+                )
+                if doc and doc.get("sessionHash") == cached[1]:
+                    self.hits += 1
+                    self._cache_put(key, *cached)
+                    return cached[0]
+            self.misses += 1
+            doc = await self.collection.find_one(
+                {"username": key[0], "platform_name": key[1]},
+                {"sessionData": 1, "sessionDataZ": 1, "sessionHash": 1}
+            )
+            session_data, digest = self._decode(doc)
+            self._cache_put(key, session_data, digest)
+            return session_data
+
+    async def save(self, username: str, platform: str, session_data: dict) -> bool:
+        """Persists the state if it changed. Returns True when a write happened."""
+        key = self.make_key(username, platform)
+        digest = self.content_hash(session_data)
+        async with self._lock(key):
+            # Compared with the stored hash, not the cached one: another worker may
+            # have written a different state since this one cached it.
+            doc = await self.collection.find_one(
+                {"username": key[0], "platform_name": key[1]}, {"sessionHash": 1}
+            )
+            stored_hash = doc.get("sessionHash") if doc else None
+
+            if stored_hash == digest:
+                self.skipped_writes += 1
+                self._cache_put(key, session_data, digest)
+                return False
+
+            raw = json.dumps(session_data, separators=(",", ":")).encode("utf-8")
+            await self.collection.update_one(
+                {"username": key[0], "platform_name": key[1]},
+                {
+                    "$set": {
+                        "sessionDataZ": zlib.compress(raw, self.compress_level),
+                        "sessionHash": digest,
+                        "updatedAt": time.time(),
+                    },
+                    "$unset": {"sessionData": ""},
+                },
+                upsert=True
+            )
+            self._cache_put(key, session_data, digest)
+            return True
+
+    async def recent(self, limit: int) -> list:
+        """(username, platform) of the most recently saved sessions, newest first."""
+        if limit <= 0:
+            return []
+        cursor = self.collection.find({}, {"username": 1, "platform_name": 1, "_id": 0}).sort("updatedAt", -1).limit(limit)
+        return [(doc["username"], doc["platform_name"]) for doc in await cursor.to_list(length=limit)]
+
+    def invalidate(self, username: str, platform: str):
+        self._cache.pop(self.make_key(username, platform), None)
+
+    def stats(self):
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped_writes": self.skipped_writes,
+        }
+
+    def _decode(self, doc):
+        if not doc:
+            return None, None
+        if doc.get("sessionDataZ") is not None:
+            session_data = json.loads(zlib.decompress(doc["sessionDataZ"]).decode("utf-8"))
+        else:
+            # Legacy documents written before compression was introduced.
+            session_data = doc.get("sessionData")
+        if session_data is None:
+            return None, None
+        return session_data, doc.get("sessionHash") or self.content_hash(session_data)
+
+    def _lock(self, key):
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def _cache_get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        session_data, digest, stored_at = entry
+        if time.time() - stored_at > self.ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return session_data, digest
+
+    def _stale(self, key) -> bool:
+        return time.time() - self._cache[key][2] > self.revalidate
+
+    def _cache_put(self, key, session_data, digest):
+        self._cache[key] = (session_data, digest, time.time())
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
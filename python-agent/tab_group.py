@@ -0,0 +1,85 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+# Actions that let an agent reach into tabs it doesn't own.
+CROSS_TAB_ACTIONS = ["switch", "close"]
+
+class TabGroup:
+    """
+    Runs several agents at once in separate tabs of one leased browser.
+
+    The tabs share the browser's cookies and storage (one logged-in session), but
+    each agent gets its own BrowserSession attached over CDP and focused on its own
+    target. Focus changes into another agent's tab are reverted, so one tab's
+    navigation or popups can't hijack another's.
+    """
+
+    def __init__(self, browser, max_tabs: int = 3):
+        self.browser = browser
+        self.max_tabs = max(1, max_tabs)
+        self._slots = asyncio.Semaphore(self.max_tabs)
+        self._owners = {}  # target_id -> tab number
+        self._counter = 0
+
+    @property
+    def open_tabs(self):
+        return len(set(self._owners.values()))
+
+    @asynccontextmanager
+    async def tab(self):
+        """Yields a BrowserSession driving a fresh tab; closes the tab afterwards."""
+        from browser_use import Browser
+
+        async with self._slots:
+            self._counter += 1
+            tab_no = self._counter
+            created = await self.browser.cdp_client.send.Target.createTarget(params={"url": "about:blank"})
+            target_id = created["targetId"]
+            self._owners[target_id] = tab_no
+
+            profile = self.browser.browser_profile
+            session = Browser(
+                cdp_url=self.browser.cdp_url,
+                keep_alive=True,
+                wait_for_network_idle_page_load_time=profile.wait_for_network_idle_page_load_time,
+                wait_between_actions=profile.wait_between_actions,
+            )
+            try:
+                await session.start()
+                await session.get_or_create_cdp_session(target_id, focus=True)
+                self._guard(session, tab_no, target_id)
+                print(f"🗂️ [Tabs] Tab {tab_no} opened ({self.open_tabs}/{self.max_tabs}).")
+                yield session
+            finally:
+                owned = [t for t, owner in self._owners.items() if owner == tab_no]
+                for t in owned:
+                    self._owners.pop(t, None)
+                try:
+                    await session.stop()
+                except Exception as e:
+                    print(f"⚠️ [Tabs] Error detaching tab {tab_no}: {e}")
+                for t in owned:
+                    try:
+                        await self.browser.cdp_client.send.Target.closeTarget(params={"targetId": t})
+                    except Exception:
+                        pass
+                print(f"🗂️ [Tabs] Tab {tab_no} closed.")
+
+    def _guard(self, session, tab_no: int, home_target: str):
+        from browser_use.browser.events import AgentFocusChangedEvent, SwitchTabEvent
+
+        last_own = {"target": home_target}
+
+        async def on_focus_changed(event: AgentFocusChangedEvent):
+            owner = self._owners.get(event.target_id)
+            if owner is None:
+                # A popup or new tab this agent opened: it belongs to this tab now.
+                self._owners[event.target_id] = tab_no
+                last_own["target"] = event.target_id
+            elif owner == tab_no:
+                last_own["target"] = event.target_id
+            else:
+                print(f"🗂️ [Tabs] Tab {tab_no} wandered into tab {owner}'s page; switching back.")
+                session.event_bus.dispatch(SwitchTabEvent(target_id=last_own["target"]))
+
+        session.event_bus.on(AgentFocusChangedEvent, on_focus_changed)
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from collections import deque
+
+class TaskEventBuffer:
+    """
+    Bounded, replayable event log for one task. Each event gets a sequence
+    number; subscribers pass the last one they saw and get everything newer
+    that is still buffered, then live events until the task closes.
+    """
+
+    def __init__(self, maxlen: int = 200):
+        self.events = deque(maxlen=maxlen)
+        self.seq = 0
+        self.closed = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+
+    def publish(self, event_type: str, **data):
+        self.add({"seq": self.seq + 1, "type": event_type, "time": time.time(), **data})
+
+    def add(self, event: dict):
+        """Appends an already numbered event (e.g. replayed from another process)."""
+        self.seq = event["seq"]
+        self.events.append(event)
+        self._changed.set()
+
+    def close(self):
+        self.closed = True
+        self._changed.set()
+
+    def since(self, after: int = 0):
+        return [e for e in self.events if e["seq"] > after]
+
+    async def subscribe(self, after: int = 0, keepalive: float = 15.0):
+        """Yields buffered events after `after`, then live ones. Yields None on idle keepalive."""
+        self.subscribers += 1
+        try:
+            while True:
+                self._changed.clear()
+                for event in self.since(after):
+                    after = event["seq"]
+                    yield event
+                if self.closed:
+                    return
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.subscribers -= 1
+
+def step_event_data(agent) -> dict:
+    """Summarizes the agent's last history item for the event stream."""
+    if not agent.history.history:
+        return {"step": agent.state.n_steps}
+    item = agent.history.history[-1]
+    actions = []
+    if item.model_output:
+        for action in item.model_output.action:
+            dumped = action.model_dump(exclude_none=True)
+            actions.extend(dumped.keys())
+    errors = [r.error for r in item.result if r.error]
+    data = {
+        "step": item.metadata.step_number if item.metadata else agent.state.n_steps,
+        "url": item.state.url if item.state else None,
+        "actions": actions,
+        "next_goal": item.model_output.next_goal if item.model_output else None,
+        "duration_s": round(item.metadata.duration_seconds, 2) if item.metadata else None,
+    }
+    if errors:
+        data["errors"] = [e[:300] for e in errors]
+    return data
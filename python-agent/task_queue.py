@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import itertools
+import time
+import traceback
+import uuid
+
+from task_events import TaskEventBuffer
+
+# The record a worker is currently running, so long handlers can report progress.
+current_task = contextvars.ContextVar("current_task", default=None)
+
+class TaskRecord:
+    """Tracks a single queued agent task from submission to completion."""
+
+    def __init__(self, task_id: str, request, priority: int, handler=None):
+        self.task_id = task_id
+        self.request = request
+        self.priority = priority
+        self.handler = handler
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = []
+        self.updated = asyncio.Event()
+        self.done = asyncio.Event()
+        self.events = TaskEventBuffer()
+        self.cancel_requested = False
+        self.runner = None
+
+    def report(self, item):
+        """Publishes a partial result (e.g. one job of a batch) while the task runs."""
+        self.progress.append(item)
+        self.updated.set()
+        self.events.publish("progress", item=item)
+
+    def to_dict(self):
+        return {
+            "task_id": self.task_id,
+            "status": self.status,
+            "priority": self.priority,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class TaskQueue:
+    """
+    In-process priority queue drained by a fixed pool of workers.
+    Lower priority numbers run first; ties run in submission order.
+    """
+
+    def __init__(self, handler, num_workers: int = 2, max_finished: int = 500, cancel_grace: float = 30.0):
+        self.handler = handler
+        self.cancel_grace = cancel_grace
+        self.num_workers = max(1, num_workers)
+        self.max_finished = max_finished
+        self.tasks = {}
+        self._queue = asyncio.PriorityQueue()
+        self._counter = itertools.count()
+        self._workers = []
+        self._finished_order = []
+
+    async def start(self):
+        if self._workers:
+            return
+        for i in range(self.num_workers):
+            self._workers.append(asyncio.create_task(self._worker(i)))
+        print(f"🧵 [Queue] Started {self.num_workers} agent workers.")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        print("🧵 [Queue] Workers stopped.")
+
+    def submit(self, request, priority: int = 5, handler=None, task_id: str = None) -> TaskRecord:
+        """
+        Queues a request. `handler` overrides the queue's default handler for this
+        task; `task_id` keeps an ID assigned elsewhere (e.g. by the lease queue).
+        """
+        record = TaskRecord(task_id or uuid.uuid4().hex, request, priority, handler)
+        self.tasks[record.task_id] = record
+        self._queue.put_nowait((priority, next(self._counter), record.task_id))
+        record.events.publish("queued", priority=priority)
+        print(f"📨 [Queue] Task {record.task_id} queued (priority={priority}, depth={self._queue.qsize()}).")
+        return record
+
+    def get(self, task_id: str):
+        return self.tasks.get(task_id)
+
+    def cancel(self, task_id: str) -> bool:
+        """
+        Cancels a queued task outright. A running task is asked to stop at its next
+        step and is hard-cancelled if it hasn't finished after `cancel_grace` seconds.
+        """
+        record = self.tasks.get(task_id)
+        if record is None or record.done.is_set():
+            return False
+        record.cancel_requested = True
+        if record.status == "queued":
+            record.status = "cancelled"
+            record.finished_at = time.time()
+            self._finish(record)
+            return True
+        record.events.publish("cancelling", grace_s=self.cancel_grace)
+        runner = record.runner
+        if runner is not None:
+            asyncio.get_running_loop().call_later(
+                self.cancel_grace, lambda: runner.done() or runner.cancel()
+            )
+        return True
+
+    def stats(self):
+        counts = {}
+        for record in self.tasks.values():
+            counts[record.status] = counts.get(record.status, 0) + 1
+        return {"workers": self.num_workers, "queued": self._queue.qsize(), "by_status": counts}
+
+    async def _worker(self, worker_id: int):
+        while True:
+            _, _, task_id = await self._queue.get()
+            record = self.tasks.get(task_id)
+            try:
+                if record is None or record.status != "queued":
+                    continue
+                record.status = "running"
+                record.started_at = time.time()
+                print(f"⚙️ [Queue] Worker {worker_id} picked up task {task_id}.")
+                record.events.publish("started", worker=worker_id)
+                token = current_task.set(record)
+                # Own task so a single run can be cancelled without killing the worker.
+                record.runner = asyncio.ensure_future((record.handler or self.handler)(record.request))
+                current_task.reset(token)
+                try:
+                    record.result = await record.runner
+                    record.status = "cancelled" if record.cancel_requested else "completed"
+                except asyncio.CancelledError:
+                    record.status = "cancelled"
+                    if not record.cancel_requested:
+                        raise
+                except Exception:
+                    record.error = traceback.format_exc()
+                    record.status = "failed"
+                    print(f"❌ [Queue] Task {task_id} failed:\n{record.error}")
+                finally:
+                    record.runner = None
+                    record.finished_at = time.time()
+                    self._finish(record)
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, record: TaskRecord):
+        record.events.publish(
+            "finished", status=record.status, result=record.result,
+            error=record.error.strip().splitlines()[-1] if record.error else None
+        )
+        record.events.close()
+        record.done.set()
+        record.updated.set()
+        self._remember_finished(record.task_id)
+
+    def _remember_finished(self, task_id: str):
+        # Keep memory bounded: forget the oldest finished records.
+        self._finished_order.append(task_id)
+        while len(self._finished_order) > self.max_finished:
+            self.tasks.pop(self._finished_order.pop(0), None)
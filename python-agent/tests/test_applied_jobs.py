@@ -0,0 +1,30 @@
+from applied_jobs import canonicalize_url
+
+def test_linkedin_job_page_keeps_only_the_job_id():
+    assert canonicalize_url("https://www.linkedin.com/jobs/view/3812345678/?refId=abc&trackingId=x&currentJobId=3812345678") \
+        == "https://linkedin.com/jobs/view/3812345678?currentjobid=3812345678"
+
+def test_linkedin_search_page_keeps_its_query():
+    # currentJobId on a search page only names the selected result.
+    assert canonicalize_url("https://www.linkedin.com/jobs/search/?keywords=python&currentJobId=1&trk=nav") \
+        == "https://linkedin.com/jobs/search?currentjobid=1&keywords=python"
+
+def test_indeed_view_job_keeps_jk():
+    assert canonicalize_url("https://in.indeed.com/viewjob?jk=abc123&from=serp&vjs=3") \
+        == "https://in.indeed.com/viewjob?jk=abc123"
+
+def test_generic_site_keeps_job_id_params():
+    assert canonicalize_url("https://boards.greenhouse.io/acme/jobs?gh_jid=42&utm_source=x&page=2") \
+        == "https://boards.greenhouse.io/acme/jobs?gh_jid=42"
+
+def test_tracking_params_dropped_and_rest_sorted():
+    assert canonicalize_url("http://www.example.com/careers/backend/?utm_medium=mail&team=api&gclid=1&city=pune") \
+        == "https://example.com/careers/backend?city=pune&team=api"
+
+def test_same_job_variants_match():
+    variants = [
+        "https://www.linkedin.com/jobs/view/3812345678",
+        "https://linkedin.com/jobs/view/3812345678/?trk=public_jobs",
+        "  HTTPS://WWW.LINKEDIN.COM/jobs/view/3812345678/  ",
+    ]
+    assert len({canonicalize_url(u) for u in variants}) == 1
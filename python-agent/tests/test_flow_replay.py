@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+from flow_replay import build_trace
+
+JOB = "https://www.linkedin.com/jobs/view/3812345678/"
+FORM = ["email address", "phone number", "resume"]
+
+class Action:
+    def __init__(self, name, **params):
+        self.data = {name: params}
+
+    def model_dump(self, exclude_unset=False):
+        return self.data
+
+class Element:
+    def __init__(self, ax_name, **attributes):
+        self.ax_name = ax_name
+        self.attributes = attributes
+
+    def to_dict(self):
+        return {"ax_name": self.ax_name, "attributes": self.attributes}
+
+def item(step, url, actions, elements=None, error=None):
+    return SimpleNamespace(
+        model_output=SimpleNamespace(action=actions),
+        state=SimpleNamespace(url=url, interacted_element=elements or [None] * len(actions)),
+        result=[SimpleNamespace(error=error)],
+        metadata=SimpleNamespace(step_number=step),
+    )
+
+VALUES = {"resume_path": "/uploads/resumes/jane.pdf", "username": "jane@example.com"}
+ANSWERS = {"years of experience": "6"}
+
+def trace(history, forms=None):
+    forms = forms if forms is not None else {n: FORM for n in range(1, 10)}
+    return build_trace(history, VALUES, JOB, forms, ANSWERS.get)
+
+def test_values_become_placeholders_and_done_completes():
+    history = [
+        item(1, "https://www.linkedin.com/login", [Action("input", index=1, text="secret")]),
+        item(2, JOB, [Action("navigate", url=JOB)]),
+        item(3, JOB, [Action("click", index=4)], [Element("Easy Apply")]),
+        item(4, JOB, [
+            Action("input", index=5, text="jane@example.com"),
+            Action("input", index=6, text="6"),
+            Action("upload_file", index=7, path="/uploads/resumes/jane.pdf"),
+        ], [Element("Email address"), Element("Years of experience"), Element("Resume")]),
+        item(5, JOB, [Action("click", index=9), Action("done", text="Applied", success=True)], [Element("Submit")]),
+    ]
+    steps, complete = trace(history)
+    assert complete
+    assert [next(iter(s["action"])) for s in steps] == ["click", "input", "input", "upload_file", "click"]
+    assert steps[1]["action"]["input"]["text"] == "{username}"
+    assert steps[2]["action"]["input"]["text"] == "{answer:years of experience}"
+    assert steps[3]["action"]["upload_file"]["path"] == "{resume_path}"
+    assert all(s["form"] == FORM and s["route"] == "linkedin.com/jobs/view/{id}" for s in steps)
+
+def test_value_typed_from_nowhere_ends_the_trace():
+    history = [
+        item(1, JOB, [Action("click", index=4)], [Element("Easy Apply")]),
+        item(2, JOB, [Action("input", index=5, text="I love this job because...")], [Element("Cover letter")]),
+        item(3, JOB, [Action("done", text="Applied", success=True)]),
+    ]
+    steps, complete = trace(history)
+    assert not complete
+    assert len(steps) == 1
+
+def test_failed_steps_are_skipped_and_unknown_forms_stop():
+    history = [
+        item(1, JOB, [Action("click", index=4)], [Element("Easy Apply")], error="Element not found"),
+        item(2, JOB, [Action("click", index=4)], [Element("Easy Apply")]),
+        item(3, JOB, [Action("click", index=8)], [Element("Next")]),
+    ]
+    steps, complete = trace(history, forms={2: FORM})
+    assert not complete
+    assert len(steps) == 1 and steps[0]["action"] == {"click": {"index": 4}}
+
+def test_typed_keys_are_not_replayed():
+    history = [
+        item(1, JOB, [Action("send_keys", keys="Tab")]),
+        item(2, JOB, [Action("send_keys", keys="hello")]),
+    ]
+    steps, complete = trace(history)
+    assert not complete
+    assert [s["action"] for s in steps] == [{"send_keys": {"keys": "Tab"}}]
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from job_filter import JobFilter, parse_posting, phrase_in, rule_terms
+
+RESUME = """Jane Doe
+jane@example.com
+Summary
+Backend engineer with 6 years of experience building Python APIs.
+Skills
+Python, Django, PostgreSQL, Docker, AWS
+Experience
+Backend Engineer, Acme 2019 - present
+"""
+
+def _ld_page(title, location, description):
+    ld = {
+        "@context": "https://schema.org",
+        "@type": "JobPosting",
+        "title": title,
+        "hiringOrganization": {"@type": "Organization", "name": "Acme"},
+        "jobLocation": {"@type": "Place", "address": {"addressLocality": location, "addressCountry": "IN"}},
+        "description": description,
+    }
+    return f'<html><head><script type="application/ld+json">{json.dumps(ld)}</script></head><body></body></html>'
+
+class SettingsCollection:
+    """Just enough of a motor collection for JobFilter.get_settings."""
+
+    def __init__(self, docs=None):
+        self.docs = docs or {}
+
+    async def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+def test_rule_terms_splits_negated_phrases():
+    positive, negatives = rule_terms("Prefer Python backend roles. Avoid senior roles; no internships, contract or freelance jobs")
+    assert negatives == ["senior", "internships", "contract", "freelance"]
+    assert "Python" in positive and "senior" not in positive
+
+def test_rule_terms_ignores_answer_instructions():
+    positive, negatives = rule_terms("Answer no to sponsorship. Say yes to relocation. Skip staffing agencies")
+    assert negatives == ["staffing agencies"]
+    assert "sponsorship" not in positive
+
+def test_phrase_in_matches_whole_words_and_plurals():
+    assert phrase_in("internships", "Software Engineering Intern")
+    assert phrase_in("senior", "Senior Backend Engineer")
+    assert not phrase_in("senior", "Seniority not required")
+    assert not phrase_in("java", "JavaScript Developer")
+    assert not phrase_in("", "anything")
+
+def test_parse_posting_prefers_json_ld():
+    page = _ld_page("Backend Engineer", "Bengaluru", "<p>Build Python APIs &amp; services.</p>")
+    posting = parse_posting(page, "https://jobs.example.com/job/1")
+    assert posting["source"] == "ld+json"
+    assert posting["title"] == "Backend Engineer"
+    assert posting["company"] == "Acme"
+    assert posting["location"] == "Bengaluru, IN"
+    assert posting["description"] == "Build Python APIs & services."
+
+def test_parse_posting_falls_back_to_page_text():
+    page = """<html><head><title>Careers | Acme</title><meta property="og:site_name" content="Acme"></head>
+    <body><nav>Home Jobs</nav><h1>Data  Engineer</h1><p>Own our Spark pipelines.</p>
+    <script>var x = 1;</script><footer>Privacy</footer></body></html>"""
+    posting = parse_posting(page)
+    assert posting["source"] == "html"
+    assert posting["title"] == "Data Engineer"
+    assert posting["company"] == "Acme"
+    assert "Spark pipelines" in posting["description"]
+    assert "Privacy" not in posting["description"] and "var x" not in posting["description"]
+
+def _screen(tmp_path, url, page, rules="", settings=None):
+    job_filter = JobFilter(SettingsCollection(settings), cache_dir=str(tmp_path))
+    with open(job_filter.cache_path(url), "w", encoding="utf-8") as f:
+        f.write(page)
+    request = SimpleNamespace(url=url, username="jane", resume_text=RESUME, rules=rules)
+    return asyncio.run(job_filter.screen(request))
+
+def test_screen_passes_a_matching_posting(tmp_path):
+    description = "We are hiring a backend engineer to build Python and Django APIs on PostgreSQL, " * 4
+    url = "https://www.linkedin.com/jobs/view/3812345678/"
+    result = _screen(tmp_path, url, _ld_page("Python Backend Engineer", "Remote", description))
+    assert result["decision"] == "pass", result
+    assert "python" in result["matched"]
+
+def test_screen_rejects_an_excluded_title(tmp_path):
+    description = "We are hiring a senior backend engineer to build Python and Django APIs on PostgreSQL, " * 4
+    url = "https://www.linkedin.com/jobs/view/3812345679/"
+    settings = {"jane": {"_id": "jane", "exclude": ["senior"]}}
+    result = _screen(tmp_path, url, _ld_page("Senior Backend Engineer", "Remote", description), settings=settings)
+    assert result["decision"] == "reject"
+    assert result["excluded"] == ["senior"]
@@ -0,0 +1,48 @@
+"""
+Headless agent worker: pulls tasks from the MongoDB lease queue and runs them,
+without serving HTTP. Start as many as the host has CPU and memory for, on as
+many hosts as needed; the API (main.py) only has to share MONGODB_URI.
+
+Usage (from python-agent/):
+    TASK_BACKEND=mongo BROWSER_HEADLESS=true AGENT_WORKERS=2 python worker.py
+
+WORKER_ID names the worker in task documents (default: hostname-pid).
+"""
+import asyncio
+import os
+import signal
+
+os.environ.setdefault("TASK_BACKEND", "mongo")
+
+import main
+
+async def run():
+    if main.lease_queue is None:
+        raise SystemExit("worker.py needs TASK_BACKEND=mongo")
+    if main.AGENT_WORKERS < 1:
+        raise SystemExit("worker.py needs AGENT_WORKERS >= 1")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C arrives as KeyboardInterrupt instead
+
+    async with main.lifespan(main.app):
+        await main.readiness.settled()
+        if main.readiness.ready:
+            print(f"👷 [Worker] {main.WORKER_ID} ready in {main.readiness.ready_after_s}s "
+                  f"({main.AGENT_WORKERS} slots, headless={main.BROWSER_HEADLESS}).")
+        else:
+            print(f"⚠️ [Worker] {main.WORKER_ID} not ready yet, retrying before it claims tasks: "
+                  f"{main.readiness.snapshot()['components']}")
+        await stop.wait()
+        print(f"👷 [Worker] {main.WORKER_ID} shutting down; unfinished tasks go back to the queue.")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass